@@ -12,10 +12,17 @@ IF NOT EXISTS documents
 (50) NOT NULL,
     source_path     TEXT NOT NULL,
     filename        TEXT NOT NULL,
+    file_size       BIGINT,
+    file_mtime      DOUBLE PRECISION,
+    content_sha256  VARCHAR
+(64),
+    canonical_id    UUID REFERENCES documents
+(id),
     doc_type        VARCHAR
 (30),
     page_count      INTEGER,
     extracted_text  TEXT,
+    page_offsets    INTEGER[],
     text_search     TSVECTOR GENERATED ALWAYS AS
 (to_tsvector
 ('english', COALESCE
@@ -48,6 +55,67 @@ IF NOT EXISTS idx_documents_status ON documents
 CREATE INDEX
 IF NOT EXISTS idx_documents_metadata ON documents USING GIN
 (metadata);
+CREATE UNIQUE INDEX
+IF NOT EXISTS idx_documents_source_path ON documents
+(source_path);
+CREATE INDEX
+IF NOT EXISTS idx_documents_content_sha256 ON documents
+(content_sha256);
+CREATE INDEX
+IF NOT EXISTS idx_documents_canonical ON documents
+(canonical_id);
+CREATE INDEX
+IF NOT EXISTS idx_documents_redaction_score ON documents
+(redaction_score);
+
+-- Per-document redaction aggregates (kept by the redaction stage)
+CREATE TABLE
+IF NOT EXISTS redaction_stats
+(
+    document_id     UUID PRIMARY KEY REFERENCES documents
+(id) ON
+DELETE CASCADE,
+    source          VARCHAR
+(50) NOT NULL,
+    dataset         VARCHAR
+(50) NOT NULL DEFAULT '',
+    redaction_score FLOAT NOT NULL,
+    score_bucket    INTEGER NOT NULL,
+    page_count      INTEGER DEFAULT 0,
+    pages_with_redactions INTEGER DEFAULT 0,
+    bar_count       INTEGER DEFAULT 0,
+    redacted_area   FLOAT DEFAULT 0,
+    updated_at      TIMESTAMPTZ DEFAULT NOW
+()
+);
+
+CREATE INDEX
+IF NOT EXISTS idx_redaction_stats_score ON redaction_stats
+(redaction_score);
+CREATE INDEX
+IF NOT EXISTS idx_redaction_stats_source_score ON redaction_stats
+(source, redaction_score);
+CREATE INDEX
+IF NOT EXISTS idx_redaction_stats_dataset_score ON redaction_stats
+(dataset, redaction_score);
+
+-- Redaction totals per source, dataset and score bucket (delta-updated)
+CREATE TABLE
+IF NOT EXISTS redaction_histograms
+(
+    source          VARCHAR
+(50) NOT NULL,
+    dataset         VARCHAR
+(50) NOT NULL,
+    score_bucket    INTEGER NOT NULL,
+    doc_count       BIGINT DEFAULT 0,
+    page_count      BIGINT DEFAULT 0,
+    pages_with_redactions BIGINT DEFAULT 0,
+    bar_count       BIGINT DEFAULT 0,
+    redacted_area   FLOAT DEFAULT 0,
+    PRIMARY KEY
+(source, dataset, score_bucket)
+);
 
 -- Named entities
 CREATE TABLE
@@ -162,6 +230,11 @@ NOT NULL,
 (20) DEFAULT 'queued',
     priority    INTEGER DEFAULT 5,
     error       TEXT,
+    attempts    INTEGER DEFAULT 0,
+    available_at TIMESTAMPTZ DEFAULT NOW
+(),
+    lease_expires_at TIMESTAMPTZ,
+    published_at TIMESTAMPTZ,
     started_at  TIMESTAMPTZ,
     completed_at TIMESTAMPTZ,
     created_at  TIMESTAMPTZ DEFAULT NOW
@@ -174,3 +247,15 @@ IF NOT EXISTS idx_jobs_status ON processing_jobs
 CREATE INDEX
 IF NOT EXISTS idx_jobs_document ON processing_jobs
 (document_id);
+CREATE UNIQUE INDEX
+IF NOT EXISTS idx_jobs_queued_unique ON processing_jobs
+(document_id, job_type) WHERE status = 'queued' AND attempts = 0;
+CREATE INDEX
+IF NOT EXISTS idx_jobs_claim ON processing_jobs
+(job_type, priority, created_at) WHERE status = 'queued';
+CREATE INDEX
+IF NOT EXISTS idx_jobs_lease ON processing_jobs
+(lease_expires_at) WHERE status = 'running';
+CREATE INDEX
+IF NOT EXISTS idx_jobs_unpublished ON processing_jobs
+(created_at) WHERE status = 'queued' AND published_at IS NULL;
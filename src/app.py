@@ -46,13 +46,14 @@ def create_app() -> FastAPI:
     app.state.templates = Jinja2Templates(directory=str(templates_dir))
 
     # Register routes
-    from src.web.routes import dashboard, documents, entities, graph, search, sources
+    from src.web.routes import dashboard, documents, entities, graph, redactions, search, sources
 
     app.include_router(dashboard.router)
     app.include_router(search.router)
     app.include_router(documents.router)
     app.include_router(entities.router)
     app.include_router(graph.router)
+    app.include_router(redactions.router)
     app.include_router(sources.router)
 
     return app
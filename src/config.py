@@ -21,19 +21,62 @@ class Settings(BaseSettings):
     azure_storage_connection_string: str = ""
     azure_storage_container: str = "documents"
 
+    # Blob storage for original documents: "local" (blob_root) or "azure"
+    blob_backend: str = "local"
+    blob_root: str = "data/blobs"
+    blob_upload: bool = False  # copy imported files into the blob store
+    blob_cache_dir: str = "data/blob-cache"  # worker-side cache of downloaded blobs
+    blob_cache_max_bytes: int = 10 * 1024**3
+
     # Azure Queue Storage
     azure_queue_connection_string: str = ""
     azure_queue_name: str = "processing-jobs"
 
+    # Job queue backend: "postgres" (processing_jobs table), "memory" (one process) or "azure"
+    queue_backend: str = "postgres"
+
     # NLP
     spacy_model: str = "en_core_web_sm"
     embedding_model: str = "all-MiniLM-L6-v2"
     embedding_dim: int = 384
+    embedding_batch_size: int = 256  # chunks per cross-document encoder batch
+    embedding_batch_timeout: float = 0.05  # seconds to wait for a batch to fill
+    # ner and embed jobs are claimed a batch per worker slot (up to ner_batch_size /
+    # embedding_batch_size documents), so one slot fills a whole batch; max_concurrent_jobs
+    # and job_type_limits count those batches, not documents.
+    ner_batch_size: int = 64  # documents per cross-document spaCy run
+    ner_batch_timeout: float = 0.05  # seconds to wait for a batch to fill
+    ner_pipe_batch_size: int = 64  # texts per nlp.pipe minibatch
+    ner_n_process: int = 1  # nlp.pipe processes per pool process (the pool already spans cores)
 
     # Processing
     chunk_size: int = 512  # tokens per embedding chunk
     chunk_overlap: int = 64
     max_concurrent_jobs: int = 4
+    # Per-job-type concurrency caps (in slots) and fair-share weights (JSON in env), e.g.
+    # JOB_TYPE_LIMITS='{"ner": 2, "embed": 1}'. Unlisted types: no cap, weight 1.
+    job_type_limits: dict[str, int] = {"ner": 2}
+    job_type_weights: dict[str, float] = {}
+    cpu_workers: int = 0  # process pool size for CPU-bound stages (0 = one per core)
+    pdf_split_pages: int = 200  # PDFs with more pages are processed in parallel page ranges
+    pdf_range_pages: int = 100  # pages per range when a PDF is split
+    ocr_dpi: int = 300  # render resolution for OCR (Tesseract is tuned for ~300)
+    ocr_language: str = "eng"
+    ocr_range_pages: int = 4  # pages per OCR task in the process pool
+    redaction_raster_dpi: int = 36  # render resolution for raster redaction detection on scans
+    ack_batch_size: int = 100  # job completions written per round-trip
+    ack_flush_interval: float = 1.0  # seconds between ack flushes
+    job_poll_interval: float = 30.0  # fallback poll when idle (LISTEN/NOTIFY wakes sooner)
+    job_lease_seconds: float = 120.0  # claim lease, extended by heartbeats while a job runs
+    job_max_attempts: int = 5  # attempts before a job is marked failed
+    job_retry_base_delay: float = 30.0  # seconds; doubles with each attempt
+    job_retry_max_delay: float = 3600.0
+    import_batch_size: int = 1000  # files hashed and inserted per import transaction
+
+    # Downloads
+    download_concurrency: int = 16  # simultaneous downloads (pooled connections)
+    download_per_host: int = 4  # simultaneous downloads from one host
+    download_max_attempts: int = 5  # tries per URL, with exponential backoff
 
     # Server
     host: str = "0.0.0.0"
@@ -5,6 +5,7 @@ from datetime import datetime
 
 from pgvector.sqlalchemy import Vector
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
@@ -15,6 +16,7 @@ from sqlalchemy import (
     String,
     Text,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -37,13 +39,22 @@ class Document(Base):
     source: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
     source_path: Mapped[str] = mapped_column(Text, nullable=False)
     filename: Mapped[str] = mapped_column(Text, nullable=False)
+    file_size: Mapped[int | None] = mapped_column(BigInteger)
+    # (size, mtime) lets a re-import skip unchanged files unread
+    file_mtime: Mapped[float | None] = mapped_column(Float)
+    content_sha256: Mapped[str | None] = mapped_column(String(64), index=True)
+    canonical_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("documents.id"), index=True
+    )  # set on byte-identical duplicates; outputs are reused from the canonical doc
     doc_type: Mapped[str | None] = mapped_column(String(30), index=True)
     page_count: Mapped[int | None] = mapped_column(Integer)
     extracted_text: Mapped[str | None] = mapped_column(Text)
+    # Start offset of each page in extracted_text (see src.nlp.extractor.join_pages)
+    page_offsets: Mapped[list[int] | None] = mapped_column(ARRAY(Integer))
     metadata_: Mapped[dict] = mapped_column("metadata", JSONB, default=dict)
     blob_url: Mapped[str | None] = mapped_column(Text)
     thumbnail_url: Mapped[str | None] = mapped_column(Text)
-    redaction_score: Mapped[float] = mapped_column(Float, default=0.0)
+    redaction_score: Mapped[float] = mapped_column(Float, default=0.0, index=True)
     redaction_details: Mapped[dict] = mapped_column(JSONB, default=dict)
     ocr_applied: Mapped[bool] = mapped_column(Boolean, default=False)
     processing_status: Mapped[str] = mapped_column(String(20), default="pending", index=True)
@@ -58,8 +69,60 @@ class Document(Base):
     jobs: Mapped[list["ProcessingJob"]] = relationship(back_populates="document")
 
     __table_args__ = (
-        Index("idx_documents_metadata", "metadata_", postgresql_using="gin"),
+        Index("idx_documents_metadata", "metadata", postgresql_using="gin"),
+        Index("idx_documents_source_path", "source_path", unique=True),
+    )
+
+
+class RedactionStats(Base):
+    """Per-document redaction aggregates, kept by the redaction stage.
+
+    A flat copy of the numbers inside `Document.redaction_details`, so the
+    redaction analyzer can sort and filter without reading JSONB.
+    Duplicates (`canonical_id` set) are left out.
+    """
+
+    __tablename__ = "redaction_stats"
+
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True
     )
+    source: Mapped[str] = mapped_column(String(50), nullable=False)
+    dataset: Mapped[str] = mapped_column(String(50), nullable=False, default="")
+    redaction_score: Mapped[float] = mapped_column(Float, nullable=False)
+    score_bucket: Mapped[int] = mapped_column(Integer, nullable=False)  # see redaction.score_bucket
+    page_count: Mapped[int] = mapped_column(Integer, default=0)
+    pages_with_redactions: Mapped[int] = mapped_column(Integer, default=0)
+    bar_count: Mapped[int] = mapped_column(Integer, default=0)
+    redacted_area: Mapped[float] = mapped_column(Float, default=0.0)  # square points
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        Index("idx_redaction_stats_score", "redaction_score"),
+        Index("idx_redaction_stats_source_score", "source", "redaction_score"),
+        Index("idx_redaction_stats_dataset_score", "dataset", "redaction_score"),
+    )
+
+
+class RedactionHistogram(Base):
+    """Redaction totals per (source, dataset, score bucket).
+
+    Updated with deltas whenever a document's `RedactionStats` row changes,
+    so histograms and result counts never scan the documents.
+    """
+
+    __tablename__ = "redaction_histograms"
+
+    source: Mapped[str] = mapped_column(String(50), primary_key=True)
+    dataset: Mapped[str] = mapped_column(String(50), primary_key=True)
+    score_bucket: Mapped[int] = mapped_column(Integer, primary_key=True)
+    doc_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    page_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    pages_with_redactions: Mapped[int] = mapped_column(BigInteger, default=0)
+    bar_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    redacted_area: Mapped[float] = mapped_column(Float, default=0.0)
 
 
 class Entity(Base):
@@ -184,9 +247,44 @@ class ProcessingJob(Base):
     status: Mapped[str] = mapped_column(String(20), default="queued", index=True)
     priority: Mapped[int] = mapped_column(Integer, default=5)
     error: Mapped[str | None] = mapped_column(Text)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )  # retry backoff — not claimable before this
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # Set once an external queue backend (Azure) holds the job's message
+    published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     document: Mapped["Document"] = relationship(back_populates="jobs")
+
+    __table_args__ = (
+        # At most one fresh queued job per (document, stage) — downstream enqueueing relies on it
+        Index(
+            "idx_jobs_queued_unique",
+            "document_id",
+            "job_type",
+            unique=True,
+            postgresql_where=text("status = 'queued' AND attempts = 0"),
+        ),
+        Index(
+            "idx_jobs_claim",
+            "job_type",
+            "priority",
+            "created_at",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        Index(
+            "idx_jobs_lease",
+            "lease_expires_at",
+            postgresql_where=text("status = 'running'"),
+        ),
+        Index(
+            "idx_jobs_unpublished",
+            "created_at",
+            postgresql_where=text("status = 'queued' AND published_at IS NULL"),
+        ),
+    )
@@ -1,8 +1,14 @@
 """Database session management."""
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from uuid import UUID
+
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from src.config import get_settings
+from src.db.models import Document
 
 _engine = None
 _session_factory = None
@@ -39,3 +45,36 @@ async def get_db() -> AsyncSession:
         except Exception:
             await session.rollback()
             raise
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """Context manager — yields a standalone session (for the worker and scripts).
+
+    Same commit/rollback semantics as `get_db`, but safe to leave early
+    with `return` or `break`.
+    """
+    if _session_factory is None:
+        await init_db()
+    async with _session_factory() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def load_document(db: AsyncSession, document_id: UUID) -> Document:
+    """Load a job's document and end the read transaction.
+
+    Job handlers compute for seconds to minutes between their read and
+    their write (process pool, model batches, blob downloads). Committing
+    here hands the connection back to the pool instead of leaving it idle
+    in transaction meanwhile; the document stays loaded
+    (`expire_on_commit=False`) and the handler's changes go out in a short
+    write transaction at its final commit.
+    """
+    doc = (await db.execute(select(Document).where(Document.id == document_id))).scalar_one()
+    await db.commit()
+    return doc
@@ -0,0 +1,204 @@
+"""ZIP/TAR archive members as documents — no unpacking to disk.
+
+A member is addressed in `Document.source_path` as `<archive>!/<member>`,
+e.g. `/data/doj/dataset-9.zip!/EFTA00001234.pdf`. The importer streams
+each archive once (hashing new and changed members as they pass), and
+pipeline stages read members back with `open_pdf`.
+
+Each process keeps its last few archives open, so repeated reads don't
+re-parse them: ZIP members are read through the open central directory,
+uncompressed TAR members with one `pread` at their data offset.
+Compressed TARs can't seek — reads advance a forward-only stream, so
+members read in archive order cost one pass in total, while a member
+behind the stream restarts it from the top. Prefer ZIP or plain TAR
+(or `Settings.blob_upload`) for archives that are processed in place.
+"""
+
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from collections.abc import Iterator
+
+import fitz  # PyMuPDF
+
+from src.ingest.dedup import hash_stream
+
+MEMBER_SEP = "!/"
+
+# Archives kept open per process
+MAX_OPEN_ARCHIVES = 8
+
+# Leading bytes of gzip, bzip2 and xz streams
+COMPRESSED_MAGIC = (b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")
+
+
+def member_path(archive_path: str, member: str) -> str:
+    """`source_path` of an archive member."""
+    return f"{archive_path}{MEMBER_SEP}{member}"
+
+
+def split_member_path(source_path: str) -> tuple[str, str | None]:
+    """Split a `source_path` into (archive path, member) — member is None for plain files."""
+    archive_path, sep, member = source_path.partition(MEMBER_SEP)
+    if not sep or os.path.isfile(source_path):
+        return source_path, None
+    return archive_path, member
+
+
+def iter_archive(
+    archive_path: str,
+    extensions: set[str],
+    known: dict[str, tuple[int, float]] | None = None,
+) -> Iterator[tuple[str, int, float, str | None]]:
+    """Stream an archive, yielding (source_path, size, mtime, sha256) per supported member.
+
+    Members whose (size, mtime) matches `known` are not hashed (sha256 is
+    None) — the importer skips them as unchanged.
+    """
+    known = known or {}
+
+    def wanted(name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in extensions
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not wanted(info.filename):
+                    continue
+                path = member_path(archive_path, info.filename)
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+                content_hash = None
+                if known.get(path) != (info.file_size, mtime):
+                    with zf.open(info) as f:
+                        content_hash = hash_stream(f)
+                yield path, info.file_size, mtime, content_hash
+    else:
+        # "r|*" reads the tar (any compression) front to back without seeking
+        with tarfile.open(archive_path, mode="r|*") as tar:
+            for member in tar:
+                if not member.isfile() or not wanted(member.name):
+                    continue
+                path = member_path(archive_path, member.name)
+                mtime = float(member.mtime)
+                content_hash = None
+                if known.get(path) != (member.size, mtime):
+                    content_hash = hash_stream(tar.extractfile(member))
+                yield path, member.size, mtime, content_hash
+
+
+class _ZipArchive:
+    """An open ZIP; `ZipFile.read` is safe to call from several threads."""
+
+    def __init__(self, path: str):
+        self._zf = zipfile.ZipFile(path)
+
+    def read(self, member: str) -> bytes:
+        return self._zf.read(member)
+
+
+class _TarArchive:
+    """An uncompressed TAR indexed by member name; reads are one `pread` each."""
+
+    def __init__(self, path: str):
+        self._members: dict[str, tuple[int, int]] = {}  # name -> (data offset, size)
+        with tarfile.open(path, mode="r:") as tar:
+            for info in tar:
+                if info.isfile():
+                    self._members[info.name] = (info.offset_data, info.size)
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def read(self, member: str) -> bytes:
+        if member not in self._members:
+            raise KeyError(f"No regular file {member!r} in archive")
+        offset, size = self._members[member]
+        return os.pread(self._fd, size, offset)
+
+    def __del__(self):
+        if getattr(self, "_fd", None) is not None:
+            os.close(self._fd)
+
+
+class _CompressedTarArchive:
+    """A compressed TAR read through a forward-only stream (see the module docstring)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._tar: tarfile.TarFile | None = None
+        self._members: Iterator[tarfile.TarInfo] = iter(())
+        self._last: tuple[str, bytes] | None = None  # repeat reads of one member are free
+
+    def read(self, member: str) -> bytes:
+        with self._lock:
+            if self._last and self._last[0] == member:
+                return self._last[1]
+            data = self._scan(member, restart=False)
+            if data is None:
+                data = self._scan(member, restart=True)
+            if data is None:
+                raise KeyError(f"No regular file {member!r} in archive")
+            self._last = (member, data)
+            return data
+
+    def _scan(self, member: str, restart: bool) -> bytes | None:
+        if restart or self._tar is None:
+            if self._tar is not None:
+                self._tar.close()
+            self._tar = tarfile.open(self.path, mode="r|*")
+            self._members = iter(self._tar)
+        for info in self._members:
+            if info.name == member and info.isfile():
+                return self._tar.extractfile(info).read()
+        return None
+
+
+_open: OrderedDict[tuple[str, int, int], object] = OrderedDict()
+_open_lock = threading.Lock()
+
+
+def _is_compressed(path: str) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(6)
+    return head.startswith(COMPRESSED_MAGIC)
+
+
+def _archive(path: str):
+    """The process's open handle for an archive, reopened if the file changed."""
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _open_lock:
+        archive = _open.get(key)
+        if archive is not None:
+            _open.move_to_end(key)
+            return archive
+        if zipfile.is_zipfile(path):
+            archive = _ZipArchive(path)
+        elif _is_compressed(path):
+            archive = _CompressedTarArchive(path)
+        else:
+            archive = _TarArchive(path)
+        _open[key] = archive
+        while len(_open) > MAX_OPEN_ARCHIVES:
+            # Not closed here: a reader may still hold it; it closes once dropped
+            _open.popitem(last=False)
+        return archive
+
+
+def read_member(archive_path: str, member: str) -> bytes:
+    """Read one member's bytes."""
+    try:
+        return _archive(archive_path).read(member)
+    except KeyError:
+        raise ValueError(f"Not a regular file: {member_path(archive_path, member)}") from None
+
+
+def open_pdf(source_path: str) -> fitz.Document:
+    """Open a PDF (or image) by `source_path` — a plain file or an archive member."""
+    archive_path, member = split_member_path(source_path)
+    if member is None:
+        return fitz.open(source_path)
+    filetype = os.path.splitext(member)[1].lstrip(".").lower() or "pdf"
+    return fitz.open(stream=read_member(archive_path, member), filetype=filetype)
@@ -0,0 +1,86 @@
+"""Content-hash deduplication — byte-identical files are processed once.
+
+Each imported file gets a streaming SHA-256. The first document with a
+given hash is canonical and goes through the pipeline; later copies are
+linked to it via `canonical_id`, get no processing jobs, and receive the
+canonical document's stage outputs (text, page count, redactions). Entity
+mentions and embeddings are not copied — readers resolve them through
+`canonical_id`.
+"""
+
+import hashlib
+import logging
+from typing import BinaryIO
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from src.db.models import Document
+
+logger = logging.getLogger(__name__)
+
+# Stage outputs copied from a canonical document onto its duplicates
+DUPLICATE_FIELDS = (
+    "extracted_text",
+    "page_offsets",
+    "page_count",
+    "redaction_score",
+    "redaction_details",
+    "ocr_applied",
+    "processing_status",
+)
+
+
+def hash_stream(f: BinaryIO, chunk_size: int = 1 << 20) -> str:
+    """Streaming SHA-256 of a binary file object (constant memory)."""
+    digest = hashlib.sha256()
+    while chunk := f.read(chunk_size):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """Streaming SHA-256 of a file."""
+    with open(path, "rb") as f:
+        return hash_stream(f)
+
+
+async def find_canonical_ids(db: AsyncSession, hashes: list[str]) -> dict[str, UUID]:
+    """Map content hashes to the ids of existing canonical documents."""
+    if not hashes:
+        return {}
+    rows = await db.execute(
+        select(Document.content_sha256, Document.id).where(
+            Document.content_sha256.in_(hashes),
+            Document.canonical_id.is_(None),
+        )
+    )
+    return {content_hash: doc_id for content_hash, doc_id in rows.all()}
+
+
+async def sync_duplicates(db: AsyncSession, doc: Document):
+    """Copy a canonical document's stage outputs onto its duplicates."""
+    await db.execute(
+        update(Document)
+        .where(Document.canonical_id == doc.id)
+        .values({field: getattr(doc, field) for field in DUPLICATE_FIELDS})
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def sync_new_duplicates(db: AsyncSession) -> int:
+    """Fill duplicates whose canonical document was processed before they were imported."""
+    canonical = aliased(Document)
+    result = await db.execute(
+        update(Document)
+        .where(
+            Document.canonical_id == canonical.id,
+            Document.extracted_text.is_(None),
+            canonical.extracted_text.is_not(None),
+        )
+        .values({field: getattr(canonical, field) for field in DUPLICATE_FIELDS})
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
@@ -0,0 +1,261 @@
+"""Concurrent download manager for Jmail and DOJ archives.
+
+One pooled `httpx.AsyncClient` is shared by a fixed set of download
+workers, with a per-host cap so one slow server can't hold every
+connection. Partial files (`*.part`) are resumed with HTTP Range requests
+guarded by `If-Range` (the ETag or Last-Modified the part was started
+from, kept in `*.part.validator`), so a changed file is fetched whole
+instead of spliced. Writes go through `aiofiles`, transient failures are retried with
+exponential backoff, and a JSON manifest records what is done so a rerun
+skips it.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from urllib.parse import urlsplit
+
+import aiofiles
+import httpx
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying; other 4xx responses fail immediately
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)")
+
+
+class ResumeMismatch(Exception):
+    """A ranged response doesn't continue the part file; it was discarded (retryable)."""
+
+
+def parse_content_range(value: str | None) -> tuple[int | None, int | None]:
+    """(first byte, total length) from a Content-Range header; None where unknown."""
+    match = CONTENT_RANGE.fullmatch((value or "").strip())
+    if not match:
+        return None, None
+    start, _, total = match.groups()
+    return (
+        int(start) if start is not None else None,
+        int(total) if total != "*" else None,
+    )
+
+
+def resume_validator(resp: httpx.Response) -> str | None:
+    """The value to send as `If-Range` when resuming this response's body.
+
+    Weak ETags may not be used with If-Range, so those fall back to
+    Last-Modified; without either the part can't be resumed safely.
+    """
+    etag = resp.headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return resp.headers.get("last-modified")
+
+
+@dataclass
+class ManifestEntry:
+    """Progress record for one URL."""
+
+    path: str
+    status: str  # 'done' or 'failed'
+    bytes: int = 0
+    error: str | None = None
+
+
+class DownloadManager:
+    """Download many URLs concurrently with resume, retries and a manifest.
+
+    Usage:
+        async with DownloadManager("data/manifest.json") as dm:
+            await dm.download_all([(url, "data/raw/doc.pdf"), ...])
+    """
+
+    def __init__(
+        self,
+        manifest_path: str,
+        concurrency: int | None = None,
+        per_host: int | None = None,
+        max_attempts: int | None = None,
+        base_delay: float = 1.0,
+        chunk_size: int = 1 << 20,
+    ):
+        settings = get_settings()
+        self.manifest_path = manifest_path
+        self.concurrency = concurrency or settings.download_concurrency
+        self.per_host = per_host or settings.download_per_host
+        self.max_attempts = max_attempts or settings.download_max_attempts
+        self.base_delay = base_delay
+        self.chunk_size = chunk_size
+        self.manifest: dict[str, ManifestEntry] = {}
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self._client: httpx.AsyncClient | None = None
+        self._dirty = 0
+
+    async def __aenter__(self) -> "DownloadManager":
+        self._load_manifest()
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+            ),
+            timeout=httpx.Timeout(60, connect=15),
+            follow_redirects=True,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+        self._save_manifest()
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = {url: ManifestEntry(**e) for url, e in json.load(f).items()}
+
+    def _save_manifest(self):
+        """Write the manifest atomically (temp file + rename)."""
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({url: asdict(e) for url, e in self.manifest.items()}, f)
+        os.replace(tmp, self.manifest_path)
+        self._dirty = 0
+
+    def _record(self, url: str, entry: ManifestEntry):
+        self.manifest[url] = entry
+        self._dirty += 1
+        if self._dirty >= 100:
+            self._save_manifest()
+
+    def is_done(self, url: str) -> bool:
+        entry = self.manifest.get(url)
+        return bool(entry and entry.status == "done" and os.path.exists(entry.path))
+
+    async def download_all(self, items: Iterable[tuple[str, str]]) -> dict[str, int]:
+        """Download (url, output_path) pairs; returns counts by outcome."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        counts = {"done": 0, "skipped": 0, "failed": 0}
+
+        async def worker():
+            while (item := await queue.get()) is not None:
+                url, output_path = item
+                try:
+                    if self.is_done(url):
+                        counts["skipped"] += 1
+                    elif await self.download(url, output_path):
+                        counts["done"] += 1
+                    else:
+                        counts["failed"] += 1
+                except Exception as e:
+                    # Keep the worker alive: a dead one would leave the producer
+                    # blocked on a full queue
+                    logger.exception(f"Failed to download {url}: {e}")
+                    self._record(url, ManifestEntry(output_path, "failed", error=str(e)))
+                    counts["failed"] += 1
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            for item in items:
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            self._save_manifest()
+
+        logger.info(
+            f"Downloads: {counts['done']} done, {counts['skipped']} skipped, "
+            f"{counts['failed']} failed"
+        )
+        return counts
+
+    async def download(self, url: str, output_path: str) -> bool:
+        """Download one URL, resuming and retrying as needed."""
+        host = urlsplit(url).netloc
+        semaphore = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                async with semaphore:
+                    size = await self._fetch(url, output_path)
+                self._record(url, ManifestEntry(output_path, "done", size))
+                return True
+            except (httpx.TransportError, httpx.HTTPStatusError, ResumeMismatch, OSError) as e:
+                if isinstance(e, httpx.HTTPStatusError):
+                    retryable = e.response.status_code in RETRY_STATUSES
+                else:
+                    retryable = isinstance(e, (httpx.TransportError, ResumeMismatch))
+                if not retryable or attempt == self.max_attempts:
+                    logger.error(f"Failed to download {url}: {e}")
+                    self._record(url, ManifestEntry(output_path, "failed", error=str(e)))
+                    return False
+                delay = self.base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                logger.warning(f"Retrying {url} in {delay:.1f}s (attempt {attempt}): {e}")
+                await asyncio.sleep(delay)
+        return False
+
+    async def _fetch(self, url: str, output_path: str) -> int:
+        """Stream `url` into `output_path`, resuming from `output_path.part`.
+
+        A part file is only resumed if its validator was recorded, and the
+        server's answer is checked: a 206 must start at the part's end, and
+        a 416 only means "complete" if the resource is exactly the part's
+        length. Anything else discards the part and raises `ResumeMismatch`.
+        """
+        part_path = f"{output_path}.part"
+        validator_path = f"{part_path}.validator"
+        validator = None
+        if os.path.exists(part_path) and os.path.exists(validator_path):
+            with open(validator_path) as f:
+                validator = f.read().strip() or None
+        offset = os.path.getsize(part_path) if validator else 0
+        headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset else {}
+
+        async with self._client.stream("GET", url, headers=headers) as resp:
+            start, total = parse_content_range(resp.headers.get("content-range"))
+            if resp.status_code == 416 and offset:
+                if total != offset:
+                    self._discard(part_path)
+                    raise ResumeMismatch(f"Range not satisfiable: {offset} of {total} bytes")
+                # The part already holds the whole resource
+            else:
+                resp.raise_for_status()
+                if resp.status_code == 206:
+                    if start != offset:
+                        self._discard(part_path)
+                        raise ResumeMismatch(f"Asked for byte {offset}, got {start}")
+                else:
+                    # Fresh start (or the file changed and If-Range sent it whole)
+                    offset = 0
+                    validator = resume_validator(resp)
+                    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                    if validator:
+                        with open(validator_path, "w") as f:
+                            f.write(validator)
+                    elif os.path.exists(validator_path):
+                        os.remove(validator_path)
+                async with aiofiles.open(part_path, "ab" if offset else "wb") as f:
+                    async for chunk in resp.aiter_bytes(chunk_size=self.chunk_size):
+                        await f.write(chunk)
+
+        os.replace(part_path, output_path)
+        if os.path.exists(validator_path):
+            os.remove(validator_path)
+        return os.path.getsize(output_path)
+
+    @staticmethod
+    def _discard(part_path: str):
+        """Drop a part file that can't be resumed, so the retry starts over."""
+        for path in (part_path, f"{part_path}.validator"):
+            if os.path.exists(path):
+                os.remove(path)
@@ -1,14 +1,35 @@
 """Jmail archive scraper — index and download from jmail.world."""
 
+import asyncio
+import json
 import logging
-from dataclasses import dataclass
+import os
+import re
+from collections.abc import AsyncIterator
+from dataclasses import asdict, dataclass
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlencode, urljoin, urlsplit
+from uuid import uuid4
 
+import aiofiles
 import httpx
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Document
+from src.ingest.downloader import DownloadManager
+from src.ingest.local import detect_doc_type, detect_source, import_files
 
 logger = logging.getLogger(__name__)
 
 JMAIL_BASE = "https://jmail.world"
 JMAIL_DRIVE = f"{JMAIL_BASE}/drive"
+EFTA_ID = re.compile(r"EFTA\d+", re.IGNORECASE)
+
+# Where crawled PDFs are downloaded, and the download progress manifest
+DOWNLOAD_DIR = "data/raw/jmail"
+MANIFEST_PATH = "data/raw/jmail/manifest.json"
 
 
 @dataclass
@@ -23,26 +44,280 @@ class JmailDocument:
     page_count: int | None = None
 
 
+class IndexPageParser(HTMLParser):
+    """Incremental parser for one listing page.
+
+    Fed chunks as they arrive; every `<a href>` pointing at a PDF becomes a
+    `JmailDocument`. Entries are collected in `documents`.
+
+    Note: the listing markup is inferred from the public browse pages —
+    links to `.pdf` files named after their EFTA id.
+    """
+
+    def __init__(self, base_url: str, dataset: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.dataset = dataset
+        self.documents: list[JmailDocument] = []
+        self._seen: set[str] = set()
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]):
+        if tag != "a":
+            return
+        attrs = dict(attrs)
+        href = attrs.get("href")
+        if not href or not urlsplit(href).path.lower().endswith(".pdf"):
+            return
+        url = urljoin(self.base_url, href)
+        if url in self._seen:
+            return
+        self._seen.add(url)
+
+        filename = unquote(urlsplit(url).path.rsplit("/", 1)[-1])
+        match = EFTA_ID.search(filename)
+        pages = attrs.get("data-pages") or ""
+        self.documents.append(
+            JmailDocument(
+                efta_id=match.group(0).upper() if match else filename.rsplit(".", 1)[0],
+                filename=filename,
+                source=attrs.get("data-source") or detect_source(url),
+                dataset=self.dataset,
+                url=url,
+                page_count=int(pages) if pages.isdigit() else None,
+            )
+        )
+
+
+class IndexCache:
+    """Conditional-request cache for listing pages (ETag / Last-Modified).
+
+    Stores each page's validators and parsed entries as JSON lines, so a
+    re-crawl transfers only pages that changed and an interrupted crawl
+    resumes cheaply. `save()` appends only the pages stored since the last
+    save; the last line for a URL wins, and the file is compacted on load
+    once superseded lines outnumber live ones.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pages: dict[str, dict] = {}
+        self._unsaved: list[str] = []
+        if os.path.exists(path):
+            lines = 0
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.pages[entry.pop("url")] = entry
+                        lines += 1
+            if lines > 2 * len(self.pages):
+                self._compact()
+
+    def headers(self, url: str) -> dict[str, str]:
+        entry = self.pages.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def documents(self, url: str) -> list[JmailDocument]:
+        return [JmailDocument(**d) for d in self.pages[url]["documents"]]
+
+    def store(self, url: str, resp: httpx.Response, documents: list[JmailDocument]):
+        self.pages[url] = {
+            "etag": resp.headers.get("etag"),
+            "last_modified": resp.headers.get("last-modified"),
+            "documents": [asdict(d) for d in documents],
+        }
+        self._unsaved.append(json.dumps({"url": url, **self.pages[url]}))
+
+    def save(self):
+        """Append pages stored since the last save."""
+        if not self._unsaved:
+            return
+        lines, self._unsaved = self._unsaved, []
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _compact(self):
+        """Rewrite the file with one line per page (temp file + rename)."""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            for url, entry in self.pages.items():
+                f.write(json.dumps({"url": url, **entry}) + "\n")
+        os.replace(tmp, self.path)
+
+
+def index_url(dataset: str, offset: int, limit: int) -> str:
+    """Listing page URL for one slice of a dataset."""
+    return f"{JMAIL_DRIVE}?{urlencode({'dataset': dataset, 'offset': offset, 'limit': limit})}"
+
+
 async def fetch_document_index(
     client: httpx.AsyncClient,
     dataset: str = "1",
     offset: int = 0,
     limit: int = 100,
-) -> list[dict]:
-    """Fetch document index from Jmail API.
+    cache: IndexCache | None = None,
+) -> list[JmailDocument]:
+    """Fetch and parse one listing page of a dataset.
 
-    Note: This is a placeholder — the actual Jmail API structure
-    needs to be discovered by inspecting their frontend requests.
+    The page is parsed while it streams in. With a `cache`, unchanged pages
+    come back as 304 and are answered from it.
     """
-    # Try the browsable interface
-    url = f"{JMAIL_DRIVE}"
+    url = index_url(dataset, offset, limit)
+    headers = cache.headers(url) if cache else {}
+    parser = IndexPageParser(url, dataset)
     try:
-        resp = await client.get(url, timeout=30)
-        resp.raise_for_status()
-        return resp.text  # Parse HTML to extract document links
+        async with client.stream("GET", url, headers=headers, timeout=30) as resp:
+            if resp.status_code == 304 and cache:
+                return cache.documents(url)
+            resp.raise_for_status()
+            async for chunk in resp.aiter_text():
+                parser.feed(chunk)
+            parser.close()
     except httpx.HTTPError as e:
-        logger.error(f"Failed to fetch Jmail index: {e}")
-        return []
+        logger.error(f"Failed to fetch Jmail index {url}: {e}")
+        raise
+
+    if cache:
+        cache.store(url, resp, parser.documents)
+    return parser.documents
+
+
+async def crawl_index(
+    client: httpx.AsyncClient,
+    datasets: list[str],
+    cache: IndexCache | None = None,
+    page_size: int = 100,
+    concurrency: int = 8,
+) -> AsyncIterator[JmailDocument]:
+    """Yield every document listed in `datasets`.
+
+    Fetches `concurrency` pages of a dataset at a time and moves to the
+    next dataset after the first short page. Pages are yielded in order.
+    """
+    for dataset in datasets:
+        offset = 0
+        done = False
+        while not done:
+            offsets = [offset + i * page_size for i in range(concurrency)]
+            pages = await asyncio.gather(
+                *(fetch_document_index(client, dataset, o, page_size, cache) for o in offsets)
+            )
+            for documents in pages:
+                for document in documents:
+                    yield document
+                if len(documents) < page_size:
+                    done = True
+                    break
+            offset += concurrency * page_size
+            if cache:
+                await asyncio.to_thread(cache.save)
+        logger.info(f"Crawled Jmail dataset {dataset}")
+
+
+def download_path(download_dir: str, document: JmailDocument) -> str:
+    """Where a crawled document's PDF is saved (and its `source_path`)."""
+    return os.path.join(download_dir, document.dataset, document.filename)
+
+
+async def import_index(
+    db: AsyncSession,
+    documents: AsyncIterator[JmailDocument],
+    download_dir: str = DOWNLOAD_DIR,
+    batch_size: int = 1000,
+) -> int:
+    """Create Document records for crawled index entries.
+
+    Each entry's `source_path` is the file it will be downloaded to and its
+    `blob_url` the remote PDF. Re-crawls only add new entries (conflicts on
+    `source_path` are skipped). Documents stay `indexed` until
+    `download_indexed` fetches and imports them.
+    Returns the number of documents created.
+    """
+    created = 0
+    batch: list[dict] = []
+
+    async def flush():
+        nonlocal created
+        stmt = (
+            pg_insert(Document)
+            .values(batch)
+            .on_conflict_do_nothing(index_elements=["source_path"])
+            .returning(Document.id)
+        )
+        created += len((await db.execute(stmt)).all())
+        await db.commit()
+        batch.clear()
+
+    async for document in documents:
+        batch.append({
+            "id": uuid4(),
+            "source": document.source,
+            "source_path": download_path(download_dir, document),
+            "filename": document.filename,
+            "blob_url": document.url,
+            "doc_type": detect_doc_type(document.filename),
+            "page_count": document.page_count,
+            "metadata_": {"efta_id": document.efta_id, "dataset": document.dataset},
+            "processing_status": "indexed",
+        })
+        if len(batch) >= batch_size:
+            await flush()
+            logger.info(f"Indexed {created} new Jmail documents...")
+    if batch:
+        await flush()
+
+    logger.info(f"Jmail index import complete: {created} new documents")
+    return created
+
+
+async def download_indexed(
+    db: AsyncSession,
+    manifest_path: str = MANIFEST_PATH,
+    batch_size: int = 1000,
+) -> int:
+    """Download `indexed` documents and hand them to the local importer.
+
+    Works through the indexed rows in id order, `batch_size` at a time:
+    `DownloadManager` fetches each `blob_url` to its `source_path`, and the
+    downloaded files go through `import_files`, which hashes them, links
+    duplicates and queues their first processing stage. Failed downloads
+    stay `indexed` for the next run. Returns the number of files downloaded.
+    """
+    downloaded = 0
+    last_id = None
+    async with DownloadManager(manifest_path) as dm:
+        while True:
+            query = select(Document.id, Document.blob_url, Document.source_path).where(
+                Document.processing_status == "indexed"
+            )
+            if last_id is not None:
+                query = query.where(Document.id > last_id)
+            rows = (await db.execute(query.order_by(Document.id).limit(batch_size))).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            await dm.download_all([(row.blob_url, row.source_path) for row in rows])
+            files = [
+                (row.source_path, os.path.getsize(row.source_path),
+                 os.path.getmtime(row.source_path), None)
+                for row in rows
+                if dm.is_done(row.blob_url)
+            ]
+            if files:
+                await import_files(db, iter(files), None, "Jmail downloads")
+            downloaded += len(files)
+
+    logger.info(f"Jmail downloads complete: {downloaded} documents queued for processing")
+    return downloaded
 
 
 async def download_document(
@@ -50,13 +325,17 @@ async def download_document(
     doc_url: str,
     output_path: str,
 ) -> bool:
-    """Download a single document from Jmail or DOJ."""
+    """Download a single document from Jmail or DOJ.
+
+    For bulk pulls use `src.ingest.downloader.DownloadManager`, which adds
+    concurrency, resume and retries.
+    """
     try:
         async with client.stream("GET", doc_url, timeout=60) as resp:
             resp.raise_for_status()
-            with open(output_path, "wb") as f:
-                async for chunk in resp.aiter_bytes(chunk_size=8192):
-                    f.write(chunk)
+            async with aiofiles.open(output_path, "wb") as f:
+                async for chunk in resp.aiter_bytes(chunk_size=1 << 20):
+                    await f.write(chunk)
         return True
     except httpx.HTTPError as e:
         logger.error(f"Failed to download {doc_url}: {e}")
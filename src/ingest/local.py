@@ -1,15 +1,33 @@
-"""Local file importer — bulk import PDFs from a local directory."""
+"""Local file importer — bulk import PDFs from a local directory or archive."""
 
+import asyncio
 import logging
-from pathlib import Path
-from uuid import uuid4
+import os
+from collections.abc import Iterator
+from itertools import islice
+from uuid import UUID, uuid4
 
+from sqlalchemy import Row, delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models import Document, ProcessingJob
+from src.config import get_settings
+from src.db.models import Document, Embedding
+from src.ingest.archive import iter_archive, member_path, split_member_path
+from src.ingest.dedup import find_canonical_ids, hash_file, sync_new_duplicates
+from src.ingest.storage import blob_key, get_blob_store, store_file
+from src.nlp.ner import remove_mentions
+from src.nlp.redaction_stats import remove_redaction_stats
+from src.worker.claims import enqueue_job_rows
+from src.worker.queue import get_queue
+from src.worker.stages import stage_priority
 
 logger = logging.getLogger(__name__)
 
+EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png", ".tiff", ".txt"}
+
+# Files copied into the blob store at once when Settings.blob_upload is on
+UPLOAD_CONCURRENCY = 8
+
 # Source detection by path patterns
 SOURCE_PATTERNS = {
     "doj": ["doj", "dataset", "justice.gov", "efta"],
@@ -43,62 +61,292 @@ def detect_doc_type(filename: str) -> str:
     return "unknown"
 
 
+def iter_files(directory: str, recursive: bool = True) -> Iterator[tuple[str, int, float]]:
+    """Lazily walk a directory with `os.scandir`, yielding (path, size, mtime).
+
+    Only the directories still to visit are held in memory, never the
+    full file list.
+    """
+    pending = [directory]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        pending.append(entry.path)
+                elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in EXTENSIONS:
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+
+def first_job(document_id: UUID, doc_type: str) -> dict:
+    """Processing job row for a document's first stage."""
+    # PDFs get the fused text + redaction stage; images have no text layer
+    job_type = {"pdf": "pdf_analyze", "image": "ocr"}.get(doc_type, "extract_text")
+    return {
+        "id": uuid4(),
+        "document_id": document_id,
+        "job_type": job_type,
+        "priority": stage_priority(job_type),
+    }
+
+
+async def find_known_files(db: AsyncSession, paths: list[str]) -> dict[str, Row]:
+    """Existing documents for `paths` (one probe of the unique source_path index)."""
+    rows = await db.execute(
+        select(
+            Document.source_path,
+            Document.id,
+            Document.file_size,
+            Document.file_mtime,
+            Document.content_sha256,
+            Document.doc_type,
+        ).where(Document.source_path.in_(paths))
+    )
+    return {row.source_path: row for row in rows.all()}
+
+
+async def find_archive_members(
+    db: AsyncSession, archive_path: str
+) -> dict[str, tuple[int, float]]:
+    """(size, mtime) of every already-imported member of an archive, by source_path."""
+    rows = await db.execute(
+        select(Document.source_path, Document.file_size, Document.file_mtime).where(
+            Document.source_path.startswith(member_path(archive_path, ""), autoescape=True)
+        )
+    )
+    return {path: (size, mtime) for path, size, mtime in rows.all()}
+
+
+async def reset_outputs(db: AsyncSession, document_ids: list[UUID]):
+    """Drop entity mentions, embeddings and redaction stats of documents whose content changed.
+
+    A changed document that became a duplicate must stop counting in the
+    redaction aggregates; the others are counted again when re-analyzed.
+    """
+    await remove_mentions(db, document_ids)
+    await remove_redaction_stats(db, document_ids)
+    await db.execute(delete(Embedding).where(Embedding.document_id.in_(document_ids)))
+
+
+async def promote_orphaned_duplicates(db: AsyncSession, document_ids: list[UUID]) -> list[dict]:
+    """Re-link duplicates of documents whose content changed.
+
+    The oldest duplicate of each group becomes the new canonical document
+    and gets a first-stage job; the rest point at it. Returns the job rows.
+    """
+    rows = (
+        await db.execute(
+            select(Document.id, Document.canonical_id, Document.doc_type)
+            .where(Document.canonical_id.in_(document_ids))
+            .order_by(Document.created_at)
+        )
+    ).all()
+
+    promoted: dict[UUID, UUID] = {}  # old canonical -> new canonical
+    updates = []
+    jobs = []
+    for doc_id, old_canonical, doc_type in rows:
+        new_canonical = promoted.setdefault(old_canonical, doc_id)
+        if new_canonical == doc_id:
+            updates.append({"id": doc_id, "canonical_id": None, "processing_status": "pending"})
+            jobs.append(first_job(doc_id, doc_type))
+        else:
+            updates.append({"id": doc_id, "canonical_id": new_canonical})
+
+    if updates:
+        await db.execute(update(Document), updates)
+    return jobs
+
+
+async def upload_files(files: list[tuple[str, str]], concurrency: int = UPLOAD_CONCURRENCY):
+    """Copy (source_path, sha256) pairs into the blob store.
+
+    Plain files go `concurrency` at a time. Members of one archive go one
+    after another in the order given (archive order on import), so a
+    compressed TAR is read in one forward pass instead of being restarted
+    for members behind its stream.
+    """
+    groups: dict[str, list[tuple[str, str]]] = {}
+    for path, content_hash in files:
+        archive_path, member = split_member_path(path)
+        groups.setdefault(path if member is None else archive_path, []).append(
+            (path, content_hash)
+        )
+    limit = asyncio.Semaphore(concurrency)
+
+    async def upload(group: list[tuple[str, str]]):
+        async with limit:
+            for path, content_hash in group:
+                await store_file(path, content_hash)
+
+    await asyncio.gather(*(upload(group) for group in groups.values()))
+
+
 async def import_directory(
     directory: str,
     db: AsyncSession,
     source: str | None = None,
     recursive: bool = True,
+    dataset: str | None = None,
 ) -> int:
-    """Import all supported files from a local directory.
+    """Import new and changed files from a local directory.
 
-    Creates Document records and queues processing jobs.
-    Returns the number of documents imported.
+    Paths are stored absolute, however the directory was spelled, so
+    re-imports find the existing documents. Files already imported with the
+    same size and mtime are skipped without being read. `dataset` is
+    recorded in each new document's metadata (otherwise the redaction stats
+    read it from the path). Returns the number of new documents imported.
     """
-    dir_path = Path(directory)
-    if not dir_path.is_dir():
+    directory = os.path.abspath(directory)
+    if not os.path.isdir(directory):
         raise ValueError(f"Not a directory: {directory}")
 
-    extensions = {".pdf", ".jpg", ".jpeg", ".png", ".tiff", ".txt"}
-    pattern = "**/*" if recursive else "*"
-    files = [
-        f for f in dir_path.glob(pattern) if f.is_file() and f.suffix.lower() in extensions
-    ]
+    files = ((path, size, mtime, None) for path, size, mtime in iter_files(directory, recursive))
+    return await import_files(db, files, source, directory, dataset)
+
+
+async def import_archive(
+    archive_path: str,
+    db: AsyncSession,
+    source: str | None = None,
+    dataset: str | None = None,
+) -> int:
+    """Import supported members of a ZIP or TAR archive without unpacking it.
+
+    Members get `archive!/member` source paths and are hashed while the
+    archive streams past — except members already imported with the same
+    size and mtime, which are skipped unread. `dataset` is recorded as in
+    `import_directory`. Returns the number of new documents imported.
+    """
+    archive_path = os.path.abspath(archive_path)
+    if not os.path.isfile(archive_path):
+        raise ValueError(f"Not a file: {archive_path}")
+
+    known = await find_archive_members(db, archive_path)
+    files = iter_archive(archive_path, EXTENSIONS, known)
+    return await import_files(db, files, source, archive_path, dataset)
+
+
+async def import_files(
+    db: AsyncSession,
+    files: Iterator[tuple[str, int, float, str | None]],
+    source: str | None,
+    origin: str,
+    dataset: str | None = None,
+) -> int:
+    """Import (source_path, size, mtime, sha256 or None) entries in batches.
 
+    Works through `Settings.import_batch_size` entries at a time. Entries
+    already imported with the same size and mtime are skipped; the rest are
+    hashed concurrently (unless the hash is given), then written with
+    multi-row INSERTs / bulk UPDATEs and committed per batch. With
+    `Settings.blob_upload`, new content is copied into the blob store
+    first. Changed files lose their old entities and embeddings and are
+    re-queued. Files whose content hash matches an already-imported
+    document are linked to it as duplicates and get no jobs of their own.
+    Returns the number of new documents imported.
+    """
+    settings = get_settings()
+    batch_size = settings.import_batch_size
+    store = get_blob_store() if settings.blob_upload else None
     imported = 0
-    for file_path in files:
-        file_source = source or detect_source(str(file_path))
-        doc_type = detect_doc_type(file_path.name)
-
-        doc = Document(
-            source=file_source,
-            source_path=str(file_path),
-            filename=file_path.name,
-            doc_type=doc_type,
-            processing_status="pending",
+    changed = 0
+    unchanged = 0
+    duplicates = 0
+
+    while batch := await asyncio.to_thread(list, islice(files, batch_size)):
+        known = await find_known_files(db, [path for path, _, _, _ in batch])
+        todo = []
+        for path, size, mtime, content_hash in batch:
+            row = known.get(path)
+            if row and (row.file_size, row.file_mtime) == (size, mtime):
+                unchanged += 1
+            else:
+                todo.append((path, size, mtime, content_hash))
+        if not todo:
+            continue
+
+        unhashed = [path for path, _, _, content_hash in todo if content_hash is None]
+        computed = iter(
+            await asyncio.gather(*(asyncio.to_thread(hash_file, path) for path in unhashed))
         )
-        db.add(doc)
-        await db.flush()
+        hashes = [content_hash or next(computed) for _, _, _, content_hash in todo]
+        # Earlier batches are committed, so the lookup covers them too
+        canonical_ids = await find_canonical_ids(db, list(set(hashes)))
+
+        new_rows = []
+        changed_rows = []
+        job_rows = []
+        uploads: dict[str, str] = {}  # content hash -> path, one upload per new content
+        for (path, size, mtime, _), content_hash in zip(todo, hashes, strict=True):
+            row = known.get(path)
+            if row and row.content_sha256 == content_hash:
+                # Touched but identical — only refresh the fingerprint
+                changed_rows.append({"id": row.id, "file_size": size, "file_mtime": mtime})
+                continue
+
+            doc_id = row.id if row else uuid4()
+            doc_type = row.doc_type if row else detect_doc_type(path)
+            canonical_id = canonical_ids.get(content_hash)
+            doc_row = {
+                "id": doc_id,
+                "file_size": size,
+                "file_mtime": mtime,
+                "content_sha256": content_hash,
+                "canonical_id": canonical_id,
+                "processing_status": "duplicate" if canonical_id else "pending",
+            }
+            if store:
+                doc_row["blob_url"] = store.url(blob_key(content_hash))
+
+            if canonical_id:
+                duplicates += 1
+            else:
+                canonical_ids[content_hash] = doc_id
+                job_rows.append(first_job(doc_id, doc_type))
+                uploads[content_hash] = path
 
-        # Queue processing jobs
-        job_types = ["extract_text"]
-        if doc_type == "pdf":
-            job_types.append("detect_redaction")
+            if row:
+                # Cleared so a duplicate picks up its canonical's text
+                changed_rows.append({**doc_row, "extracted_text": None, "page_offsets": None})
+            else:
+                new_rows.append({
+                    **doc_row,
+                    "source": source or detect_source(path),
+                    "source_path": path,
+                    "filename": os.path.basename(split_member_path(path)[1] or path),
+                    "doc_type": doc_type,
+                    "metadata_": {"dataset": dataset} if dataset else {},
+                })
 
-        for i, job_type in enumerate(job_types):
-            job = ProcessingJob(
-                document_id=doc.id,
-                job_type=job_type,
-                priority=5 + i,  # Text extraction first, then redaction
-            )
-            db.add(job)
+        if store and uploads:
+            await upload_files([(path, h) for h, path in uploads.items()])
 
-        imported += 1
+        if new_rows:
+            await db.execute(insert(Document), new_rows)
+        if changed_rows:
+            await db.execute(update(Document), changed_rows)
+            content_changed = [r["id"] for r in changed_rows if "content_sha256" in r]
+            if content_changed:
+                await reset_outputs(db, content_changed)
+                job_rows += await promote_orphaned_duplicates(db, content_changed)
+        queued = await enqueue_job_rows(db, job_rows) if job_rows else []
+        await db.commit()
+        try:
+            await get_queue().publish(queued)
+        except Exception:
+            # The rows are committed; the queue backend's reclaim pass republishes them
+            logger.exception(f"Failed to publish {len(queued)} jobs")
 
-        # Batch commit every 100 documents
-        if imported % 100 == 0:
-            await db.commit()
-            logger.info(f"Imported {imported} documents...")
+        imported += len(new_rows)
+        changed += len(changed_rows)
+        logger.info(f"Imported {imported} new and {changed} changed documents...")
 
+    await sync_new_duplicates(db)
     await db.commit()
-    logger.info(f"Import complete: {imported} documents from {directory}")
+    logger.info(
+        f"Import complete: {imported} new ({duplicates} duplicates), {changed} changed, "
+        f"{unchanged} unchanged documents from {origin}"
+    )
     return imported
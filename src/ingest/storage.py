@@ -0,0 +1,367 @@
+"""Blob storage for original documents — local filesystem or Azure Blob.
+
+Blobs are content-addressed: a document's bytes live under its SHA-256
+(`ab/cd/abcd…`), so duplicates share one blob and a key never goes stale.
+Workers that can't see the original file fetch the blob into a bounded
+on-disk LRU cache, so the several stages that read one document download
+it once; a cached blob is pinned while a stage reads it, so eviction
+never deletes a file a pool process is about to open.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from collections.abc import AsyncIterable, AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from typing import BinaryIO
+
+import aiofiles
+
+from src.config import get_settings
+from src.db.models import Document
+from src.ingest.archive import read_member, split_member_path
+
+logger = logging.getLogger(__name__)
+
+# Bytes per read when streaming a blob
+CHUNK_SIZE = 1 << 20
+
+
+def blob_key(content_sha256: str) -> str:
+    """Content-addressed blob key, fanned out over two directory levels."""
+    return f"{content_sha256[:2]}/{content_sha256[2:4]}/{content_sha256}"
+
+
+class BlobStore(ABC):
+    """Key/value store for document bytes."""
+
+    async def close(self):  # noqa: B027 — optional hook
+        """Release connections."""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes | BinaryIO):
+        """Store bytes or a binary file's contents under `key` (no-op if already present)."""
+
+    @abstractmethod
+    async def read(self, key: str, offset: int = 0, length: int | None = None) -> bytes:
+        """Read a blob, or `length` bytes of it from `offset`."""
+
+    async def chunks(self, key: str) -> AsyncIterator[bytes]:
+        """Stream a blob, so it can be copied without holding it in memory."""
+        yield await self.read(key)
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether `key` is stored."""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Location of a blob, for `Document.blob_url`.
+
+        Not a browser link: the web app serves blobs at /docs/{id}/original.
+        """
+
+    def local_path(self, key: str) -> str | None:
+        """Path of the blob on this machine, if it is readable in place."""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under a root directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    async def put(self, key: str, data: bytes | BinaryIO):
+        path = self.local_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        await asyncio.to_thread(self._write, tmp, data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _write(path: str, data: bytes | BinaryIO):
+        with open(path, "wb") as f:
+            if isinstance(data, bytes):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f, 1 << 20)
+
+    async def read(self, key: str, offset: int = 0, length: int | None = None) -> bytes:
+        async with aiofiles.open(self.local_path(key), "rb") as f:
+            await f.seek(offset)
+            return await f.read(-1 if length is None else length)
+
+    async def chunks(self, key: str) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.local_path(key), "rb") as f:
+            while chunk := await f.read(CHUNK_SIZE):
+                yield chunk
+
+    async def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    def url(self, key: str) -> str:
+        return f"local://{key}"
+
+
+class AzureBlobStore(BlobStore):
+    """Azure Blob Storage container. Works against Azurite with `UseDevelopmentStorage=true`."""
+
+    def __init__(self, connection_string: str, container: str):
+        self.connection_string = connection_string
+        self.container = container
+        self._client = None
+
+    async def _container(self):
+        if self._client is None:
+            from azure.core.exceptions import ResourceExistsError
+            from azure.storage.blob.aio import ContainerClient
+
+            self._client = ContainerClient.from_connection_string(
+                self.connection_string, self.container
+            )
+            try:
+                await self._client.create_container()
+            except ResourceExistsError:
+                pass
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def put(self, key: str, data: bytes | BinaryIO):
+        from azure.core.exceptions import ResourceExistsError
+
+        container = await self._container()
+        try:
+            await container.upload_blob(key, data, overwrite=False)
+        except ResourceExistsError:
+            pass  # Content-addressed: same key, same bytes
+
+    async def read(self, key: str, offset: int = 0, length: int | None = None) -> bytes:
+        container = await self._container()
+        stream = await container.download_blob(key, offset=offset or None, length=length)
+        return await stream.readall()
+
+    async def chunks(self, key: str) -> AsyncIterator[bytes]:
+        container = await self._container()
+        stream = await container.download_blob(key)
+        async for chunk in stream.chunks():
+            yield chunk
+
+    async def exists(self, key: str) -> bool:
+        container = await self._container()
+        return await container.get_blob_client(key).exists()
+
+    def url(self, key: str) -> str:
+        return f"azure://{self.container}/{key}"
+
+
+class BlobCache:
+    """Bounded on-disk LRU cache of blobs.
+
+    Recency is kept in memory (seeded from file mtimes at startup); once
+    the cache grows past `max_bytes` the least recently used files are
+    deleted — except pinned ones (`pin`/`unpin`), which are in use and
+    are evicted once released. The cache can stay over budget while many
+    blobs are pinned.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()  # key -> size, oldest first
+        self._size = 0
+        self._pins: Counter[str] = Counter()
+        self._load()
+
+    def _load(self):
+        files = []
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, os.path.relpath(path, self.directory), stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> str | None:
+        """Path of a cached blob (marking it recently used), or None."""
+        if key not in self._entries:
+            return None
+        path = self.path(key)
+        if not os.path.exists(path):
+            self._size -= self._entries.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        os.utime(path)
+        return path
+
+    async def add(self, key: str, data: bytes | AsyncIterable[bytes]) -> str:
+        """Write a blob (bytes or streamed chunks) into the cache and evict down to `max_bytes`."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        size = 0
+        try:
+            async with aiofiles.open(tmp, "wb") as f:
+                if isinstance(data, bytes):
+                    size = await f.write(data)
+                else:
+                    async for chunk in data:
+                        size += await f.write(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            # Failed or cancelled mid-download: don't leave a partial file behind
+            with suppress(FileNotFoundError):
+                os.remove(tmp)
+            raise
+
+        self._size -= self._entries.pop(key, 0)
+        self._entries[key] = size
+        self._size += size
+        self._evict()
+        return path
+
+    def pin(self, key: str):
+        """Keep `key` from being evicted until a matching `unpin`."""
+        self._pins[key] += 1
+
+    def unpin(self, key: str):
+        self._pins[key] -= 1
+        if self._pins[key] <= 0:
+            del self._pins[key]
+            self._evict()
+
+    def _evict(self):
+        # The newest entry was just written for a caller that is about to read it
+        for key in list(self._entries)[:-1]:
+            if self._size <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            self._size -= self._entries.pop(key)
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+
+_store: BlobStore | None = None
+_cache: BlobCache | None = None
+_fetching: dict[str, asyncio.Future] = {}
+
+
+def get_blob_store() -> BlobStore:
+    """Lazy-create the configured blob store (`Settings.blob_backend`)."""
+    global _store
+    if _store is None:
+        settings = get_settings()
+        if settings.blob_backend == "local":
+            _store = LocalBlobStore(settings.blob_root)
+        elif settings.blob_backend == "azure":
+            if not settings.azure_storage_connection_string:
+                raise ValueError("BLOB_BACKEND=azure requires AZURE_STORAGE_CONNECTION_STRING")
+            _store = AzureBlobStore(
+                settings.azure_storage_connection_string, settings.azure_storage_container
+            )
+        else:
+            raise ValueError(f"Unknown blob backend: {settings.blob_backend}")
+    return _store
+
+
+def get_blob_cache() -> BlobCache:
+    """Lazy-create the on-disk blob cache."""
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = BlobCache(settings.blob_cache_dir, settings.blob_cache_max_bytes)
+    return _cache
+
+
+async def store_file(source_path: str, content_sha256: str) -> str:
+    """Copy a file or archive member into the blob store; returns its blob URL."""
+    store = get_blob_store()
+    key = blob_key(content_sha256)
+    if not await store.exists(key):
+        archive_path, member = split_member_path(source_path)
+        if member is None:
+            with open(source_path, "rb") as f:
+                await store.put(key, f)
+        else:
+            await store.put(key, await asyncio.to_thread(read_member, archive_path, member))
+    return store.url(key)
+
+
+@asynccontextmanager
+async def fetch_source(doc: Document) -> AsyncIterator[str]:
+    """A locally readable path for a document's PDF, for `open_pdf`.
+
+    Uses `source_path` when this machine can see it, otherwise the blob —
+    read in place from a local store, or downloaded once into the LRU cache
+    (concurrent requests for the same blob share one download). A cached
+    file stays pinned until the `async with` block exits:
+
+        async with fetch_source(doc) as path:
+            result = await run_in_pool(analyze, path)
+    """
+    archive_path, _ = split_member_path(doc.source_path)
+    if os.path.exists(archive_path) or not doc.content_sha256:
+        yield doc.source_path
+        return
+
+    key = blob_key(doc.content_sha256)
+    store = get_blob_store()
+    if path := store.local_path(key):
+        yield path
+        return
+
+    cache = get_blob_cache()
+    cache.pin(key)
+    try:
+        yield await _download(store, cache, key)
+    finally:
+        cache.unpin(key)
+
+
+async def _download(store: BlobStore, cache: BlobCache, key: str) -> str:
+    """Path of a blob in the cache, downloading it once if missing."""
+    if path := cache.get(key):
+        return path
+    if key in _fetching:
+        return await asyncio.shield(_fetching[key])
+
+    future = asyncio.get_running_loop().create_future()
+    _fetching[key] = future
+    try:
+        path = await cache.add(key, store.chunks(key))
+        future.set_result(path)
+        return path
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved when nobody else is waiting
+        raise
+    finally:
+        del _fetching[key]
+
+
+async def close_blob_store():
+    """Close the blob store's connections."""
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
@@ -1,12 +1,16 @@
 """Document chunk embedding generation using sentence-transformers."""
 
+import asyncio
 import logging
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models import Document, Embedding
+from src.db.models import Embedding
+from src.db.session import load_document
+from src.worker.batcher import RequestBatcher
+from src.worker.pool import run_in_pool
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +23,7 @@ def get_model():
     global _model
     if _model is None:
         from sentence_transformers import SentenceTransformer
+
         from src.config import get_settings
 
         settings = get_settings()
@@ -39,6 +44,83 @@ def chunk_text(text: str, chunk_size: int = 512, overlap: int = 64) -> list[str]
     return chunks
 
 
+def encode_chunks(chunks: list[str], batch_size: int = 32) -> list[list[float]]:
+    """Encode text chunks to vectors (runs in the worker process pool)."""
+    model = get_model()
+    vectors = model.encode(chunks, show_progress_bar=False, batch_size=batch_size)
+    return [vector.tolist() for vector in vectors]
+
+
+class EmbeddingBatcher(RequestBatcher):
+    """Pools chunks from many concurrent `embed` jobs into large encoder batches.
+
+    Most documents are short emails with one or two chunks, so encoding per
+    document leaves the model running tiny batches. Requests are buffered
+    until `batch_size` chunks are pending or `timeout` seconds pass; the
+    buffered chunks are then length-sorted (so each model batch pads to
+    similar lengths), split into `batch_size` slices that encode in
+    parallel in the process pool, and the vectors are routed back to each
+    caller in its original order.
+    """
+
+    def __init__(self, batch_size: int = 256, timeout: float = 0.05, model_batch_size: int = 32):
+        super().__init__(batch_size, timeout)
+        self.model_batch_size = model_batch_size
+
+    async def encode(self, chunks: list[str]) -> list[list[float]]:
+        """Encode `chunks`, sharing model batches with other callers."""
+        if not chunks:
+            return []
+        return await self.submit(chunks)
+
+    def size(self, chunks: list[str]) -> int:
+        return len(chunks)
+
+    async def run(self, requests: list[list[str]]) -> list[list[list[float]]]:
+        texts = [text for chunks in requests for text in chunks]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        sorted_texts = [texts[i] for i in order]
+
+        slices = await asyncio.gather(
+            *(
+                run_in_pool(
+                    encode_chunks,
+                    sorted_texts[i : i + self.batch_size],
+                    self.model_batch_size,
+                )
+                for i in range(0, len(sorted_texts), self.batch_size)
+            )
+        )
+
+        vectors: list[list[float] | None] = [None] * len(texts)
+        for position, vector in zip(order, (v for s in slices for v in s), strict=True):
+            vectors[position] = vector
+
+        results = []
+        start = 0
+        for chunks in requests:
+            results.append(vectors[start : start + len(chunks)])
+            start += len(chunks)
+        return results
+
+
+_batcher: EmbeddingBatcher | None = None
+
+
+def get_batcher() -> EmbeddingBatcher:
+    """Lazy-create the shared embedding batcher."""
+    global _batcher
+    if _batcher is None:
+        from src.config import get_settings
+
+        settings = get_settings()
+        _batcher = EmbeddingBatcher(
+            batch_size=settings.embedding_batch_size,
+            timeout=settings.embedding_batch_timeout,
+        )
+    return _batcher
+
+
 async def generate_embeddings(document_id: UUID, db: AsyncSession):
     """Job handler: generate embeddings for document text chunks.
 
@@ -48,19 +130,12 @@ async def generate_embeddings(document_id: UUID, db: AsyncSession):
 
     settings = get_settings()
 
-    doc = (await db.execute(select(Document).where(Document.id == document_id))).scalar_one()
+    doc = await load_document(db, document_id)
 
     if not doc.extracted_text:
         logger.warning(f"Doc {document_id}: no extracted text, skipping embeddings")
         return
 
-    # Delete existing embeddings for this document (re-processing)
-    existing = await db.execute(
-        select(Embedding).where(Embedding.document_id == document_id)
-    )
-    for emb in existing.scalars().all():
-        await db.delete(emb)
-
     # Chunk the text
     chunks = chunk_text(doc.extracted_text, settings.chunk_size, settings.chunk_overlap)
 
@@ -68,17 +143,17 @@ async def generate_embeddings(document_id: UUID, db: AsyncSession):
         logger.warning(f"Doc {document_id}: no chunks generated")
         return
 
-    # Generate embeddings
-    model = get_model()
-    vectors = model.encode(chunks, show_progress_bar=False, batch_size=32)
+    # Generate embeddings (batched together with other concurrent embed jobs)
+    vectors = await get_batcher().encode(chunks)
 
-    # Store in database
-    for i, (chunk, vector) in enumerate(zip(chunks, vectors)):
+    # Replace existing embeddings for this document (re-processing)
+    await db.execute(delete(Embedding).where(Embedding.document_id == document_id))
+    for i, (chunk, vector) in enumerate(zip(chunks, vectors, strict=True)):
         embedding = Embedding(
             document_id=document_id,
             chunk_index=i,
             chunk_text=chunk,
-            embedding=vector.tolist(),
+            embedding=vector,
         )
         db.add(embedding)
 
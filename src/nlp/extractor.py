@@ -1,16 +1,30 @@
 """PDF text extraction using PyMuPDF."""
 
+import asyncio
 import logging
+from bisect import bisect_right
+from collections.abc import Callable
+from typing import Any
 from uuid import UUID
 
 import fitz  # PyMuPDF
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models import Document
+from src.config import get_settings
+from src.db.session import load_document
+from src.ingest.archive import open_pdf
+from src.ingest.dedup import sync_duplicates
+from src.ingest.storage import fetch_source
+from src.worker.pool import run_in_pool
 
 logger = logging.getLogger(__name__)
 
+# Separator between pages in Document.extracted_text
+PAGE_BREAK = "\n\n--- PAGE BREAK ---\n\n"
+
+# Below this many characters per page a document is flagged for OCR
+OCR_MIN_CHARS_PER_PAGE = 50
+
 
 def extract_text_pymupdf(pdf_path: str) -> tuple[str, int]:
     """Extract text from a PDF file using PyMuPDF.
@@ -18,7 +32,7 @@ def extract_text_pymupdf(pdf_path: str) -> tuple[str, int]:
     Returns:
         Tuple of (extracted_text, page_count)
     """
-    doc = fitz.open(pdf_path)
+    doc = open_pdf(pdf_path)
     pages = []
     for page in doc:
         text = page.get_text("text")
@@ -26,7 +40,7 @@ def extract_text_pymupdf(pdf_path: str) -> tuple[str, int]:
             pages.append(text)
     page_count = len(doc)
     doc.close()
-    return "\n\n--- PAGE BREAK ---\n\n".join(pages), page_count
+    return PAGE_BREAK.join(pages), page_count
 
 
 def extract_text_from_bytes(pdf_bytes: bytes) -> tuple[str, int]:
@@ -39,7 +53,18 @@ def extract_text_from_bytes(pdf_bytes: bytes) -> tuple[str, int]:
             pages.append(text)
     page_count = len(doc)
     doc.close()
-    return "\n\n--- PAGE BREAK ---\n\n".join(pages), page_count
+    return PAGE_BREAK.join(pages), page_count
+
+
+def page_needs_ocr(chars: int, image_count: int) -> bool:
+    """Whether a page looks scanned: almost no text layer but embedded images."""
+    return chars < OCR_MIN_CHARS_PER_PAGE and image_count > 0
+
+
+def needs_ocr(text: str, page_count: int) -> bool:
+    """Whether very little text was extracted despite the document having pages."""
+    chars_per_page = len(text) / max(page_count, 1)
+    return page_count > 0 and chars_per_page < OCR_MIN_CHARS_PER_PAGE
 
 
 def clean_extracted_text(text: str) -> str:
@@ -63,33 +88,138 @@ def clean_extracted_text(text: str) -> str:
     return text.strip()
 
 
-async def extract_text_from_pdf(document_id: UUID, db: AsyncSession):
+def join_pages(pages: list[str]) -> tuple[str, list[int]]:
+    """Join cleaned per-page texts with PAGE_BREAK, skipping empty pages.
+
+    Returns (text, page_offsets): the character offset at which each page
+    starts in the text, one entry per page including empty ones.
+    """
+    parts = []
+    offsets = []
+    position = 0
+    for page in pages:
+        if page:
+            if parts:
+                position += len(PAGE_BREAK)
+            offsets.append(position)
+            parts.append(page)
+            position += len(page)
+        else:
+            offsets.append(position)
+    return PAGE_BREAK.join(parts), offsets
+
+
+def page_bounds(page_offsets: list[int], page_number: int) -> tuple[int, int | None]:
+    """(start, end) character range of a 1-based page; end is None for the last page.
+
+    The range may include the trailing PAGE_BREAK — see `page_text`.
+    """
+    start = page_offsets[page_number - 1]
+    end = page_offsets[page_number] if page_number < len(page_offsets) else None
+    return start, end
+
+
+def page_text(text: str, page_offsets: list[int], page_number: int) -> str:
+    """Text of one 1-based page."""
+    start, end = page_bounds(page_offsets, page_number)
+    return text[start:end].removesuffix(PAGE_BREAK)
+
+
+def page_for_offset(page_offsets: list[int] | None, char_offset: int) -> int | None:
+    """1-based page containing a character offset (None without offsets)."""
+    if not page_offsets:
+        return None
+    return max(bisect_right(page_offsets, char_offset), 1)
+
+
+def count_pages(pdf_path: str) -> int:
+    """Page count of a PDF (reads only its page tree)."""
+    doc = open_pdf(pdf_path)
+    page_count = len(doc)
+    doc.close()
+    return page_count
+
+
+def page_ranges(page_count: int, range_pages: int | None = None) -> list[tuple[int, int]]:
+    """Split a document into (start, stop) page ranges for parallel processing.
+
+    Documents up to `Settings.pdf_split_pages` pages stay in one range;
+    larger ones are cut into `Settings.pdf_range_pages`-page ranges. An
+    explicit `range_pages` always splits.
+    """
+    settings = get_settings()
+    if range_pages is None and page_count <= settings.pdf_split_pages:
+        return [(0, page_count)]
+    step = range_pages or settings.pdf_range_pages
+    return [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+
+async def map_page_ranges(
+    fn: Callable[[str, int, int], Any], pdf_path: str, range_pages: int | None = None
+) -> tuple[int, list]:
+    """Run `fn(pdf_path, start, stop)` over a PDF's page ranges in the process pool.
+
+    Returns (page_count, results in page order).
+    """
+    page_count = await asyncio.to_thread(count_pages, pdf_path)
+    ranges = page_ranges(page_count, range_pages)
+    results = await asyncio.gather(
+        *(run_in_pool(fn, pdf_path, start, stop) for start, stop in ranges)
+    )
+    return page_count, results
+
+
+def extract_clean_range(pdf_path: str, start: int, stop: int) -> list[str]:
+    """Cleaned text of each page in [start, stop) (runs in the worker process pool)."""
+    doc = open_pdf(pdf_path)
+    pages = [
+        clean_extracted_text(doc[page_num].get_text("text")) for page_num in range(start, stop)
+    ]
+    doc.close()
+    return pages
+
+
+async def extract_text_parallel(pdf_path: str) -> tuple[str, list[int]]:
+    """Extract and clean text, splitting large PDFs into parallel page ranges.
+
+    Returns (text, page_offsets) as built by `join_pages`.
+    """
+    _, parts = await map_page_ranges(extract_clean_range, pdf_path)
+    return join_pages([page for part in parts for page in part])
+
+
+async def extract_text_from_pdf(document_id: UUID, db: AsyncSession) -> list[str] | None:
     """Job handler: extract text from a document's PDF.
 
     Downloads from blob storage (or local path), extracts text,
-    updates the document record.
+    updates the document record. Routes documents with too little text to
+    the `ocr` stage.
     """
-    doc = (await db.execute(select(Document).where(Document.id == document_id))).scalar_one()
-
-    # For now, try local file path. Later: download from Azure Blob.
-    source_path = doc.source_path
+    doc = await load_document(db, document_id)
 
     try:
-        text, page_count = extract_text_pymupdf(source_path)
-        text = clean_extracted_text(text)
+        # Local file when this worker can see it, otherwise the cached blob
+        async with fetch_source(doc) as source_path:
+            text, page_offsets = await extract_text_parallel(source_path)
+        page_count = len(page_offsets)
 
         doc.extracted_text = text
+        doc.page_offsets = page_offsets
         doc.page_count = page_count
         doc.processing_status = "text_extracted"
 
         # Check if OCR is needed (very little text extracted despite having pages)
-        chars_per_page = len(text) / max(page_count, 1)
-        if chars_per_page < 50 and page_count > 0:
+        next_stages = None
+        if needs_ocr(text, page_count) and doc.doc_type != "text":
+            chars_per_page = len(text) / page_count
             doc.ocr_applied = False  # Flag for OCR job
+            next_stages = ["ocr"]
             logger.info(f"Doc {document_id}: low text density ({chars_per_page:.0f} chars/page), needs OCR")
 
+        await sync_duplicates(db, doc)
         await db.commit()
         logger.info(f"Doc {document_id}: extracted {len(text)} chars from {page_count} pages")
+        return next_stages
 
     except Exception as e:
         doc.processing_status = "failed"
@@ -1,29 +1,39 @@
 """Named Entity Recognition using spaCy."""
 
 import logging
+import uuid
 from collections import defaultdict
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models import Document, Entity, EntityMention
+from src.db.models import Entity, EntityMention
+from src.db.session import load_document
+from src.nlp.extractor import page_for_offset
+from src.worker.batcher import RequestBatcher
+from src.worker.pool import run_in_pool
 
 logger = logging.getLogger(__name__)
 
 # Lazy-loaded spaCy model
 _nlp = None
 
+# Pipeline components NER doesn't need (only `doc.ents` is read)
+UNUSED_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+
 
 def get_nlp():
     """Lazy-load the spaCy model."""
     global _nlp
     if _nlp is None:
         import spacy
+
         from src.config import get_settings
 
         settings = get_settings()
-        _nlp = spacy.load(settings.spacy_model)
+        _nlp = spacy.load(settings.spacy_model, exclude=UNUSED_COMPONENTS)
     return _nlp
 
 
@@ -45,30 +55,32 @@ def normalize_name(name: str) -> str:
     return name
 
 
-async def extract_entities(document_id: UUID, db: AsyncSession):
-    """Job handler: extract named entities from document text using spaCy.
+def find_entity_mentions_batch(
+    texts: list[str], batch_size: int = 64, n_process: int = 1
+) -> list[dict[tuple[str, str], list[dict]]]:
+    """Run spaCy over many texts and group each one's relevant mentions by (canonical, type).
 
-    Groups entities by canonical name, creates Entity and EntityMention records.
+    All texts stream through one `nlp.pipe` call, so short documents share
+    model batches. Pure CPU work — runs in the worker process pool, where
+    each process loads the spaCy model once.
     """
-    doc = (await db.execute(select(Document).where(Document.id == document_id))).scalar_one()
-
-    if not doc.extracted_text:
-        logger.warning(f"Doc {document_id}: no extracted text, skipping NER")
-        return
-
     nlp = get_nlp()
 
     # Process text in chunks (spaCy has limits on text size)
-    text = doc.extracted_text
     max_len = nlp.max_length
-    chunks = [text[i : i + max_len] for i in range(0, len(text), max_len)]
+    chunks = [
+        (index, offset, text[offset : offset + max_len])
+        for index, text in enumerate(texts)
+        for offset in range(0, len(text), max_len)
+    ]
 
-    # Collect all entity mentions
-    entity_mentions = defaultdict(list)  # canonical -> list of (span_text, char_offset, context)
+    # Collect all entity mentions, per text
+    results = [defaultdict(list) for _ in texts]  # (canonical, type) -> mentions
 
-    offset = 0
-    for chunk in chunks:
-        spacy_doc = nlp(chunk)
+    spacy_docs = nlp.pipe(
+        (chunk for _, _, chunk in chunks), batch_size=batch_size, n_process=n_process
+    )
+    for (index, offset, chunk), spacy_doc in zip(chunks, spacy_docs, strict=True):
         for ent in spacy_doc.ents:
             if ent.label_ not in RELEVANT_TYPES:
                 continue
@@ -81,52 +93,177 @@ async def extract_entities(document_id: UUID, db: AsyncSession):
             end = min(len(chunk), ent.end_char + 50)
             context = chunk[start:end]
 
-            entity_mentions[(name, ent.label_)].append(
+            results[index][(name, ent.label_)].append(
                 {
                     "span_text": ent.text,
                     "char_offset": offset + ent.start_char,
                     "context": context,
                 }
             )
-        offset += len(chunk)
-
-    # Create/update entity records
-    for (canonical, entity_type), mentions in entity_mentions.items():
-        # Find or create entity
-        existing = (
-            await db.execute(
-                select(Entity).where(
-                    Entity.canonical == canonical, Entity.entity_type == entity_type
-                )
-            )
-        ).scalar_one_or_none()
-
-        if existing:
-            entity = existing
-            entity.mention_count = (entity.mention_count or 0) + len(mentions)
-        else:
-            entity = Entity(
-                name=canonical,
-                canonical=canonical,
-                entity_type=entity_type,
-                mention_count=len(mentions),
-            )
-            db.add(entity)
-            await db.flush()  # Get the ID
-
-        # Create mention records
-        for m in mentions:
-            mention = EntityMention(
-                entity_id=entity.id,
-                document_id=document_id,
-                char_offset=m["char_offset"],
-                context=m["context"],
-                confidence=1.0,
-            )
-            db.add(mention)
+
+    return [dict(result) for result in results]
+
+
+def find_entity_mentions(text: str) -> dict[tuple[str, str], list[dict]]:
+    """Run spaCy over `text` and group relevant mentions by (canonical, type)."""
+    return find_entity_mentions_batch([text])[0]
+
+
+class NerBatcher(RequestBatcher):
+    """Pools texts from many concurrent `ner` jobs into one `nlp.pipe` run.
+
+    Running the model document by document leaves it working on tiny
+    inputs (most documents are short emails). Requests are buffered until
+    `batch_size` texts are pending or `timeout` seconds pass, then the
+    whole buffer goes to one pool process as a single `nlp.pipe` stream
+    and each caller gets its own document's mentions back.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 64,
+        timeout: float = 0.05,
+        pipe_batch_size: int = 64,
+        n_process: int = 1,
+    ):
+        super().__init__(batch_size, timeout)
+        self.pipe_batch_size = pipe_batch_size
+        self.n_process = n_process
+
+    async def find(self, text: str) -> dict[tuple[str, str], list[dict]]:
+        """Entity mentions in `text`, sharing a spaCy run with other callers."""
+        return await self.submit(text)
+
+    async def run(self, requests: list[str]) -> list[dict[tuple[str, str], list[dict]]]:
+        return await run_in_pool(
+            find_entity_mentions_batch, requests, self.pipe_batch_size, self.n_process
+        )
+
+
+_batcher: NerBatcher | None = None
+
+
+def get_batcher() -> NerBatcher:
+    """Lazy-create the shared NER batcher."""
+    global _batcher
+    if _batcher is None:
+        from src.config import get_settings
+
+        settings = get_settings()
+        _batcher = NerBatcher(
+            batch_size=settings.ner_batch_size,
+            timeout=settings.ner_batch_timeout,
+            pipe_batch_size=settings.ner_pipe_batch_size,
+            n_process=settings.ner_n_process,
+        )
+    return _batcher
+
+
+# Entity rows per upsert statement (7 bind parameters each, Postgres allows 32767)
+UPSERT_BATCH_SIZE = 1000
+MENTION_COLUMNS = [
+    "id", "entity_id", "document_id", "page_number", "char_offset", "context", "confidence"
+]
+
+
+async def upsert_entities(
+    db: AsyncSession, entity_mentions: dict[tuple[str, str], list[dict]]
+) -> dict[tuple[str, str], UUID]:
+    """Create or bump the Entity row of every (canonical, type), in bulk.
+
+    One `INSERT ... ON CONFLICT DO UPDATE ... RETURNING` per batch: new
+    entities are created and existing ones get their `mention_count`
+    incremented atomically, so concurrent workers seeing the same name
+    can't race. Keys are sorted so every worker locks rows in the same order.
+    Returns the entity id for each key.
+    """
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "name": canonical,
+            "canonical": canonical,
+            "entity_type": entity_type,
+            "aliases": [],
+            "metadata_": {},
+            "mention_count": len(mentions),
+        }
+        for (canonical, entity_type), mentions in sorted(entity_mentions.items())
+    ]
+    entity_ids = {}
+    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = pg_insert(Entity).values(rows[i : i + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["canonical", "entity_type"],
+            set_={"mention_count": Entity.mention_count + stmt.excluded.mention_count},
+        ).returning(Entity.id, Entity.canonical, Entity.entity_type)
+        for entity_id, canonical, entity_type in await db.execute(stmt):
+            entity_ids[(canonical, entity_type)] = entity_id
+    return entity_ids
+
+
+async def remove_mentions(db: AsyncSession, document_ids: list[UUID]):
+    """Delete the documents' EntityMention rows and take them off `mention_count`."""
+    counts = (
+        select(EntityMention.entity_id, func.count().label("removed"))
+        .where(EntityMention.document_id.in_(document_ids))
+        .group_by(EntityMention.entity_id)
+        .subquery()
+    )
+    await db.execute(
+        update(Entity)
+        .where(Entity.id == counts.c.entity_id)
+        .values(mention_count=Entity.mention_count - counts.c.removed)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(delete(EntityMention).where(EntityMention.document_id.in_(document_ids)))
+
+
+async def copy_mentions(db: AsyncSession, records: list[tuple]):
+    """Load EntityMention rows with COPY on the session's connection (same transaction)."""
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        EntityMention.__tablename__, records=records, columns=MENTION_COLUMNS
+    )
+
+
+async def extract_entities(document_id: UUID, db: AsyncSession):
+    """Job handler: extract named entities from document text using spaCy.
+
+    Groups entities by canonical name, upserts Entity records and loads
+    EntityMention records in bulk. Mentions from an earlier run of the job
+    (a reclaimed lease, a lost ack) are removed in the same transaction
+    first, so re-running never double-counts.
+    """
+    doc = await load_document(db, document_id)
+
+    if not doc.extracted_text:
+        logger.warning(f"Doc {document_id}: no extracted text, skipping NER")
+        return
+
+    # Run spaCy (batched together with other concurrent ner jobs)
+    entity_mentions = await get_batcher().find(doc.extracted_text)
+
+    await remove_mentions(db, [document_id])
+    entity_ids = await upsert_entities(db, entity_mentions)
+    records = [
+        (
+            uuid.uuid4(),
+            entity_ids[key],
+            document_id,
+            page_for_offset(doc.page_offsets, m["char_offset"]),
+            m["char_offset"],
+            m["context"],
+            1.0,
+        )
+        for key, mentions in entity_mentions.items()
+        for m in mentions
+    ]
+    if records:
+        await copy_mentions(db, records)
 
     await db.commit()
     logger.info(
         f"Doc {document_id}: extracted {len(entity_mentions)} unique entities, "
-        f"{sum(len(m) for m in entity_mentions.values())} total mentions"
+        f"{len(records)} total mentions"
     )
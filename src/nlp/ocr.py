@@ -0,0 +1,83 @@
+"""Selective OCR with Tesseract — only pages without a usable text layer.
+
+Scanned pages (almost no text, embedded images) are rendered in grayscale
+at `Settings.ocr_dpi` and run through Tesseract; pages that already have
+text keep it. Images are OCR'd whole. Pages are processed in small ranges
+across the worker process pool and merged back in page order.
+"""
+
+import logging
+from uuid import UUID
+
+import fitz  # PyMuPDF
+import pytesseract
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+from src.db.session import load_document
+from src.ingest.archive import open_pdf
+from src.ingest.dedup import sync_duplicates
+from src.ingest.storage import fetch_source
+from src.nlp.extractor import clean_extracted_text, join_pages, map_page_ranges, page_needs_ocr
+from src.worker.stages import downstream_stages
+
+logger = logging.getLogger(__name__)
+
+
+def ocr_page(page: fitz.Page, dpi: int, language: str) -> str:
+    """Render one page and OCR it."""
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    return pytesseract.image_to_string(image, lang=language)
+
+
+def ocr_range(pdf_path: str, start: int, stop: int) -> tuple[list[str], int]:
+    """Text of pages [start, stop), OCR'ing the scanned ones (runs in the worker process pool).
+
+    Returns (cleaned text of each page, number of pages OCR'd).
+    """
+    settings = get_settings()
+    doc = open_pdf(pdf_path)
+    pages = []
+    ocr_count = 0
+    for page_num in range(start, stop):
+        page = doc[page_num]
+        text = page.get_text("text")
+        # Non-PDF documents are images — no text layer at all
+        if not doc.is_pdf or page_needs_ocr(len(text.strip()), len(page.get_images())):
+            text = ocr_page(page, settings.ocr_dpi, settings.ocr_language)
+            ocr_count += 1
+        pages.append(clean_extracted_text(text))
+    doc.close()
+    return pages, ocr_count
+
+
+async def ocr_document(document_id: UUID, db: AsyncSession) -> list[str] | None:
+    """Job handler: OCR a document's scanned pages and rewrite its text.
+
+    Images also get a redaction pass: they skip `pdf_analyze`, where PDFs
+    have theirs. Returns the next stages (None means the stage graph's).
+    """
+    doc = await load_document(db, document_id)
+
+    async with fetch_source(doc) as source_path:
+        page_count, parts = await map_page_ranges(
+            ocr_range, source_path, range_pages=get_settings().ocr_range_pages
+        )
+    text, page_offsets = join_pages([page for pages, _ in parts for page in pages])
+    ocr_count = sum(count for _, count in parts)
+
+    doc.extracted_text = text
+    doc.page_offsets = page_offsets
+    doc.page_count = page_count
+    doc.ocr_applied = True
+    doc.processing_status = "text_extracted"
+    await sync_duplicates(db, doc)
+    await db.commit()
+    logger.info(
+        f"Doc {document_id}: OCR'd {ocr_count}/{page_count} pages, {len(text)} chars of text"
+    )
+    if doc.doc_type == "image":
+        return [*downstream_stages("ocr"), "detect_redaction"]
+    return None
@@ -0,0 +1,142 @@
+"""Fused PDF stage — text extraction and redaction detection in one pass.
+
+`extract_text` and `detect_redaction` each open and walk the whole PDF.
+This stage opens it once and, per page, collects the text, the
+drawings-based redaction rectangles and a few page metrics. Documents
+longer than `Settings.pdf_split_pages` are cut into page ranges that run
+in parallel pool processes and are merged in page order.
+"""
+
+import logging
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.session import load_document
+from src.ingest.archive import open_pdf
+from src.ingest.dedup import sync_duplicates
+from src.ingest.storage import fetch_source
+from src.nlp.extractor import (
+    clean_extracted_text,
+    count_pages,
+    join_pages,
+    map_page_ranges,
+    page_needs_ocr,
+)
+from src.nlp.redaction import analyze_page_redactions, summarize_redactions
+from src.nlp.redaction_stats import record_redaction_stats
+
+logger = logging.getLogger(__name__)
+
+
+def analyze_pdf_range(pdf_path: str, start: int, stop: int) -> dict:
+    """Text, redactions and metrics for pages [start, stop) in one page loop.
+
+    Runs in the worker process pool; large documents are split into
+    several ranges and merged with `merge_ranges`.
+    """
+    doc = open_pdf(pdf_path)
+    pages = []
+    page_details = []
+    page_metrics = []
+    page_area_total = 0
+    redacted_area_total = 0
+
+    for page_num in range(start, stop):
+        page = doc[page_num]
+        text = page.get_text("text")
+        pages.append(clean_extracted_text(text))
+
+        page_detail, redacted_area, page_area = analyze_page_redactions(page, page_num)
+        page_details.append(page_detail)
+        redacted_area_total += redacted_area
+        page_area_total += page_area
+
+        page_metrics.append({
+            "page": page_num + 1,
+            "chars": len(text.strip()),
+            "images": len(page.get_images()),
+            "width": round(page.rect.width, 1),
+            "height": round(page.rect.height, 1),
+        })
+
+    doc.close()
+
+    return {
+        "pages": pages,
+        "page_details": page_details,
+        "page_metrics": page_metrics,
+        "redacted_area": redacted_area_total,
+        "page_area": page_area_total,
+    }
+
+
+def merge_ranges(page_count: int, parts: list[dict]) -> dict:
+    """Combine page-range results (in page order) into the document result.
+
+    Returns:
+        Dict with text, page_offsets, page_count, redactions (same shape as
+        `analyze_redactions_in_pdf`) and page_metrics.
+    """
+    text, page_offsets = join_pages([page for part in parts for page in part["pages"]])
+    return {
+        "text": text,
+        "page_offsets": page_offsets,
+        "page_count": page_count,
+        "redactions": summarize_redactions(
+            [detail for part in parts for detail in part["page_details"]],
+            sum(part["redacted_area"] for part in parts),
+            sum(part["page_area"] for part in parts),
+        ),
+        "page_metrics": [metric for part in parts for metric in part["page_metrics"]],
+    }
+
+
+def analyze_pdf(pdf_path: str) -> dict:
+    """Extract text, redactions and page metrics from a whole PDF in one process."""
+    page_count = count_pages(pdf_path)
+    return merge_ranges(page_count, [analyze_pdf_range(pdf_path, 0, page_count)])
+
+
+async def analyze_pdf_document(document_id: UUID, db: AsyncSession) -> list[str] | None:
+    """Job handler: extract text and detect redactions from one PDF read.
+
+    Writes text, page count, redaction score/details and page metrics in a
+    single transaction. Documents with scanned pages go to `ocr` next.
+    """
+    doc = await load_document(db, document_id)
+
+    try:
+        async with fetch_source(doc) as source_path:
+            page_count, parts = await map_page_ranges(analyze_pdf_range, source_path)
+        result = merge_ranges(page_count, parts)
+    except Exception:
+        doc.processing_status = "failed"
+        await db.commit()
+        raise
+
+    text = result["text"]
+    page_count = result["page_count"]
+    redactions = result["redactions"]
+
+    doc.extracted_text = text
+    doc.page_offsets = result["page_offsets"]
+    doc.page_count = page_count
+    doc.processing_status = "text_extracted"
+    doc.redaction_score = redactions["redaction_score"]
+    doc.redaction_details = redactions
+    doc.metadata_ = {**(doc.metadata_ or {}), "page_metrics": result["page_metrics"]}
+
+    scanned = [m for m in result["page_metrics"] if page_needs_ocr(m["chars"], m["images"])]
+    if scanned:
+        doc.ocr_applied = False  # Flag for OCR job
+        logger.info(f"Doc {document_id}: {len(scanned)}/{page_count} scanned pages, needs OCR")
+
+    await sync_duplicates(db, doc)
+    await record_redaction_stats(db, doc)
+    await db.commit()
+    logger.info(
+        f"Doc {document_id}: extracted {len(text)} chars from {page_count} pages, "
+        f"redaction score {redactions['redaction_score']:.2%}"
+    )
+    return ["ocr"] if scanned else None
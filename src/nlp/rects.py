@@ -0,0 +1,131 @@
+"""Rectangle union — exact covered area and merged redaction bars.
+
+Rectangles are plain `(x0, y0, x1, y1)` tuples. `union_area` sweeps a
+vertical line across the x edges while a segment tree over the distinct y
+coordinates tracks how much of the line is covered, so overlapping and
+nested rectangles count once in O(n log n). `merge_rects` groups
+overlapping or touching rectangles into logical redactions.
+"""
+
+import bisect
+import heapq
+from collections import defaultdict
+from collections.abc import Iterable
+
+Rect = tuple[float, float, float, float]
+
+
+class _CoverTree:
+    """Segment tree over the elementary intervals between sorted y coordinates."""
+
+    def __init__(self, ys: list[float]):
+        self.ys = ys
+        size = 4 * max(1, len(ys) - 1)
+        self.count = [0] * size  # rectangles covering a node's whole interval
+        self.covered = [0.0] * size  # covered length within a node's interval
+
+    def update(self, lo: int, hi: int, delta: int, node: int = 1, left: int = 0, right: int = -1):
+        """Add `delta` coverage to elementary intervals [lo, hi)."""
+        if right < 0:
+            right = len(self.ys) - 1
+        if hi <= left or right <= lo:
+            return
+        if lo <= left and right <= hi:
+            self.count[node] += delta
+        else:
+            mid = (left + right) // 2
+            self.update(lo, hi, delta, 2 * node, left, mid)
+            self.update(lo, hi, delta, 2 * node + 1, mid, right)
+
+        if self.count[node]:
+            self.covered[node] = self.ys[right] - self.ys[left]
+        elif right - left == 1:
+            self.covered[node] = 0.0
+        else:
+            self.covered[node] = self.covered[2 * node] + self.covered[2 * node + 1]
+
+    @property
+    def total(self) -> float:
+        return self.covered[1]
+
+
+def union_area(rects: Iterable[Rect]) -> float:
+    """Exact area covered by the union of `rects`."""
+    events = []
+    ys = set()
+    for x0, y0, x1, y1 in rects:
+        if x1 > x0 and y1 > y0:
+            events.append((x0, 1, y0, y1))
+            events.append((x1, -1, y0, y1))
+            ys.update((y0, y1))
+    if not events:
+        return 0.0
+
+    events.sort()
+    tree = _CoverTree(sorted(ys))
+    index = {y: i for i, y in enumerate(tree.ys)}
+
+    area = 0.0
+    prev_x = events[0][0]
+    for x, delta, y0, y1 in events:
+        area += tree.total * (x - prev_x)
+        tree.update(index[y0], index[y1], delta)
+        prev_x = x
+    return area
+
+
+def merge_rects(rects: list[Rect], gap: float = 0.0) -> list[tuple[Rect, float]]:
+    """Group rectangles that overlap or lie within `gap` of each other.
+
+    Returns one (bounding box, union area) per group — the groups are
+    disjoint, so their areas add up to `union_area(rects)`.
+    """
+    rects = [r for r in rects if r[2] > r[0] and r[3] > r[1]]
+    parent = list(range(len(rects)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Sweep left to right. Rectangles whose right edge is still within reach
+    # stay active, kept sorted by top edge so only those that can reach the
+    # current one vertically are compared.
+    max_height = max((r[3] - r[1] for r in rects), default=0.0)
+    expiry: list[tuple[float, int]] = []
+    active: list[tuple[float, int]] = []
+    for i in sorted(range(len(rects)), key=lambda i: rects[i][0]):
+        x0, y0, x1, y1 = rects[i]
+        while expiry and expiry[0][0] + gap < x0:
+            _, j = heapq.heappop(expiry)
+            del active[bisect.bisect_left(active, (rects[j][1], j))]
+
+        lo = bisect.bisect_left(active, (y0 - gap - max_height, -1))
+        hi = bisect.bisect_right(active, (y1 + gap, len(rects)))
+        root = find(i)
+        for _, j in active[lo:hi]:
+            if rects[j][3] + gap >= y0 and find(j) != root:
+                parent[find(j)] = root
+        heapq.heappush(expiry, (x1, i))
+        bisect.insort(active, (y0, i))
+
+    groups: dict[int, list[Rect]] = defaultdict(list)
+    for i, rect in enumerate(rects):
+        groups[find(i)].append(rect)
+
+    merged = []
+    for members in groups.values():
+        if len(members) == 1:
+            x0, y0, x1, y1 = members[0]
+            merged.append((members[0], (x1 - x0) * (y1 - y0)))
+            continue
+        bbox = (
+            min(r[0] for r in members),
+            min(r[1] for r in members),
+            max(r[2] for r in members),
+            max(r[3] for r in members),
+        )
+        merged.append((bbox, union_area(members)))
+    merged.sort(key=lambda m: (m[0][1], m[0][0]))  # Reading order
+    return merged
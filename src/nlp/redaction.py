@@ -1,93 +1,261 @@
-"""Redaction detection — identify blacked-out regions in PDF pages."""
+"""Redaction detection — identify blacked-out regions in PDF pages.
+
+Two engines feed the same `page_details`/`rects` format: born-digital
+pages are checked for black filled rectangles among their vector drawings;
+scanned pages (any embedded image) are rendered to a small grayscale
+raster and searched for solid dark rectangles with NumPy. Either way the
+rectangles are merged (`src.nlp.rects`) before they are scored.
+"""
 
 import logging
 from uuid import UUID
 
 import fitz  # PyMuPDF
-from sqlalchemy import select
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models import Document
+from src.config import get_settings
+from src.db.session import load_document
+from src.ingest.archive import open_pdf
+from src.ingest.dedup import sync_duplicates
+from src.ingest.storage import fetch_source
+from src.nlp.rects import Rect, merge_rects
+from src.nlp.redaction_stats import record_redaction_stats
+from src.worker.pool import run_in_pool
 
 logger = logging.getLogger(__name__)
 
 
+# Gray level (0-255) at or below which a rendered pixel counts as redaction ink
+DARK_THRESHOLD = 48
+# Smallest raster redaction, in points — anything smaller is text or noise
+MIN_BAR_WIDTH = 12
+MIN_BAR_HEIGHT = 5
+# Share of a raster component's bounding box that must be dark for it to count as a bar
+MIN_FILL = 0.8
+# Bars closer than this (points) are one logical redaction
+MERGE_GAP = 1.0
+
+
+def vector_redaction_rects(page: fitz.Page) -> list[Rect]:
+    """Black filled rectangles among a page's vector drawings.
+
+    Uses `get_cdrawings`, which returns plain tuples instead of building
+    Rect/Point objects for every path item on drawing-heavy pages.
+    """
+    rects = []
+    for drawing in page.get_cdrawings():
+        # Check if the fill color is black or very dark
+        fill = drawing.get("fill")
+        if not (fill and all(c < 0.1 for c in fill[:3] if isinstance(c, (int, float)))):
+            continue
+        for item in drawing.get("items", []):
+            if item[0] == "re":  # rectangle
+                x0, y0, x1, y1 = item[1]
+                if (x1 - x0) * (y1 - y0) > 100:  # Ignore tiny dots
+                    rects.append((x0, y0, x1, y1))
+    return rects
+
+
+def find_dark_rects(
+    gray: np.ndarray,
+    min_width: int,
+    min_height: int,
+    threshold: int = DARK_THRESHOLD,
+    min_fill: float = MIN_FILL,
+) -> list[tuple[int, int, int, int]]:
+    """Solid dark rectangles in a grayscale image, as pixel (x0, y0, x1, y1).
+
+    Every row is turned into runs of dark pixels at once (`np.diff` of the
+    thresholded mask) and runs narrower than `min_width` are dropped. Runs
+    whose columns overlap a run on the row above are linked (union-find
+    over runs), so a bar with jittery scanned edges stays one connected
+    component. Components whose bounding box is at least `min_width` x
+    `min_height` and at least `min_fill` dark are returned — no per-pixel
+    Python loop.
+    """
+    height, width = gray.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = gray <= threshold
+    edges = np.diff(padded, axis=1)
+    # nonzero() walks row-major, so the i-th start and i-th end are one run
+    rows, x0 = np.nonzero(edges == 1)
+    _, x1 = np.nonzero(edges == -1)
+
+    wide = x1 - x0 >= min_width
+    rows, x0, x1 = rows[wide], x0[wide], x1[wide]
+    if rows.size == 0:
+        return []
+
+    # Runs stay sorted by (row, x0), so row * stride + x is sorted too and the
+    # runs on the row above that overlap [x0, x1) are one searchsorted slice
+    stride = width + 2
+    above = (rows - 1) * stride
+    lo = np.searchsorted(rows * stride + x1, above + x0, side="right")
+    hi = np.searchsorted(rows * stride + x0, above + x1, side="left")
+    counts = np.maximum(hi - lo, 0)
+    runs = np.repeat(np.arange(rows.size), counts)
+    linked = np.repeat(lo, counts) + np.arange(counts.sum()) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+
+    parent = list(range(rows.size))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in zip(runs.tolist(), linked.tolist(), strict=True):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    _, component = np.unique([find(i) for i in range(rows.size)], return_inverse=True)
+    n = component.max() + 1
+    left = np.full(n, width)
+    right = np.zeros(n, dtype=np.int64)
+    top = np.full(n, height)
+    bottom = np.zeros(n, dtype=np.int64)
+    np.minimum.at(left, component, x0)
+    np.maximum.at(right, component, x1)
+    np.minimum.at(top, component, rows)
+    np.maximum.at(bottom, component, rows + 1)
+    dark = np.bincount(component, weights=x1 - x0, minlength=n)
+
+    box_area = (right - left) * (bottom - top)
+    keep = (
+        (right - left >= min_width)
+        & (bottom - top >= min_height)
+        & (dark >= min_fill * box_area)
+    )
+    found = list(zip(
+        left[keep].tolist(), top[keep].tolist(), right[keep].tolist(), bottom[keep].tolist(),
+        strict=True,
+    ))
+    found.sort(key=lambda r: (r[1], r[0]))
+    return found
+
+
+def raster_redaction_rects(page: fitz.Page, dpi: int | None = None) -> list[Rect]:
+    """Dark bars in a page rendered at `Settings.redaction_raster_dpi`, in page points."""
+    dpi = dpi or get_settings().redaction_raster_dpi
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    gray = gray[:, : pix.width]
+
+    scale = 72 / dpi
+    found = find_dark_rects(
+        gray, max(1, round(MIN_BAR_WIDTH / scale)), max(1, round(MIN_BAR_HEIGHT / scale))
+    )
+    left, top = page.rect.x0, page.rect.y0
+    return [
+        (left + x0 * scale, top + y0 * scale, left + x1 * scale, top + y1 * scale)
+        for x0, y0, x1, y1 in found
+    ]
+
+
+def analyze_page_redactions(page: fitz.Page, page_num: int) -> tuple[dict, float, float]:
+    """Find black redaction rectangles on a single page.
+
+    Scanned pages and image documents (which have no embedded images or
+    drawings to inspect) go through the raster engine, which also sees any
+    vector bars drawn over a scan; other pages through the vector engine.
+    Overlapping and touching rectangles are merged into logical redactions
+    and clipped to the page, so each area is counted once and the score
+    can't exceed 1.
+
+    Returns:
+        Tuple of (page_detail, redacted_area, page_area)
+    """
+    page_rect = page.rect
+    page_area = page_rect.width * page_rect.height
+
+    if page.get_images() or not page.parent.is_pdf:
+        method = "raster"
+        rects = raster_redaction_rects(page)
+    else:
+        method = "vector"
+        rects = vector_redaction_rects(page)
+
+    px0, py0, px1, py1 = page_rect
+    clipped = [
+        (max(x0, px0), max(y0, py0), min(x1, px1), min(y1, py1)) for x0, y0, x1, y1 in rects
+    ]
+    redactions = merge_rects(clipped, gap=MERGE_GAP)
+
+    redacted_area = sum(area for _, area in redactions)
+    redaction_rects = [
+        {"x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0}
+        for (x0, y0, x1, y1), _ in redactions
+    ]
+
+    page_score = redacted_area / page_area if page_area > 0 else 0
+
+    page_detail = {
+        "page": page_num + 1,
+        "score": round(page_score, 4),
+        "method": method,
+        "redaction_count": len(redaction_rects),
+        "rects": redaction_rects[:20],  # Cap to avoid huge JSON
+    }
+    return page_detail, redacted_area, page_area
+
+
+def summarize_redactions(
+    page_details: list[dict], total_redacted_area: float, total_page_area: float
+) -> dict:
+    """Build the document-level redaction result from per-page details."""
+    overall_score = total_redacted_area / total_page_area if total_page_area > 0 else 0
+
+    return {
+        "redaction_score": round(overall_score, 4),
+        "redacted_area": round(total_redacted_area, 1),
+        "total_pages": len(page_details),
+        "pages_with_redactions": sum(1 for p in page_details if p["score"] > 0),
+        "page_details": page_details,
+    }
+
+
 def analyze_redactions_in_pdf(pdf_path: str) -> dict:
     """Analyze a PDF for redaction patterns.
 
     Looks for:
     - Large black rectangles (typical redaction bars)
     - White rectangles over text (whiteout redactions)
-    - Suspiciously uniform black regions in images
+    - Solid dark regions in scanned page images
 
     Returns:
         Dict with redaction_score (0-1), page_details, and total_redacted_area.
     """
-    doc = fitz.open(pdf_path)
+    doc = open_pdf(pdf_path)
     page_details = []
     total_page_area = 0
     total_redacted_area = 0
 
     for page_num, page in enumerate(doc):
-        page_rect = page.rect
-        page_area = page_rect.width * page_rect.height
-        total_page_area += page_area
-
-        redacted_area = 0
-        redaction_rects = []
-
-        # Check for black-filled rectangles in drawings
-        drawings = page.get_drawings()
-        for drawing in drawings:
-            for item in drawing.get("items", []):
-                if item[0] == "re":  # rectangle
-                    rect = fitz.Rect(item[1])
-                    # Check if the fill color is black or very dark
-                    fill = drawing.get("fill")
-                    if fill and all(c < 0.1 for c in fill[:3] if isinstance(c, (int, float))):
-                        # Black rectangle — likely redaction
-                        area = rect.width * rect.height
-                        if area > 100:  # Ignore tiny dots
-                            redacted_area += area
-                            redaction_rects.append({
-                                "x": rect.x0,
-                                "y": rect.y0,
-                                "width": rect.width,
-                                "height": rect.height,
-                            })
-
-        page_score = redacted_area / page_area if page_area > 0 else 0
+        page_detail, redacted_area, page_area = analyze_page_redactions(page, page_num)
+        page_details.append(page_detail)
         total_redacted_area += redacted_area
-
-        page_details.append({
-            "page": page_num + 1,
-            "score": round(page_score, 4),
-            "redaction_count": len(redaction_rects),
-            "rects": redaction_rects[:20],  # Cap to avoid huge JSON
-        })
+        total_page_area += page_area
 
     doc.close()
 
-    overall_score = total_redacted_area / total_page_area if total_page_area > 0 else 0
-
-    return {
-        "redaction_score": round(overall_score, 4),
-        "total_pages": len(page_details),
-        "pages_with_redactions": sum(1 for p in page_details if p["score"] > 0),
-        "page_details": page_details,
-    }
+    return summarize_redactions(page_details, total_redacted_area, total_page_area)
 
 
 async def detect_redactions(document_id: UUID, db: AsyncSession):
     """Job handler: detect redactions in a document's PDF."""
-    doc = (await db.execute(select(Document).where(Document.id == document_id))).scalar_one()
-
-    source_path = doc.source_path
+    doc = await load_document(db, document_id)
 
     try:
-        result = analyze_redactions_in_pdf(source_path)
+        async with fetch_source(doc) as source_path:
+            result = await run_in_pool(analyze_redactions_in_pdf, source_path)
         doc.redaction_score = result["redaction_score"]
         doc.redaction_details = result
+        await sync_duplicates(db, doc)
+        await record_redaction_stats(db, doc)
         await db.commit()
 
         logger.info(
@@ -0,0 +1,246 @@
+"""Redaction aggregates for the redaction analyzer (`/redactions`).
+
+The redaction stage writes each document's numbers to `RedactionStats`
+and applies the difference from its previous row to `RedactionHistogram`
+(per source, dataset and score bucket), so browsing, counts and
+histograms read small indexed tables instead of scanning
+`Document.redaction_details`.
+
+Rebuild both tables from scratch (backfill or repair) with
+`python -m src.nlp.redaction_stats`.
+"""
+
+import asyncio
+import logging
+import re
+from uuid import UUID
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Document, RedactionHistogram, RedactionStats
+from src.db.session import close_db, init_db, session_scope
+
+logger = logging.getLogger(__name__)
+
+SCORE_BUCKETS = 10
+# Columns summed into the histogram (besides doc_count)
+HISTOGRAM_FIELDS = ("page_count", "pages_with_redactions", "bar_count", "redacted_area")
+
+# DOJ releases are numbered data sets ("DataSet 9", "dataset-9.zip", "data_set_9/")
+DATASET_PATTERN = r"data[ _-]?set[ _-]*(\d+)"
+
+
+def detect_dataset(doc: Document) -> str:
+    """A document's dataset: `metadata["dataset"]` if the importer set it, else from its path."""
+    dataset = (doc.metadata_ or {}).get("dataset")
+    if dataset:
+        return str(dataset)
+    match = re.search(DATASET_PATTERN, doc.source_path or "", re.IGNORECASE)
+    return match.group(1) if match else ""
+
+
+def score_bucket(score: float) -> int:
+    """Histogram bucket of a redaction score: 0 for none, then 1-10 by tenths."""
+    if score <= 0:
+        return 0
+    return min(SCORE_BUCKETS, int(score * SCORE_BUCKETS) + 1)
+
+
+def bucket_label(bucket: int) -> str:
+    """Human-readable score range of a bucket."""
+    if bucket == 0:
+        return "none"
+    step = 100 // SCORE_BUCKETS
+    return f"{(bucket - 1) * step}–{bucket * step}%"
+
+
+def redaction_stats_row(doc: Document) -> dict:
+    """`RedactionStats` column values for a document's current redaction result."""
+    details = doc.redaction_details or {}
+    page_details = details.get("page_details", [])
+    score = doc.redaction_score or 0.0
+    return {
+        "source": doc.source,
+        "dataset": detect_dataset(doc),
+        "redaction_score": score,
+        "score_bucket": score_bucket(score),
+        "page_count": details.get("total_pages", len(page_details)),
+        "pages_with_redactions": details.get("pages_with_redactions", 0),
+        "bar_count": sum(p.get("redaction_count", 0) for p in page_details),
+        "redacted_area": details.get("redacted_area", 0.0),
+    }
+
+
+Deltas = dict[tuple[str, str, int], dict]
+
+
+def _add_delta(deltas: Deltas, row: dict, sign: int):
+    key = (row["source"], row["dataset"], row["score_bucket"])
+    delta = deltas.setdefault(key, dict.fromkeys(("doc_count", *HISTOGRAM_FIELDS), 0))
+    delta["doc_count"] += sign
+    for field in HISTOGRAM_FIELDS:
+        delta[field] += sign * row[field]
+
+
+async def _apply_deltas(db: AsyncSession, deltas: Deltas):
+    """Add per-(source, dataset, bucket) deltas to `RedactionHistogram`."""
+    rows = [
+        {"source": source, "dataset": dataset, "score_bucket": bucket, **delta}
+        for (source, dataset, bucket), delta in sorted(deltas.items())  # Fixed lock order
+        if any(delta.values())
+    ]
+    if not rows:
+        return
+    stmt = pg_insert(RedactionHistogram).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["source", "dataset", "score_bucket"],
+        set_={
+            field: getattr(RedactionHistogram, field) + getattr(stmt.excluded, field)
+            for field in ("doc_count", *HISTOGRAM_FIELDS)
+        },
+    )
+    await db.execute(stmt)
+
+
+def _stats_values(stats: RedactionStats) -> dict:
+    return {
+        column: getattr(stats, column)
+        for column in ("source", "dataset", "score_bucket", *HISTOGRAM_FIELDS)
+    }
+
+
+async def record_redaction_stats(db: AsyncSession, doc: Document):
+    """Upsert a document's `RedactionStats` row and apply the change to the histograms.
+
+    Runs in the caller's transaction. The old row is locked so concurrent
+    rewrites of one document can't both subtract the same old values.
+    """
+    if doc.canonical_id is not None:
+        # Duplicates are counted once, under their canonical document
+        await remove_redaction_stats(db, [doc.id])
+        return
+
+    new = redaction_stats_row(doc)
+    old = (
+        await db.execute(
+            select(RedactionStats).where(RedactionStats.document_id == doc.id).with_for_update()
+        )
+    ).scalar_one_or_none()
+
+    deltas: Deltas = {}
+    if old is None:
+        db.add(RedactionStats(document_id=doc.id, **new))
+    else:
+        _add_delta(deltas, _stats_values(old), -1)
+        for column, value in new.items():
+            setattr(old, column, value)
+    _add_delta(deltas, new, 1)
+    await _apply_deltas(db, deltas)
+
+
+async def remove_redaction_stats(db: AsyncSession, document_ids: list[UUID]):
+    """Drop documents' `RedactionStats` rows and subtract them from the histograms.
+
+    For documents that stop counting on their own — they became duplicates
+    or their content changed. Runs in the caller's transaction.
+    """
+    if not document_ids:
+        return
+    old = (
+        await db.execute(
+            select(RedactionStats)
+            .where(RedactionStats.document_id.in_(document_ids))
+            .with_for_update()
+        )
+    ).scalars().all()
+    if not old:
+        return
+
+    deltas: Deltas = {}
+    for stats in old:
+        _add_delta(deltas, _stats_values(stats), -1)
+    await db.execute(
+        delete(RedactionStats).where(RedactionStats.document_id.in_([s.document_id for s in old]))
+    )
+    await _apply_deltas(db, deltas)
+
+
+async def rebuild_redaction_stats(db: AsyncSession):
+    """Recompute both aggregate tables from `Document.redaction_details`.
+
+    One full scan — for backfilling documents analyzed before the tables
+    existed, or repairing drift. Commits.
+    """
+    await db.execute(delete(RedactionHistogram))
+    await db.execute(delete(RedactionStats))
+    await db.execute(
+        text(
+            """
+            INSERT INTO redaction_stats (
+                document_id, source, dataset, redaction_score, score_bucket,
+                page_count, pages_with_redactions, bar_count, redacted_area
+            )
+            SELECT
+                d.id,
+                d.source,
+                COALESCE(
+                    NULLIF(d.metadata->>'dataset', ''),
+                    substring(d.source_path from :dataset_pattern),
+                    ''
+                ),
+                COALESCE(d.redaction_score, 0),
+                CASE WHEN COALESCE(d.redaction_score, 0) <= 0 THEN 0
+                     ELSE LEAST(:buckets, floor(d.redaction_score * :buckets)::int + 1) END,
+                COALESCE((d.redaction_details->>'total_pages')::int, 0),
+                COALESCE((d.redaction_details->>'pages_with_redactions')::int, 0),
+                COALESCE((
+                    SELECT sum((p->>'redaction_count')::int)
+                    FROM jsonb_array_elements(d.redaction_details->'page_details') p
+                ), 0),
+                COALESCE((d.redaction_details->>'redacted_area')::float, 0)
+            FROM documents d
+            WHERE d.canonical_id IS NULL AND d.redaction_details->>'redaction_score' IS NOT NULL
+            """
+        ),
+        {"buckets": SCORE_BUCKETS, "dataset_pattern": f"(?i){DATASET_PATTERN}"},
+    )
+    await db.execute(
+        text(
+            """
+            INSERT INTO redaction_histograms (
+                source, dataset, score_bucket, doc_count,
+                page_count, pages_with_redactions, bar_count, redacted_area
+            )
+            SELECT source, dataset, score_bucket, count(*),
+                   sum(page_count), sum(pages_with_redactions), sum(bar_count), sum(redacted_area)
+            FROM redaction_stats
+            GROUP BY source, dataset, score_bucket
+            """
+        )
+    )
+    await db.commit()
+    logger.info("Rebuilt redaction stats")
+
+
+async def _rebuild():
+    await init_db()
+    try:
+        async with session_scope() as db:
+            await rebuild_redaction_stats(db)
+    finally:
+        await close_db()
+
+
+def main():
+    """Entry point: `python -m src.nlp.redaction_stats` rebuilds both tables."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    asyncio.run(_rebuild())
+
+
+if __name__ == "__main__":
+    main()
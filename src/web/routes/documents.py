@@ -1,42 +1,106 @@
 """Document viewer — read documents, see redactions, entity annotations."""
 
+import mimetypes
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse, StreamingResponse
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import defer, selectinload
 
 from src.db.models import Document, EntityMention
 from src.db.session import get_db
+from src.ingest.storage import blob_key, get_blob_store
+from src.nlp.extractor import PAGE_BREAK, page_bounds
 
 router = APIRouter(prefix="/docs", tags=["documents"])
 
 
+async def load_page_text(db: AsyncSession, doc: Document, page: int) -> str | None:
+    """Fetch one page of a document's text without loading the rest."""
+    start, end = page_bounds(doc.page_offsets, page)
+    # substr is 1-based and counts characters, like Python string offsets
+    snippet = (
+        func.substr(Document.extracted_text, start + 1)
+        if end is None
+        else func.substr(Document.extracted_text, start + 1, end - start)
+    )
+    text = (await db.execute(select(snippet).where(Document.id == doc.id))).scalar()
+    return text.removesuffix(PAGE_BREAK) if text is not None else None
+
+
 @router.get("/{doc_id}")
 async def document_detail(
     request: Request,
     doc_id: UUID,
+    page: int = Query(default=1, ge=1),
     db: AsyncSession = Depends(get_db),
 ):
-    """View a single document with annotations."""
+    """View a single document with annotations, one page of text at a time."""
     templates = request.app.state.templates
 
     query = (
         select(Document)
         .where(Document.id == doc_id)
-        .options(selectinload(Document.mentions).selectinload(EntityMention.entity))
+        .options(
+            defer(Document.extracted_text),
+            selectinload(Document.mentions).selectinload(EntityMention.entity),
+        )
     )
     doc = (await db.execute(query)).scalar_one_or_none()
 
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    if doc.page_offsets:
+        page = min(page, len(doc.page_offsets))
+        text = await load_page_text(db, doc, page)
+    else:
+        # Extracted before page offsets were recorded — show the whole text
+        text = (
+            await db.execute(select(Document.extracted_text).where(Document.id == doc.id))
+        ).scalar()
+
+    # Byte-identical duplicates reuse the canonical document's entities
+    mentions = doc.mentions
+    if doc.canonical_id:
+        mentions_query = (
+            select(EntityMention)
+            .where(EntityMention.document_id == doc.canonical_id)
+            .options(selectinload(EntityMention.entity))
+        )
+        mentions = (await db.execute(mentions_query)).scalars().all()
+
     return templates.TemplateResponse(
         "document.html",
         {
             "request": request,
             "doc": doc,
-            "mentions": doc.mentions,
+            "text": text,
+            "page": page,
+            "total_pages": len(doc.page_offsets or []),
+            "mentions": mentions,
         },
     )
+
+
+@router.get("/{doc_id}/original")
+async def document_original(doc_id: UUID, db: AsyncSession = Depends(get_db)):
+    """The original file: a redirect for remote sources, otherwise streamed from the blob store."""
+    doc = (
+        await db.execute(
+            select(Document.blob_url, Document.content_sha256, Document.filename).where(
+                Document.id == doc_id
+            )
+        )
+    ).one_or_none()
+    if not doc or not doc.blob_url:
+        raise HTTPException(status_code=404, detail="Original not available")
+    if doc.blob_url.startswith(("http://", "https://")):
+        return RedirectResponse(doc.blob_url)
+
+    media_type = mimetypes.guess_type(doc.filename)[0] or "application/octet-stream"
+    return StreamingResponse(
+        get_blob_store().chunks(blob_key(doc.content_sha256)), media_type=media_type
+    )
@@ -0,0 +1,111 @@
+"""Redaction analyzer — documents sorted by redaction density, with histograms.
+
+Reads only the aggregate tables kept by the redaction stage
+(`src.nlp.redaction_stats`): the list walks the score indexes of
+`redaction_stats`, and counts and histograms come from
+`redaction_histograms`.
+"""
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Document, RedactionHistogram, RedactionStats
+from src.db.session import get_db
+from src.nlp.redaction_stats import SCORE_BUCKETS, bucket_label
+
+router = APIRouter(prefix="/redactions", tags=["redactions"])
+
+
+@router.get("")
+async def redaction_list(
+    request: Request,
+    source: str = Query(default="", description="Filter by source"),
+    dataset: str = Query(default="", description="Filter by dataset"),
+    min_bucket: int = Query(default=1, ge=0, le=SCORE_BUCKETS, description="Lowest score bucket"),
+    page: int = Query(default=1, ge=1),
+    per_page: int = Query(default=50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    """Browse documents by redaction score."""
+    templates = request.app.state.templates
+
+    filters = []
+    histogram_filters = []
+    if source:
+        filters.append(RedactionStats.source == source)
+        histogram_filters.append(RedactionHistogram.source == source)
+    if dataset:
+        filters.append(RedactionStats.dataset == dataset)
+        histogram_filters.append(RedactionHistogram.dataset == dataset)
+
+    # Histogram over all buckets for the current source/dataset
+    histogram_query = (
+        select(
+            RedactionHistogram.score_bucket,
+            func.sum(RedactionHistogram.doc_count),
+            func.sum(RedactionHistogram.page_count),
+            func.sum(RedactionHistogram.pages_with_redactions),
+            func.sum(RedactionHistogram.bar_count),
+            func.sum(RedactionHistogram.redacted_area),
+        )
+        .where(*histogram_filters)
+        .group_by(RedactionHistogram.score_bucket)
+    )
+    by_bucket = {row[0]: row[1:] for row in (await db.execute(histogram_query)).all()}
+    histogram = []
+    for bucket in range(SCORE_BUCKETS + 1):
+        docs, pages, redacted_pages, bars, area = by_bucket.get(bucket, (0, 0, 0, 0, 0.0))
+        histogram.append({
+            "bucket": bucket,
+            "label": bucket_label(bucket),
+            "docs": docs,
+            "pages": pages,
+            "redacted_pages": redacted_pages,
+            "bars": bars,
+            "area": area,
+        })
+    max_docs = max((h["docs"] for h in histogram), default=0)
+    total = sum(h["docs"] for h in histogram if h["bucket"] >= min_bucket)
+
+    # Top documents — ordered by the score index, buckets are monotonic in score
+    query = (
+        select(RedactionStats, Document.filename)
+        .join(Document, Document.id == RedactionStats.document_id)
+        .where(*filters, RedactionStats.score_bucket >= min_bucket)
+        .order_by(RedactionStats.redaction_score.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+    )
+    rows = (await db.execute(query)).all()
+
+    # Filter choices
+    choice_rows = (
+        await db.execute(
+            select(RedactionHistogram.source, RedactionHistogram.dataset)
+            .where(RedactionHistogram.doc_count > 0)
+            .distinct()
+        )
+    ).all()
+    sources = sorted({row[0] for row in choice_rows})
+    datasets = sorted(
+        {row[1] for row in choice_rows if row[1] and (not source or row[0] == source)}
+    )
+
+    return templates.TemplateResponse(
+        "redactions.html",
+        {
+            "request": request,
+            "rows": rows,
+            "total": total,
+            "histogram": histogram,
+            "max_docs": max_docs,
+            "source": source,
+            "dataset": dataset,
+            "min_bucket": min_bucket,
+            "page": page,
+            "per_page": per_page,
+            "sources": sources,
+            "datasets": datasets,
+        },
+    )
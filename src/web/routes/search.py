@@ -3,12 +3,15 @@
 from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy import func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 
 from src.db.models import Document
 from src.db.session import get_db
 
 router = APIRouter(prefix="/search", tags=["search"])
 
+SNIPPET_CHARS = 300
+
 
 @router.get("")
 async def search_page(
@@ -24,6 +27,7 @@ async def search_page(
     templates = request.app.state.templates
 
     results = []
+    snippets = {}
     total = 0
     search_time_ms = 0
 
@@ -38,7 +42,13 @@ async def search_page(
             query=q
         )
 
-        query = select(Document).where(search_filter)
+        # Only the first 300 characters are shown — don't load whole texts
+        snippet = func.left(Document.extracted_text, SNIPPET_CHARS + 1).label("snippet")
+        query = (
+            select(Document, snippet)
+            .options(defer(Document.extracted_text))
+            .where(search_filter)
+        )
 
         # Apply filters
         if source:
@@ -53,7 +63,9 @@ async def search_page(
         # Fetch page
         query = query.order_by(Document.created_at.desc())
         query = query.offset((page - 1) * per_page).limit(per_page)
-        results = (await db.execute(query)).scalars().all()
+        rows = (await db.execute(query)).all()
+        results = [doc for doc, _ in rows]
+        snippets = {doc.id: text for doc, text in rows}
 
         search_time_ms = round((time.monotonic() - start) * 1000, 1)
 
@@ -78,6 +90,8 @@ async def search_page(
             "source": source,
             "doc_type": doc_type,
             "results": results,
+            "snippets": snippets,
+            "snippet_chars": SNIPPET_CHARS,
             "total": total,
             "page": page,
             "per_page": per_page,
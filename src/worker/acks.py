@@ -0,0 +1,212 @@
+"""Batched job completion acknowledgements."""
+
+import asyncio
+import logging
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import bindparam, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import ProcessingJob
+from src.db.session import session_scope
+from src.worker.claims import ClaimedJob, RetryPolicy, enqueue_job_rows
+from src.worker.queue import JobQueue, PostgresQueue
+from src.worker.stages import downstream_stages, stage_priority
+
+logger = logging.getLogger(__name__)
+
+
+class AckBatcher:
+    """Buffers job completions and writes them in one transaction per flush.
+
+    The same transaction queues each completed job's downstream stages (see
+    `src.worker.stages`), so a document flows through the whole pipeline
+    without manual batch kicks. Failed jobs are requeued with exponential
+    backoff until `retry.max_attempts` is reached. Flushes when `batch_size`
+    acks are pending or every `flush_interval` seconds. A crash can lose at
+    most one unflushed batch; those jobs stay `running` until their lease
+    expires and are then re-run, which is safe because handlers replace
+    their previous output.
+
+    Once the transaction commits, the queue backend is told to delete
+    finished messages, delay retried ones and publish the downstream jobs
+    (all no-ops for `PostgresQueue`, where the rows are the queue).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        retry: RetryPolicy | None = None,
+        queue: JobQueue | None = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry = retry or RetryPolicy()
+        self.queue = queue or PostgresQueue()
+        # (job, status, error, next stages — None means the stage graph's)
+        self._pending: list[tuple[ClaimedJob, str, str | None, list[str] | None]] = []
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    def complete(self, job: ClaimedJob, next_stages: list[str] | None = None):
+        """Record a successful job.
+
+        `next_stages` overrides the stage graph's downstream job types.
+        """
+        self._add(job, "completed", None, next_stages)
+
+    def fail(self, job: ClaimedJob, error: str):
+        """Record a failed job."""
+        self._add(job, "failed", error[:500], None)
+
+    def start(self):
+        """Start the background flush loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Stop the flush loop and write anything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        """Write all pending acks in a single transaction."""
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            self._full.clear()
+            try:
+                async with session_scope() as db:
+                    retries, downstream = await self._write(db, batch)
+            except Exception:
+                # Put the batch back so the next flush retries it
+                self._pending = batch + self._pending
+                raise
+
+        retried = {job.id for job, _ in retries}
+        await self.queue.delete([job for job, *_ in batch if job.id not in retried])
+        for job, delay in retries:
+            await self.queue.release(job, delay)
+        if downstream:
+            await self.queue.publish(downstream)
+
+    async def _write(
+        self, db: AsyncSession, batch: list[tuple[ClaimedJob, str, str | None, list[str] | None]]
+    ) -> tuple[list[tuple[ClaimedJob, float]], list[dict]]:
+        """Record outcomes and queue downstream jobs of the completions that landed.
+
+        Returns (jobs to retry with their delay, inserted downstream rows).
+        """
+        now = datetime.now(UTC)
+        rows = []
+        retries = []
+        for job, status, error, _ in batch:
+            available_at = None
+            if status == "failed" and job.attempt < self.retry.max_attempts:
+                delay = self.retry.delay(job.attempt)
+                status = "queued"
+                available_at = now + timedelta(seconds=delay)
+                retries.append((job, delay))
+            rows.append({
+                "job_id": job.id,
+                "attempt": job.attempt,
+                "new_status": status,
+                "new_error": error,
+                "new_available_at": available_at or now,
+                "new_completed_at": None if status == "queued" else now,
+            })
+
+        table = ProcessingJob.__table__
+        values = {
+            "status": bindparam("new_status"),
+            "error": bindparam("new_error"),
+            "available_at": bindparam("new_available_at"),
+            "completed_at": bindparam("new_completed_at"),
+            "lease_expires_at": None,
+        }
+        completed = [
+            (job, next_stages) for job, status, _, next_stages in batch if status == "completed"
+        ]
+        if self.queue.uses_job_rows:
+            # Guarded by the lease token: a reclaimed job's stale ack is a no-op
+            stmt = update(table).where(
+                table.c.id == bindparam("job_id"),
+                table.c.attempts == bindparam("attempt"),
+                table.c.status == "running",
+            )
+            failures = [row for row in rows if row["new_status"] != "completed"]
+            if failures:
+                await db.execute(stmt.values(**values), failures)
+            # Completions share their values, so one UPDATE ... RETURNING tells
+            # which acks landed; only those queue downstream work
+            landed = set()
+            if completed:
+                stmt = (
+                    update(table)
+                    .where(
+                        tuple_(table.c.id, table.c.attempts).in_(
+                            [(job.id, job.attempt) for job, _ in completed]
+                        ),
+                        table.c.status == "running",
+                    )
+                    .values(
+                        status="completed",
+                        error=None,
+                        available_at=now,
+                        completed_at=now,
+                        lease_expires_at=None,
+                    )
+                    .returning(table.c.id)
+                )
+                landed = set((await db.execute(stmt)).scalars().all())
+        else:
+            # The queue backend owns delivery; rows only record the outcome
+            stmt = update(table).where(table.c.id == bindparam("job_id"))
+            values["attempts"] = bindparam("attempt")
+            await db.execute(stmt.values(**values), rows)
+            landed = {job.id for job, _ in completed}
+
+        downstream = [
+            {
+                "id": uuid4(),
+                "document_id": job.document_id,
+                "job_type": next_type,
+                "priority": stage_priority(next_type),
+            }
+            for job, next_stages in completed
+            if job.id in landed
+            for next_type in (
+                downstream_stages(job.job_type) if next_stages is None else next_stages
+            )
+        ]
+        if downstream:
+            downstream = await enqueue_job_rows(db, downstream)
+        return retries, downstream
+
+    def _add(
+        self, job: ClaimedJob, status: str, error: str | None, next_stages: list[str] | None
+    ):
+        self._pending.append((job, status, error, next_stages))
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush job acks")
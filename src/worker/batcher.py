@@ -0,0 +1,74 @@
+"""Cross-job request batching — one model run for many concurrent jobs."""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class RequestBatcher(ABC):
+    """Buffers requests from concurrent jobs and runs them as one batch.
+
+    Requests are buffered until they add up to `batch_size` (as measured by
+    `size`) or `timeout` seconds pass since the first one; `run` then
+    processes the whole buffer and each caller gets its own result back.
+    If the batch fails, every caller in it gets the exception.
+
+    The executor claims batched job types a batch at a time (see
+    `JobExecutor`), so a full batch of callers arrives together.
+    """
+
+    def __init__(self, batch_size: int, timeout: float):
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._pending: list[tuple[Any, asyncio.Future]] = []
+        self._pending_size = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def size(self, request) -> int:
+        """How much of `batch_size` a request takes up."""
+        return 1
+
+    @abstractmethod
+    async def run(self, requests: list) -> list:
+        """Process buffered requests; returns one result per request, in order."""
+
+    async def submit(self, request):
+        """Buffer `request` and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future))
+        self._pending_size += self.size(request)
+
+        if self._pending_size >= self.batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.timeout, self._start_flush)
+
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        self._pending_size = 0
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.run([request for request, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results, strict=True):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,216 @@
+"""Batch job claiming, leases and enqueueing on the processing_jobs table."""
+
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from uuid import UUID
+
+from sqlalchemy import and_, case, func, or_, select, text, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+from src.db.models import ProcessingJob
+from src.worker.notify import notify_jobs_queued
+
+logger = logging.getLogger(__name__)
+
+# Error recorded on jobs whose worker stopped heartbeating
+LEASE_EXPIRED_ERROR = "Lease expired (worker lost)"
+# Job rows per insert statement (4 bind parameters each, Postgres allows 32767)
+ENQUEUE_BATCH_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class ClaimedJob:
+    """A job moved to `running` by `claim_jobs`.
+
+    `attempt` is the job's attempt counter after this claim; it doubles as
+    the lease token, so a worker whose lease was reclaimed can no longer
+    heartbeat or ack the job.
+    """
+
+    id: UUID
+    document_id: UUID
+    job_type: str
+    attempt: int = 1
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retry counts and exponential backoff for failed or orphaned jobs."""
+
+    max_attempts: int = 5
+    base_delay: float = 30.0
+    max_delay: float = 3600.0
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        settings = get_settings()
+        return cls(
+            max_attempts=settings.job_max_attempts,
+            base_delay=settings.job_retry_base_delay,
+            max_delay=settings.job_retry_max_delay,
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retrying after failed attempt number `attempt`."""
+        return min(self.base_delay * 2 ** max(attempt - 1, 0), self.max_delay)
+
+
+async def claim_jobs(
+    db: AsyncSession, limit: int | dict[str, int], lease_seconds: float = 120
+) -> list[ClaimedJob]:
+    """Atomically move queued jobs to `running` and return them.
+
+    `limit` is either a total count or a per-job-type quota (see
+    `LaneScheduler.plan`). One round-trip: each job type's candidates are a
+    `SELECT ... LIMIT n FOR UPDATE SKIP LOCKED` CTE, and
+    UPDATE ... WHERE id IN (the UNION ALL of the CTEs) RETURNING ... claims
+    them, so concurrent workers never claim the same row. One IN over the
+    union plans as a semi-join on the primary key; an OR of IN sublinks
+    would scan the whole table. Each claim bumps `attempts` and holds a
+    lease for `lease_seconds`, which the worker must extend with
+    `heartbeat_jobs`. Jobs still backing off (`available_at` in the future)
+    are skipped.
+    The caller owns the transaction and must commit.
+    """
+    quotas = {None: limit} if isinstance(limit, int) else limit
+    claimed = []
+    for job_type, count in quotas.items():
+        if count <= 0:
+            continue
+        candidates = (
+            select(ProcessingJob.id)
+            .where(ProcessingJob.status == "queued", ProcessingJob.available_at <= func.now())
+            .order_by(ProcessingJob.priority.asc(), ProcessingJob.created_at.asc())
+            .limit(count)
+            .with_for_update(skip_locked=True)
+        )
+        if job_type is not None:
+            candidates = candidates.where(ProcessingJob.job_type == job_type)
+        # Postgres forbids FOR UPDATE inside UNION inputs, so each lane is a CTE
+        lane = candidates.cte(f"claim_{len(claimed)}")
+        claimed.append(select(lane.c.id))
+    if not claimed:
+        return []
+    ids = claimed[0] if len(claimed) == 1 else union_all(*claimed)
+
+    stmt = (
+        update(ProcessingJob)
+        .where(ProcessingJob.id.in_(ids))
+        .values(
+            status="running",
+            started_at=func.now(),
+            attempts=ProcessingJob.attempts + 1,
+            lease_expires_at=func.now() + timedelta(seconds=lease_seconds),
+        )
+        .returning(
+            ProcessingJob.id,
+            ProcessingJob.document_id,
+            ProcessingJob.job_type,
+            ProcessingJob.attempts,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await db.execute(stmt)).all()
+    return [
+        ClaimedJob(id=r.id, document_id=r.document_id, job_type=r.job_type, attempt=r.attempts)
+        for r in rows
+    ]
+
+
+async def heartbeat_jobs(db: AsyncSession, jobs: list[ClaimedJob], lease_seconds: float) -> int:
+    """Extend the leases of running jobs in one statement.
+
+    Returns the number of leases extended; jobs missing from the count were
+    reclaimed by another worker and will be re-run there.
+    """
+    if not jobs:
+        return 0
+    stmt = (
+        update(ProcessingJob)
+        .where(
+            tuple_(ProcessingJob.id, ProcessingJob.attempts).in_(
+                [(job.id, job.attempt) for job in jobs]
+            ),
+            ProcessingJob.status == "running",
+        )
+        .values(lease_expires_at=func.now() + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+    return result.rowcount
+
+
+async def reclaim_expired_jobs(db: AsyncSession, retry: RetryPolicy) -> int:
+    """Requeue running jobs whose lease expired (the worker died or was evicted).
+
+    Jobs that have used up `retry.max_attempts` are marked failed instead.
+    Requeued jobs back off exponentially via `available_at`. Safe to run
+    from every worker concurrently. Returns the number of jobs reclaimed.
+    """
+    exhausted = ProcessingJob.attempts >= retry.max_attempts
+    backoff = func.least(
+        retry.base_delay * func.power(2, func.greatest(ProcessingJob.attempts - 1, 0)),
+        retry.max_delay,
+    )
+    stmt = (
+        update(ProcessingJob)
+        .where(
+            ProcessingJob.status == "running",
+            or_(
+                ProcessingJob.lease_expires_at < func.now(),
+                # Claimed before leases existed
+                and_(
+                    ProcessingJob.lease_expires_at.is_(None),
+                    ProcessingJob.started_at < func.now() - timedelta(hours=1),
+                ),
+            ),
+        )
+        .values(
+            status=case((exhausted, "failed"), else_="queued"),
+            error=LEASE_EXPIRED_ERROR,
+            lease_expires_at=None,
+            available_at=func.now() + func.make_interval(0, 0, 0, 0, 0, 0, backoff),
+            completed_at=case((exhausted, func.now()), else_=None),
+        )
+        .returning(ProcessingJob.id)
+        .execution_options(synchronize_session=False)
+    )
+    reclaimed = (await db.execute(stmt)).scalars().all()
+    if reclaimed:
+        logger.warning(f"Reclaimed {len(reclaimed)} jobs with expired leases")
+        await notify_jobs_queued(db)
+    return len(reclaimed)
+
+
+async def enqueue_job_rows(db: AsyncSession, rows: list[dict]) -> list[dict]:
+    """Queue processing jobs and wake idle workers when `db` commits.
+
+    Rows already queued (and not yet attempted) for the same (document, job
+    type) are skipped, so re-running a stage never double-queues its
+    downstream work. Returns the rows actually inserted, for
+    `JobQueue.publish` once the transaction has committed.
+    """
+    inserted = []
+    for i in range(0, len(rows), ENQUEUE_BATCH_SIZE):
+        stmt = (
+            pg_insert(ProcessingJob)
+            .values(rows[i : i + ENQUEUE_BATCH_SIZE])
+            .on_conflict_do_nothing(
+                index_elements=["document_id", "job_type"],
+                # Literal predicate so Postgres can infer the partial unique index
+                index_where=text("status = 'queued' AND attempts = 0"),
+            )
+            .returning(
+                ProcessingJob.id,
+                ProcessingJob.document_id,
+                ProcessingJob.job_type,
+                ProcessingJob.priority,
+            )
+        )
+        inserted += [dict(row) for row in (await db.execute(stmt)).mappings()]
+    if inserted:
+        await notify_jobs_queued(db)
+    return inserted
@@ -1,19 +1,25 @@
-"""Background worker — polls for processing jobs and executes them."""
+"""Background worker — claims processing jobs and executes them."""
 
 import asyncio
 import logging
-from datetime import datetime, timezone
-
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession
+import signal
+from collections import Counter
 
 from src.config import get_settings
-from src.db.models import Document, ProcessingJob
-from src.db.session import get_db, init_db
+from src.db.session import close_db, init_db, session_scope
+from src.ingest.storage import close_blob_store
+from src.nlp.embedder import generate_embeddings
 from src.nlp.extractor import extract_text_from_pdf
 from src.nlp.ner import extract_entities
-from src.nlp.embedder import generate_embeddings
+from src.nlp.ocr import ocr_document
+from src.nlp.pdf_analyze import analyze_pdf_document
 from src.nlp.redaction import detect_redactions
+from src.worker.acks import AckBatcher
+from src.worker.claims import ClaimedJob, RetryPolicy
+from src.worker.notify import JobListener
+from src.worker.pool import shutdown_pool
+from src.worker.queue import JobQueue, get_queue
+from src.worker.scheduler import LaneScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -23,64 +29,245 @@ JOB_HANDLERS = {
     "ner": extract_entities,
     "embed": generate_embeddings,
     "detect_redaction": detect_redactions,
+    "pdf_analyze": analyze_pdf_document,
+    "ocr": ocr_document,
 }
 
 
-async def process_job(job: ProcessingJob, db: AsyncSession):
-    """Execute a single processing job."""
+async def run_job(job: ClaimedJob, acks: AckBatcher):
+    """Execute a single claimed job in its own session and ack the result.
+
+    Handlers end their read transaction once their inputs are loaded
+    (`load_document`), so the session only holds a connection while it
+    reads and for the short write at the end — not while the job computes.
+    """
     handler = JOB_HANDLERS.get(job.job_type)
     if not handler:
         logger.error(f"Unknown job type: {job.job_type}")
+        acks.fail(job, f"Unknown job type: {job.job_type}")
         return
 
-    # Mark running
-    job.status = "running"
-    job.started_at = datetime.now(timezone.utc)
-    await db.commit()
-
     try:
-        await handler(job.document_id, db)
-        job.status = "completed"
-        job.completed_at = datetime.now(timezone.utc)
-        logger.info(f"Job {job.id} ({job.job_type}) completed for doc {job.document_id}")
+        async with session_scope() as db:
+            # A handler may return the job types to queue next instead of the stage graph's
+            next_stages = await handler(job.document_id, db)
     except Exception as e:
-        job.status = "failed"
-        job.error = str(e)[:500]
-        job.completed_at = datetime.now(timezone.utc)
         logger.exception(f"Job {job.id} ({job.job_type}) failed: {e}")
+        acks.fail(job, str(e))
+        return
 
-    await db.commit()
+    acks.complete(job, next_stages)
+    logger.info(f"Job {job.id} ({job.job_type}) completed for doc {job.document_id}")
 
 
-async def worker_loop():
-    """Main worker loop — poll for queued jobs."""
-    settings = get_settings()
-    await init_db()
+async def run_jobs(jobs: list[ClaimedJob], acks: AckBatcher):
+    """Run jobs claimed together as one slot, concurrently.
+
+    Their model calls meet in the stage's `RequestBatcher` and share one
+    batch; each job still loads, writes and acks its own document.
+    """
+    await asyncio.gather(*(run_job(job, acks) for job in jobs))
 
-    logger.info(f"Worker started (max concurrent: {settings.max_concurrent_jobs})")
 
-    while True:
+class JobExecutor:
+    """Keeps up to `max_concurrent` slots busy.
+
+    Free slots are split across job types by a `LaneScheduler` and filled
+    with one batch receive from the queue backend. A slot runs one job with
+    its own session — or, for job types in `batch_sizes`, up to that many
+    jobs claimed together (`run_jobs`), so a batched model stage gets a full
+    batch from one slot and lane limits cap batches rather than documents.
+    Completions are acknowledged in batches. Every claim carries a lease
+    (visibility timeout) that a background heartbeat extends while the job
+    runs; the same loop lets the backend recover other workers' expired
+    leases.
+    When the queue is empty the executor sleeps until `wake()` (called on
+    NOTIFY), a slot frees up, or `poll_interval` seconds pass.
+    `stop()` stops claiming; `run()` returns once in-flight jobs have drained.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        queue: JobQueue,
+        acks: AckBatcher,
+        scheduler: LaneScheduler,
+        poll_interval: float = 30.0,
+        lease_seconds: float = 120.0,
+        batch_sizes: dict[str, int] | None = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.queue = queue
+        self.acks = acks
+        self.scheduler = scheduler
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.batch_sizes = batch_sizes or {}
+        self._tasks: dict[asyncio.Task, list[ClaimedJob]] = {}  # slot -> its jobs
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    @property
+    def in_flight(self) -> int:
+        """Busy slots."""
+        return len(self._tasks)
+
+    def stop(self):
+        """Stop claiming new jobs."""
+        if not self._stopping.is_set():
+            jobs = sum(len(slot) for slot in self._tasks.values())
+            logger.info(f"Shutdown requested — draining {jobs} in-flight jobs")
+        self._stopping.set()
+        self._wakeup.set()
+
+    def wake(self):
+        """Claim again immediately (new jobs were queued)."""
+        self._wakeup.set()
+
+    async def run(self):
+        """Claim jobs until stopped, keeping every free slot busy."""
+        self.acks.start()
+        leases = asyncio.create_task(self._lease_loop())
         try:
-            async for db in get_db():
-                # Fetch next queued job
-                query = (
-                    select(ProcessingJob)
-                    .where(ProcessingJob.status == "queued")
-                    .order_by(ProcessingJob.priority.asc(), ProcessingJob.created_at.asc())
-                    .limit(1)
-                    .with_for_update(skip_locked=True)
+            while not self._stopping.is_set():
+                # Clear before claiming so a wake-up during the claim isn't lost
+                self._wakeup.clear()
+                free = self.max_concurrent - self.in_flight
+                if free <= 0:
+                    await self._wait(None)
+                    continue
+
+                try:
+                    claimed = await self._claim(free)
+                except Exception:
+                    logger.exception("Failed to claim jobs")
+                    await self._wait(10)
+                    continue
+
+                if not claimed:
+                    await self._wait(self.poll_interval)
+
+            await self.drain()
+        finally:
+            leases.cancel()
+            await self.acks.close()
+
+    async def _claim(self, free: int) -> int:
+        """Fill up to `free` slots with a fair-share mix of job types.
+
+        Lanes that come back short are treated as empty and their share is
+        re-planned across the others, so idle lanes don't waste slots.
+        Returns the number of jobs started.
+        """
+        empty: set[str] = set()
+        started = 0
+        while free > 0:
+            running = Counter(slot[0].job_type for slot in self._tasks.values())
+            quotas = self.scheduler.plan(free, running, exclude=empty)
+            if not quotas:
+                break
+
+            wanted = {t: n * self.batch_sizes.get(t, 1) for t, n in quotas.items()}
+            jobs = await self.queue.receive(wanted, self.lease_seconds)
+
+            slots = self._slots(jobs)
+            for slot in slots:
+                task = asyncio.create_task(
+                    run_job(slot[0], self.acks) if len(slot) == 1 else run_jobs(slot, self.acks)
                 )
-                job = (await db.execute(query)).scalar_one_or_none()
+                self._tasks[task] = slot
+                task.add_done_callback(self._on_done)
+
+            got = Counter(job.job_type for job in jobs)
+            empty |= {job_type for job_type, n in wanted.items() if got[job_type] < n}
+            started += len(jobs)
+            free -= len(slots)
+        return started
+
+    def _slots(self, jobs: list[ClaimedJob]) -> list[list[ClaimedJob]]:
+        """Group received jobs into slots of up to their type's batch size."""
+        by_type: dict[str, list[ClaimedJob]] = {}
+        for job in jobs:
+            by_type.setdefault(job.job_type, []).append(job)
+        slots = []
+        for job_type, same_type in by_type.items():
+            size = self.batch_sizes.get(job_type, 1)
+            slots += [same_type[i : i + size] for i in range(0, len(same_type), size)]
+        return slots
+
+    async def drain(self):
+        """Wait for all in-flight jobs to finish."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _on_done(self, task: asyncio.Task):
+        self._tasks.pop(task, None)
+        self._wakeup.set()
+        if not task.cancelled() and task.exception():
+            logger.error(f"Job task crashed: {task.exception()!r}")
+
+    async def _lease_loop(self):
+        """Heartbeat our leases and reclaim expired ones, several times per lease."""
+        interval = self.lease_seconds / 4
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                jobs = [job for slot in self._tasks.values() for job in slot]
+                extended = await self.queue.extend(jobs, self.lease_seconds)
+                if extended < len(jobs):
+                    logger.warning(f"{len(jobs) - extended} in-flight jobs lost their lease")
+                await self.queue.reclaim(self.acks.retry)
+            except Exception:
+                logger.exception("Lease heartbeat failed")
+
+    async def _wait(self, timeout: float | None):
+        """Sleep until woken, a slot frees up, shutdown, or `timeout` seconds pass."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except TimeoutError:
+            pass
 
-                if job:
-                    await process_job(job, db)
-                else:
-                    # No jobs — sleep
-                    await asyncio.sleep(5)
 
-        except Exception:
-            logger.exception("Worker loop error")
-            await asyncio.sleep(10)
+async def worker_loop():
+    """Main worker loop — run jobs concurrently until SIGINT/SIGTERM."""
+    settings = get_settings()
+    await init_db()
+
+    queue = get_queue()
+    await queue.start()
+    acks = AckBatcher(
+        settings.ack_batch_size, settings.ack_flush_interval, RetryPolicy.from_settings(), queue
+    )
+    executor = JobExecutor(
+        settings.max_concurrent_jobs,
+        queue,
+        acks,
+        LaneScheduler(
+            list(JOB_HANDLERS), settings.job_type_limits, settings.job_type_weights
+        ),
+        poll_interval=settings.job_poll_interval,
+        lease_seconds=settings.job_lease_seconds,
+        batch_sizes={"ner": settings.ner_batch_size, "embed": settings.embedding_batch_size},
+    )
+    listener = JobListener(executor.wake)
+    listener.start()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, executor.stop)
+
+    logger.info(
+        f"Worker started (max concurrent: {settings.max_concurrent_jobs}, "
+        f"queue: {settings.queue_backend})"
+    )
+    try:
+        await executor.run()
+    finally:
+        await listener.close()
+        await queue.close()
+        await close_blob_store()
+        shutdown_pool()
+        await close_db()
+    logger.info("Worker stopped")
 
 
 def main():
@@ -0,0 +1,82 @@
+"""Postgres LISTEN/NOTIFY wake-ups for idle workers."""
+
+import asyncio
+import logging
+from collections.abc import Callable
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Channel published to whenever processing jobs are queued
+JOBS_CHANNEL = "processing_jobs"
+
+# Seconds between reconnect attempts after the listener connection drops
+RECONNECT_DELAY = 5
+
+
+async def notify_jobs_queued(db: AsyncSession):
+    """Publish a wake-up on the jobs channel.
+
+    Postgres delivers it when `db` commits (and drops it on rollback), so
+    workers never wake before the queued rows are visible.
+    """
+    await db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": JOBS_CHANNEL})
+
+
+class JobListener:
+    """Holds a dedicated connection LISTENing on the jobs channel.
+
+    Calls `on_notify` for every notification and reconnects if the
+    connection drops. Missed notifications are covered by the worker's
+    fallback poll.
+    """
+
+    def __init__(self, on_notify: Callable[[], None], dsn: str | None = None):
+        self.on_notify = on_notify
+        self.dsn = dsn or get_settings().database_url_sync
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Start listening in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen_loop())
+
+    async def close(self):
+        """Stop listening and close the connection."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen_loop(self):
+        while True:
+            lost = asyncio.Event()
+            try:
+                conn = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning(f"Job listener could not connect ({e}); relying on polling")
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+
+            try:
+                conn.add_termination_listener(lambda _conn, lost=lost: lost.set())
+                await conn.add_listener(JOBS_CHANNEL, self._on_notification)
+                logger.info(f"Listening for jobs on channel '{JOBS_CHANNEL}'")
+                # Jobs may have been queued while we were disconnected
+                self.on_notify()
+                await lost.wait()
+                logger.warning("Job listener connection lost; reconnecting")
+            finally:
+                await conn.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _on_notification(self, _conn, _pid: int, _channel: str, _payload: str):
+        self.on_notify()
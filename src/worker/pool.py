@@ -0,0 +1,68 @@
+"""Process pool for CPU-bound job work (PDF parsing, spaCy, sentence-transformers).
+
+Job handlers stay `async` and keep their DB reads/writes on the event loop;
+the pure compute functions they call are shipped here so one worker
+container can use all of its cores without stalling other jobs' I/O.
+
+Models are loaded lazily by each pool process (the `get_nlp` / `get_model`
+singletons are per-process), so a process pays the load cost once and only
+for the models it actually uses.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _init_process():
+    """Pool process initializer."""
+    # Ctrl-C goes to the whole process group; let the parent drain jobs instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # One process per core already — keep torch/BLAS from oversubscribing
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")  # Tesseract
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s[%(process)d]: %(message)s",
+    )
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Lazy-create the shared process pool."""
+    global _pool
+    if _pool is None:
+        settings = get_settings()
+        workers = settings.cpu_workers or os.cpu_count() or 1
+        # spawn, not fork: the parent holds an event loop, DB sockets and threads
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process,
+        )
+        logger.info(f"Started CPU process pool with {workers} processes")
+    return _pool
+
+
+async def run_in_pool(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a picklable, module-level function in the process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), fn, *args)
+
+
+def shutdown_pool():
+    """Shut down the process pool, waiting for running tasks."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
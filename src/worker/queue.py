@@ -0,0 +1,437 @@
+"""Pluggable job queue backends — Postgres, in-memory and Azure Queue Storage.
+
+`processing_jobs` rows stay the system of record for job status; a queue
+backend is the transport workers receive from. With the Postgres backend
+the rows *are* the queue. The in-memory and Azure backends carry the hot
+receive / heartbeat / delete traffic themselves, so the database only sees
+enqueue inserts and batched status writes.
+
+Every backend supports batch receive with a visibility timeout (a received
+job is hidden until it is deleted or the timeout passes), extending that
+timeout while the job runs, and batch delete.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+
+from src.config import get_settings
+from src.db.models import ProcessingJob
+from src.db.session import session_scope
+from src.worker.claims import (
+    LEASE_EXPIRED_ERROR,
+    ClaimedJob,
+    RetryPolicy,
+    claim_jobs,
+    heartbeat_jobs,
+    reclaim_expired_jobs,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue(ABC):
+    """Transport for processing jobs.
+
+    Enqueueers insert `processing_jobs` rows and, once that transaction has
+    committed, call `publish` with the same rows.
+    """
+
+    # True when processing_jobs rows are the queue itself (status changes
+    # are receives/deletes, guarded by the lease token)
+    uses_job_rows = False
+
+    async def start(self):  # noqa: B027 — optional hook
+        """Connect / create resources before the first receive."""
+
+    async def close(self):  # noqa: B027 — optional hook
+        """Release connections."""
+
+    @abstractmethod
+    async def publish(self, rows: list[dict]):
+        """Make committed processing_jobs rows receivable."""
+
+    @abstractmethod
+    async def receive(self, quotas: dict[str, int], visibility_timeout: float) -> list[ClaimedJob]:
+        """Receive up to `quotas[job_type]` jobs per type, hidden for `visibility_timeout`s."""
+
+    @abstractmethod
+    async def extend(self, jobs: list[ClaimedJob], visibility_timeout: float) -> int:
+        """Push back the visibility timeout of running jobs; returns how many are still held."""
+
+    @abstractmethod
+    async def delete(self, jobs: list[ClaimedJob]):
+        """Remove finished jobs from the queue."""
+
+    @abstractmethod
+    async def release(self, job: ClaimedJob, delay: float):
+        """Make a received job visible again after `delay` seconds (retry)."""
+
+    async def reclaim(self, retry: RetryPolicy) -> int:
+        """Recover jobs orphaned by dead workers; returns how many were recovered."""
+        return 0
+
+
+class PostgresQueue(JobQueue):
+    """`processing_jobs` as the queue: SKIP LOCKED claims and row leases."""
+
+    uses_job_rows = True
+
+    async def publish(self, rows: list[dict]):
+        # Committed rows are already claimable
+        pass
+
+    async def receive(self, quotas: dict[str, int], visibility_timeout: float) -> list[ClaimedJob]:
+        async with session_scope() as db:
+            return await claim_jobs(db, quotas, visibility_timeout)
+
+    async def extend(self, jobs: list[ClaimedJob], visibility_timeout: float) -> int:
+        async with session_scope() as db:
+            return await heartbeat_jobs(db, jobs, visibility_timeout)
+
+    async def delete(self, jobs: list[ClaimedJob]):
+        # The ack transaction already moved the rows out of `running`
+        pass
+
+    async def release(self, job: ClaimedJob, delay: float):
+        # The ack transaction already requeued the row with `available_at`
+        pass
+
+    async def reclaim(self, retry: RetryPolicy) -> int:
+        async with session_scope() as db:
+            return await reclaim_expired_jobs(db, retry)
+
+
+def _job_from_row(row: dict, attempt: int = 1) -> ClaimedJob:
+    return ClaimedJob(
+        id=UUID(str(row["id"])),
+        document_id=UUID(str(row["document_id"])),
+        job_type=row["job_type"],
+        attempt=attempt,
+    )
+
+
+class MemoryQueue(JobQueue):
+    """In-process queue for tests and single-node runs.
+
+    Per-job-type heaps ordered by (priority, arrival). Received jobs sit in
+    an in-flight table until deleted; expired ones become visible again on
+    the next receive. With `preload`, `start()` loads rows already queued
+    in the database.
+
+    Only works in-process: jobs published by another process (e.g. a
+    separate import run) land in that process's memory and are only seen
+    by a worker the next time it starts and preloads.
+    """
+
+    def __init__(self, preload: bool = False):
+        self.preload = preload
+        self._ready: dict[str, list[tuple[int, int, float, ClaimedJob]]] = {}
+        self._in_flight: dict[UUID, tuple[ClaimedJob, float, int]] = {}
+        self._seq = itertools.count()
+
+    async def start(self):
+        if not self.preload:
+            return
+        async with session_scope() as db:
+            rows = (
+                await db.execute(
+                    select(
+                        ProcessingJob.id,
+                        ProcessingJob.document_id,
+                        ProcessingJob.job_type,
+                        ProcessingJob.priority,
+                    ).where(ProcessingJob.status == "queued")
+                )
+            ).mappings().all()
+        await self.publish([dict(r) for r in rows])
+        logger.info(f"Memory queue preloaded {len(rows)} queued jobs")
+
+    async def publish(self, rows: list[dict]):
+        for row in rows:
+            self._push(_job_from_row(row), row.get("priority", 5), 0.0)
+
+    async def receive(self, quotas: dict[str, int], visibility_timeout: float) -> list[ClaimedJob]:
+        now = time.monotonic()
+        self._requeue_expired(now)
+
+        received = []
+        for job_type, count in quotas.items():
+            heap = self._ready.get(job_type, [])
+            deferred = []
+            while heap and count > 0:
+                priority, seq, not_before, job = heapq.heappop(heap)
+                if not_before > now:
+                    deferred.append((priority, seq, not_before, job))
+                    continue
+                self._in_flight[job.id] = (job, now + visibility_timeout, priority)
+                received.append(job)
+                count -= 1
+            for item in deferred:
+                heapq.heappush(heap, item)
+        return received
+
+    async def extend(self, jobs: list[ClaimedJob], visibility_timeout: float) -> int:
+        deadline = time.monotonic() + visibility_timeout
+        held = 0
+        for job in jobs:
+            entry = self._in_flight.get(job.id)
+            if entry and entry[0].attempt == job.attempt:
+                self._in_flight[job.id] = (entry[0], deadline, entry[2])
+                held += 1
+        return held
+
+    async def delete(self, jobs: list[ClaimedJob]):
+        for job in jobs:
+            entry = self._in_flight.get(job.id)
+            if entry and entry[0].attempt == job.attempt:
+                del self._in_flight[job.id]
+
+    async def release(self, job: ClaimedJob, delay: float):
+        entry = self._in_flight.pop(job.id, None)
+        if entry:
+            self._push(self._next_attempt(entry[0]), entry[2], time.monotonic() + delay)
+
+    def _push(self, job: ClaimedJob, priority: int, not_before: float):
+        heap = self._ready.setdefault(job.job_type, [])
+        heapq.heappush(heap, (priority, next(self._seq), not_before, job))
+
+    def _next_attempt(self, job: ClaimedJob) -> ClaimedJob:
+        return ClaimedJob(job.id, job.document_id, job.job_type, job.attempt + 1)
+
+    def _requeue_expired(self, now: float):
+        expired = [job_id for job_id, (_, deadline, _) in self._in_flight.items() if deadline < now]
+        for job_id in expired:
+            job, _, priority = self._in_flight.pop(job_id)
+            self._push(self._next_attempt(job), priority, now)
+
+
+class AzureQueue(JobQueue):
+    """Azure Queue Storage — one queue per job type (`{name}-{job-type}`).
+
+    Works against Azurite with `UseDevelopmentStorage=true`. Azure queues
+    have no priorities (FIFO-ish per lane) and no batch delete API, so
+    deletes run concurrently. A message received more than
+    `retry.max_attempts` times (its worker kept dying) is marked failed
+    and dropped.
+
+    Published rows get `published_at`. `reclaim` republishes queued rows
+    that never got it (the enqueuer committed, then failed to publish)
+    once they are `REPUBLISH_AFTER` seconds old.
+    """
+
+    # Azure caps a single receive at 32 messages
+    MAX_RECEIVE = 32
+    # Age at which an unpublished queued row is assumed lost, and rows per reclaim pass
+    REPUBLISH_AFTER = 300.0
+    REPUBLISH_BATCH = 500
+
+    def __init__(self, connection_string: str, queue_name: str, retry: RetryPolicy | None = None):
+        self.connection_string = connection_string
+        self.queue_name = queue_name
+        self.retry = retry or RetryPolicy()
+        self._service = None
+        self._clients: dict[str, object] = {}
+        # job id -> (message id, pop receipt); receipts change on every update
+        self._receipts: dict[UUID, tuple[str, str]] = {}
+
+    async def start(self):
+        self._service_client()
+
+    def _service_client(self):
+        if self._service is None:
+            from azure.storage.queue.aio import QueueServiceClient
+
+            self._service = QueueServiceClient.from_connection_string(self.connection_string)
+        return self._service
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+        if self._service is not None:
+            await self._service.close()
+            self._service = None
+
+    async def _client(self, job_type: str):
+        client = self._clients.get(job_type)
+        if client is None:
+            from azure.core.exceptions import ResourceExistsError
+
+            name = f"{self.queue_name}-{job_type}".lower().replace("_", "-")
+            client = self._service_client().get_queue_client(name)
+            try:
+                await client.create_queue()
+            except ResourceExistsError:
+                pass
+            self._clients[job_type] = client
+        return client
+
+    async def publish(self, rows: list[dict]):
+        if not rows:
+            return
+        await self._send(rows)
+        async with session_scope() as db:
+            await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id.in_([row["id"] for row in rows]))
+                .values(published_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+
+    async def _send(self, rows: list[dict]):
+        async def send(row: dict):
+            client = await self._client(row["job_type"])
+            body = {"id": str(row["id"]), "document_id": str(row["document_id"])}
+            await client.send_message(json.dumps(body))
+
+        await asyncio.gather(*(send(row) for row in rows))
+
+    async def reclaim(self, retry: RetryPolicy) -> int:
+        """Republish queued rows whose publish never happened.
+
+        Rows are marked and sent in one transaction (SKIP LOCKED, so
+        concurrent workers take different rows); a failed send rolls the
+        marks back for the next pass. Expired leases need no work here —
+        Azure makes their messages visible again by itself.
+        """
+        async with session_scope() as db:
+            lost = (
+                select(ProcessingJob.id)
+                .where(
+                    ProcessingJob.status == "queued",
+                    ProcessingJob.published_at.is_(None),
+                    ProcessingJob.created_at
+                    < func.now() - timedelta(seconds=self.REPUBLISH_AFTER),
+                )
+                .order_by(ProcessingJob.created_at)
+                .limit(self.REPUBLISH_BATCH)
+                .with_for_update(skip_locked=True)
+            )
+            rows = (
+                await db.execute(
+                    update(ProcessingJob)
+                    .where(ProcessingJob.id.in_(lost))
+                    .values(published_at=func.now())
+                    .returning(
+                        ProcessingJob.id, ProcessingJob.document_id, ProcessingJob.job_type
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            ).mappings().all()
+            if rows:
+                await self._send([dict(row) for row in rows])
+                logger.warning(f"Republished {len(rows)} jobs that were never published")
+        return len(rows)
+
+    async def receive(self, quotas: dict[str, int], visibility_timeout: float) -> list[ClaimedJob]:
+        results = await asyncio.gather(
+            *(
+                self._receive_lane(job_type, min(count, self.MAX_RECEIVE), visibility_timeout)
+                for job_type, count in quotas.items()
+                if count > 0
+            )
+        )
+        return [job for lane in results for job in lane]
+
+    async def _receive_lane(self, job_type: str, count: int, visibility_timeout: float):
+        client = await self._client(job_type)
+        received, poisoned = [], []
+        messages = client.receive_messages(
+            messages_per_page=count, max_messages=count, visibility_timeout=int(visibility_timeout)
+        )
+        async for msg in messages:
+            body = json.loads(msg.content)
+            job = _job_from_row({**body, "job_type": job_type}, attempt=msg.dequeue_count)
+            self._receipts[job.id] = (msg.id, msg.pop_receipt)
+            if msg.dequeue_count > self.retry.max_attempts:
+                poisoned.append(job)
+            else:
+                received.append(job)
+
+        if poisoned:
+            await self._fail_poisoned(poisoned)
+        return received
+
+    async def _fail_poisoned(self, jobs: list[ClaimedJob]):
+        logger.warning(f"Dropping {len(jobs)} jobs that exceeded their attempts")
+        async with session_scope() as db:
+            await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id.in_([job.id for job in jobs]))
+                .values(status="failed", error=LEASE_EXPIRED_ERROR)
+                .execution_options(synchronize_session=False)
+            )
+        await self.delete(jobs)
+
+    async def extend(self, jobs: list[ClaimedJob], visibility_timeout: float) -> int:
+        async def update_one(job: ClaimedJob) -> bool:
+            receipt = self._receipts.get(job.id)
+            if receipt is None:
+                return False
+            client = await self._client(job.job_type)
+            try:
+                msg = await client.update_message(
+                    receipt[0], receipt[1], visibility_timeout=int(visibility_timeout)
+                )
+            except Exception as e:
+                logger.warning(f"Lost lease on job {job.id}: {e}")
+                return False
+            self._receipts[job.id] = (receipt[0], msg.pop_receipt)
+            return True
+
+        return sum(await asyncio.gather(*(update_one(job) for job in jobs)))
+
+    async def delete(self, jobs: list[ClaimedJob]):
+        async def delete_one(job: ClaimedJob):
+            receipt = self._receipts.pop(job.id, None)
+            if receipt is None:
+                return
+            client = await self._client(job.job_type)
+            try:
+                await client.delete_message(*receipt)
+            except Exception as e:
+                logger.warning(f"Failed to delete message for job {job.id}: {e}")
+
+        await asyncio.gather(*(delete_one(job) for job in jobs))
+
+    async def release(self, job: ClaimedJob, delay: float):
+        receipt = self._receipts.pop(job.id, None)
+        if receipt is None:
+            return
+        client = await self._client(job.job_type)
+        await client.update_message(receipt[0], receipt[1], visibility_timeout=int(delay))
+
+
+_queue: JobQueue | None = None
+
+
+def get_queue() -> JobQueue:
+    """Lazy-create the configured queue backend (`Settings.queue_backend`)."""
+    global _queue
+    if _queue is None:
+        settings = get_settings()
+        backend = settings.queue_backend
+        if backend == "postgres":
+            _queue = PostgresQueue()
+        elif backend == "memory":
+            _queue = MemoryQueue(preload=True)
+        elif backend == "azure":
+            if not settings.azure_queue_connection_string:
+                raise ValueError("QUEUE_BACKEND=azure requires AZURE_QUEUE_CONNECTION_STRING")
+            _queue = AzureQueue(
+                settings.azure_queue_connection_string,
+                settings.azure_queue_name,
+                RetryPolicy.from_settings(),
+            )
+        else:
+            raise ValueError(f"Unknown queue backend: {backend}")
+    return _queue
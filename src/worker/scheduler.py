@@ -0,0 +1,57 @@
+"""Fair-share scheduling across job types (lanes) with per-type concurrency caps."""
+
+from collections import Counter
+
+
+class LaneScheduler:
+    """Splits free worker slots across job types.
+
+    Each job type is a lane with an optional concurrency limit (e.g. at most
+    2 spaCy jobs per container) and a weight. Slots go one at a time to the
+    lane with the lowest (running + planned) / weight, so a flood of cheap
+    jobs can't starve the others and memory-heavy stages never exceed their
+    cap while light stages keep the remaining slots busy.
+    """
+
+    def __init__(
+        self,
+        job_types: list[str],
+        limits: dict[str, int] | None = None,
+        weights: dict[str, float] | None = None,
+    ):
+        self.job_types = list(job_types)
+        self.limits = limits or {}
+        self.weights = weights or {}
+
+    def weight(self, job_type: str) -> float:
+        return max(self.weights.get(job_type, 1.0), 1e-6)
+
+    def capacity(self, job_type: str, running: Counter) -> int | None:
+        """Free slots left under the job type's limit (None = unlimited)."""
+        limit = self.limits.get(job_type)
+        if limit is None:
+            return None
+        return max(limit - running[job_type], 0)
+
+    def plan(self, free: int, running: Counter, exclude: set[str] | None = None) -> dict[str, int]:
+        """How many jobs of each type to claim for `free` slots.
+
+        `running` counts in-flight jobs per type; `exclude` lists lanes known
+        to be empty this round. Returns only lanes with a non-zero quota.
+        """
+        exclude = exclude or set()
+        lanes = [t for t in self.job_types if t not in exclude]
+        planned: Counter = Counter()
+
+        for _ in range(free):
+            open_lanes = [
+                t
+                for t in lanes
+                if (cap := self.capacity(t, running)) is None or planned[t] < cap
+            ]
+            if not open_lanes:
+                break
+            lane = min(open_lanes, key=lambda t: (running[t] + planned[t]) / self.weight(t))
+            planned[lane] += 1
+
+        return dict(planned)
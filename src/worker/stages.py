@@ -0,0 +1,59 @@
+"""Declarative stage graph — which jobs a completed job queues next."""
+
+# Completing a job of the key type queues these job types for the same document.
+# pdf_analyze is the fused extract + redaction stage for PDFs; extract_text
+# covers every other document type. Both route documents with text-less
+# pages to ocr instead (a handler's return value overrides this graph), and
+# images start at ocr, which also queues detect_redaction for them.
+STAGE_GRAPH: dict[str, list[str]] = {
+    "pdf_analyze": ["ner", "embed"],
+    "extract_text": ["ner", "embed"],
+    "ocr": ["ner", "embed"],
+    "detect_redaction": [],
+    "ner": [],
+    "embed": [],
+}
+
+# Queue priority per job type (lower runs first)
+STAGE_PRIORITY: dict[str, int] = {
+    "pdf_analyze": 5,
+    "extract_text": 5,
+    "ocr": 6,
+    "detect_redaction": 6,
+    "ner": 6,
+    "embed": 7,
+}
+
+DEFAULT_PRIORITY = 5
+
+
+def downstream_stages(job_type: str) -> list[str]:
+    """Job types to queue once a `job_type` job completes."""
+    return STAGE_GRAPH.get(job_type, [])
+
+
+def stage_priority(job_type: str) -> int:
+    """Queue priority for a job type."""
+    return STAGE_PRIORITY.get(job_type, DEFAULT_PRIORITY)
+
+
+def _check_acyclic(graph: dict[str, list[str]]):
+    """Raise ValueError if the stage graph has a cycle (it would never drain)."""
+    visiting, done = set(), set()
+
+    def visit(stage: str, path: list[str]):
+        if stage in done:
+            return
+        if stage in visiting:
+            raise ValueError(f"Cycle in stage graph: {' -> '.join(path + [stage])}")
+        visiting.add(stage)
+        for nxt in graph.get(stage, []):
+            visit(nxt, path + [stage])
+        visiting.discard(stage)
+        done.add(stage)
+
+    for stage in graph:
+        visit(stage, [])
+
+
+_check_acyclic(STAGE_GRAPH)
@@ -1,10 +1,20 @@
-"""Test configuration and fixtures."""
+"""Test configuration, fixtures and shared database fakes."""
+
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
 
 import pytest
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 from src.app import create_app
 
+INIT_SQL = os.path.join(os.path.dirname(__file__), "..", "db", "init.sql")
+
 
 @pytest.fixture
 def app():
@@ -18,3 +28,141 @@ async def client(app):
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
+
+
+def compile_pg(stmt) -> str:
+    """Compile a statement for Postgres, with whitespace collapsed."""
+    return " ".join(str(stmt.compile(dialect=postgresql.dialect())).split())
+
+
+class FakeResult:
+    """The parts of a SQLAlchemy `Result` the code under test uses."""
+
+    def __init__(self, rows=(), scalar=None, rowcount=0):
+        self._rows = list(rows)
+        self._scalar = scalar
+        self.rowcount = rowcount
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def all(self):
+        return self._rows
+
+    def scalars(self):
+        return self
+
+    def mappings(self):
+        return self
+
+    def scalar_one(self):
+        return self._scalar
+
+    def one_or_none(self):
+        return self._rows[0] if self._rows else None
+
+    def scalar_one_or_none(self):
+        return self._rows[0] if self._rows else None
+
+
+class FakeSession:
+    """Records statements, their parameters, added objects and commits.
+
+    Every statement must compile for Postgres. Each answers with `rows`;
+    subclasses override `result` to answer by statement.
+    """
+
+    def __init__(self, rows=(), rowcount=0):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+        self.statements = []
+        self.params = []
+        self.added = []
+        self.commits = 0
+
+    def result(self, stmt) -> FakeResult:
+        return FakeResult(self.rows, rowcount=self.rowcount)
+
+    async def execute(self, stmt, params=None):
+        compile_pg(stmt)
+        self.statements.append(stmt)
+        self.params.append(params)
+        return self.result(stmt)
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def scope_of(session):
+    """A `session_scope` stand-in that yields `session`."""
+
+    @asynccontextmanager
+    async def scope():
+        yield session
+
+    return scope
+
+
+@pytest.fixture(scope="session")
+def postgres_schema():
+    """(url, schema) of a scratch schema built from db/init.sql, dropped afterwards.
+
+    Runs against TEST_DATABASE_URL (e.g. the docker-compose database);
+    tests using it are skipped when it is not set.
+    """
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    asyncpg = pytest.importorskip("asyncpg")
+    dsn = url.replace("+asyncpg", "")
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+
+    async def run(sql: str):
+        conn = await asyncpg.connect(dsn)
+        try:
+            await conn.execute(sql)
+        finally:
+            await conn.close()
+
+    with open(INIT_SQL) as f:
+        script = f.read()
+    asyncio.run(run(f"CREATE SCHEMA {schema}; SET search_path TO {schema}, public;\n{script}"))
+    yield url, schema
+    asyncio.run(run(f"DROP SCHEMA {schema} CASCADE"))
+
+
+@pytest.fixture
+def pg_session(postgres_schema):
+    """Factory of sessions on the scratch schema; its tables are emptied after each test.
+
+    Use inside the test's own event loop: `async with pg_session() as db:`.
+    Commits on a clean exit like `session_scope`, so it can stand in for it.
+    """
+    url, schema = postgres_schema
+    engine_args = {"connect_args": {"server_settings": {"search_path": f"{schema},public"}}}
+
+    @asynccontextmanager
+    async def session():
+        engine = create_async_engine(url, **engine_args)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                try:
+                    yield db
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+        finally:
+            await engine.dispose()
+
+    yield session
+
+    async def truncate():
+        async with session() as db:
+            await db.execute(text("TRUNCATE documents, entities, redaction_histograms CASCADE"))
+            await db.commit()
+
+    asyncio.run(truncate())
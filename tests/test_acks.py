@@ -0,0 +1,133 @@
+"""Tests for batched job acks."""
+
+import asyncio
+import uuid
+
+import pytest
+
+from src.worker import acks as acks_module
+from src.worker.acks import AckBatcher
+from src.worker.claims import ClaimedJob, RetryPolicy
+from tests.conftest import FakeSession, compile_pg, scope_of
+
+
+def claimed(job_type: str = "pdf_analyze", attempt: int = 1) -> ClaimedJob:
+    return ClaimedJob(uuid.uuid4(), uuid.uuid4(), job_type, attempt)
+
+
+class RecordingQueue:
+    uses_job_rows = True
+
+    def __init__(self):
+        self.deleted = []
+        self.released = []
+        self.published = []
+
+    async def delete(self, jobs):
+        self.deleted += jobs
+
+    async def release(self, job, delay):
+        self.released.append((job, delay))
+
+    async def publish(self, rows):
+        self.published += rows
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    rows = []
+
+    async def enqueue_job_rows(db, new_rows):
+        rows.extend(new_rows)
+        return new_rows
+
+    monkeypatch.setattr(acks_module, "enqueue_job_rows", enqueue_job_rows)
+    return rows
+
+
+def test_ack_write_retries_failures_and_queues_downstream(enqueued):
+    acks = AckBatcher(retry=RetryPolicy(max_attempts=3, base_delay=10), queue=RecordingQueue())
+    done, routed, stale, retried, exhausted = (
+        claimed("pdf_analyze"),
+        claimed("extract_text"),
+        claimed("pdf_analyze"),
+        claimed("ner", attempt=2),
+        claimed("ner", attempt=3),
+    )
+    acks.complete(done)
+    acks.complete(routed, ["ocr"])
+    acks.complete(stale)
+    acks.fail(retried, "boom")
+    acks.fail(exhausted, "boom" * 200)
+
+    # The stale ack's job was reclaimed, so its UPDATE returns no row
+    db = FakeSession(rows=[done.id, routed.id])
+    retries, downstream = asyncio.run(acks._write(db, acks._pending))
+
+    assert retries == [(retried, 20.0)]
+    failures, completions = db.statements
+    rows, _ = db.params
+    assert "processing_jobs.attempts = %(attempt)s" in compile_pg(failures)  # lease token
+    assert [r["new_status"] for r in rows] == ["queued", "failed"]
+    assert len(rows[1]["new_error"]) == 500
+    sql = compile_pg(completions)
+    assert "(processing_jobs.id, processing_jobs.attempts) IN" in sql
+    assert "RETURNING processing_jobs.id" in sql
+    assert sorted((r["document_id"], r["job_type"]) for r in downstream) == sorted([
+        (done.document_id, "ner"),
+        (done.document_id, "embed"),
+        (routed.document_id, "ocr"),
+    ])
+    assert downstream == enqueued
+
+
+def test_ack_write_without_job_rows_records_every_outcome(enqueued):
+    queue = RecordingQueue()
+    queue.uses_job_rows = False
+    acks = AckBatcher(queue=queue)
+    done, failed = claimed("ner", attempt=2), claimed("embed")
+    acks.complete(done, ["embed"])
+    acks.fail(failed, "boom")
+
+    db = FakeSession()
+    _, downstream = asyncio.run(acks._write(db, acks._pending))
+
+    (stmt,) = db.statements
+    (rows,) = db.params
+    assert "processing_jobs.status =" not in compile_pg(stmt)  # no lease guard
+    assert [(r["job_id"], r["attempt"]) for r in rows] == [(done.id, 2), (failed.id, 1)]
+    assert [(r["document_id"], r["job_type"]) for r in downstream] == [(done.document_id, "embed")]
+
+
+def test_ack_flush_settles_the_queue_after_commit(monkeypatch, enqueued):
+    monkeypatch.setattr(acks_module, "session_scope", scope_of(FakeSession()))
+    queue = RecordingQueue()
+    acks = AckBatcher(retry=RetryPolicy(max_attempts=2), queue=queue)
+    ok, bad = claimed("ner"), claimed("embed")
+    acks.complete(ok)
+    acks.fail(bad, "boom")
+    asyncio.run(acks.flush())
+
+    assert queue.deleted == [ok]
+    assert [job for job, _ in queue.released] == [bad]
+    assert queue.published == []  # ner has no downstream stages
+    assert acks._pending == []
+
+
+def test_ack_flush_keeps_the_batch_when_the_write_fails(monkeypatch):
+    class BrokenScope:
+        async def __aenter__(self):
+            raise ConnectionError("database down")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(acks_module, "session_scope", BrokenScope)
+    queue = RecordingQueue()
+    acks = AckBatcher(queue=queue)
+    job = claimed()
+    acks.complete(job)
+    with pytest.raises(ConnectionError):
+        asyncio.run(acks.flush())
+    assert [pending[0] for pending in acks._pending] == [job]
+    assert queue.deleted == []
@@ -0,0 +1,139 @@
+"""Tests for archive member addressing, listing and reads."""
+
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+
+import fitz
+import pytest
+
+from src.ingest import archive
+from src.ingest.archive import iter_archive, member_path, open_pdf, read_member, split_member_path
+
+MEMBERS = {
+    "a.pdf": b"first member",
+    "docs/b.txt": b"second member" * 100,
+    "c.jpg": b"\xff\xd8third",
+    "skip.bin": b"unsupported",
+}
+EXTENSIONS = {".pdf", ".txt", ".jpg"}
+
+
+def write_zip(path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("docs/", b"")
+        for name, data in MEMBERS.items():
+            zf.writestr(zipfile.ZipInfo(name, (2024, 1, 2, 3, 4, 6)), data)
+
+
+def write_tar(path, mode):
+    with tarfile.open(path, mode) as tar:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1_700_000_000
+            tar.addfile(info, io.BytesIO(data))
+        folder = tarfile.TarInfo("docs")
+        folder.type = tarfile.DIRTYPE
+        tar.addfile(folder)
+
+
+@pytest.fixture(params=["zip", "tar", "tar.gz", "tar.xz"])
+def archive_path(request, tmp_path):
+    path = str(tmp_path / f"dataset.{request.param}")
+    if request.param == "zip":
+        write_zip(path)
+    else:
+        write_tar(path, {"tar": "w", "tar.gz": "w:gz", "tar.xz": "w:xz"}[request.param])
+    return path
+
+
+def test_split_member_path(tmp_path):
+    plain = tmp_path / "plain.pdf"
+    plain.write_bytes(b"x")
+    assert split_member_path(str(plain)) == (str(plain), None)
+    assert split_member_path("/data/x.zip!/dir/a.pdf") == ("/data/x.zip", "dir/a.pdf")
+    assert member_path("/data/x.zip", "dir/a.pdf") == "/data/x.zip!/dir/a.pdf"
+
+
+def test_iter_archive_hashes_supported_members(archive_path):
+    entries = list(iter_archive(archive_path, EXTENSIONS))
+
+    assert [path for path, *_ in entries] == [
+        member_path(archive_path, name) for name in ("a.pdf", "docs/b.txt", "c.jpg")
+    ]
+    for path, size, _, content_hash in entries:
+        data = MEMBERS[split_member_path(path)[1]]
+        assert size == len(data)
+        assert content_hash == hashlib.sha256(data).hexdigest()
+
+
+def test_iter_archive_skips_hashing_known_members(archive_path):
+    first = list(iter_archive(archive_path, EXTENSIONS))
+    known = {path: (size, mtime) for path, size, mtime, _ in first[:2]}
+    known[first[2][0]] = (first[2][1] + 1, first[2][2])  # size changed
+
+    again = list(iter_archive(archive_path, EXTENSIONS, known))
+    assert [h is None for *_, h in again] == [True, True, False]
+    assert [entry[:3] for entry in again] == [entry[:3] for entry in first]
+
+
+def test_read_member_in_any_order(archive_path):
+    for name in ("c.jpg", "a.pdf", "docs/b.txt", "a.pdf", "a.pdf", "c.jpg"):
+        assert read_member(archive_path, name) == MEMBERS[name]
+    with pytest.raises(ValueError, match="Not a regular file"):
+        read_member(archive_path, "missing.pdf")
+
+
+def test_read_member_reuses_open_archive(tmp_path, monkeypatch):
+    path = str(tmp_path / "plain.tar")
+    write_tar(path, "w")
+    opened = []
+    real_open = tarfile.open
+    monkeypatch.setattr(
+        archive.tarfile, "open", lambda *a, **kw: opened.append(a) or real_open(*a, **kw)
+    )
+
+    for name in ("a.pdf", "docs/b.txt", "c.jpg", "a.pdf"):
+        assert read_member(path, name) == MEMBERS[name]
+    assert len(opened) == 1  # one header scan, then offset reads
+
+    # A rewritten archive is reopened
+    with real_open(path, "w") as tar:
+        info = tarfile.TarInfo("a.pdf")
+        info.size = 3
+        tar.addfile(info, io.BytesIO(b"new"))
+    os.utime(path, ns=(1, 1))
+    assert read_member(path, "a.pdf") == b"new"
+    assert len(opened) == 2
+
+
+def test_compressed_tar_reads_forward_in_one_pass(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.tar.gz")
+    write_tar(path, "w:gz")
+    opened = []
+    real_open = tarfile.open
+    monkeypatch.setattr(
+        archive.tarfile, "open", lambda *a, **kw: opened.append(a) or real_open(*a, **kw)
+    )
+
+    for name in ("a.pdf", "a.pdf", "docs/b.txt", "c.jpg"):
+        read_member(path, name)
+    assert len(opened) == 1
+    read_member(path, "a.pdf")  # behind the stream — restarts it
+    assert len(opened) == 2
+
+
+def test_open_pdf_from_member(tmp_path):
+    pdf = fitz.open()
+    pdf.new_page().insert_text((72, 72), "Hello archive")
+    data = pdf.tobytes()
+    path = str(tmp_path / "docs.zip")
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("letters/one.pdf", data)
+
+    doc = open_pdf(member_path(path, "letters/one.pdf"))
+    assert len(doc) == 1
+    assert "Hello archive" in doc[0].get_text()
@@ -0,0 +1,85 @@
+"""Tests for the cross-job embedding and NER batchers."""
+
+import asyncio
+
+import pytest
+
+from src.nlp import embedder, ner
+from src.nlp.embedder import EmbeddingBatcher
+from src.nlp.ner import NerBatcher
+
+
+@pytest.fixture
+def pool_calls(monkeypatch):
+    """Run 'pool' functions inline, recording each call's first argument."""
+    calls = []
+
+    async def run_in_pool(fn, *args):
+        calls.append(args[0])
+        return fn(*args)
+
+    monkeypatch.setattr(embedder, "run_in_pool", run_in_pool)
+    monkeypatch.setattr(ner, "run_in_pool", run_in_pool)
+    return calls
+
+
+def test_embedding_batcher_shares_one_batch_and_routes_vectors_back(pool_calls, monkeypatch):
+    monkeypatch.setattr(embedder, "encode_chunks", lambda chunks, _: [[len(c)] for c in chunks])
+
+    async def scenario():
+        batcher = EmbeddingBatcher(batch_size=100, timeout=0.01)
+        return await asyncio.gather(
+            batcher.encode(["aaaa", "b"]),
+            batcher.encode([]),
+            batcher.encode(["ccc", "dd", "eeeee"]),
+        )
+
+    assert asyncio.run(scenario()) == [[[4], [1]], [], [[3], [2], [5]]]
+    # One flush, length-sorted so each model batch pads to similar lengths
+    assert pool_calls == [["b", "dd", "ccc", "aaaa", "eeeee"]]
+
+
+def test_embedding_batcher_splits_full_buffers(pool_calls, monkeypatch):
+    monkeypatch.setattr(embedder, "encode_chunks", lambda chunks, _: [[len(c)] for c in chunks])
+
+    async def scenario():
+        batcher = EmbeddingBatcher(batch_size=2, timeout=10)
+        return await asyncio.gather(
+            batcher.encode(["a", "bb", "ccc"]), batcher.encode(["dddd", "eeeee"])
+        )
+
+    # Each request fills the buffer and flushes at once (no 10s wait), in
+    # model batches of at most batch_size
+    result = asyncio.run(asyncio.wait_for(scenario(), timeout=1))
+    assert result == [[[1], [2], [3]], [[4], [5]]]
+    assert pool_calls == [["a", "bb"], ["ccc"], ["dddd", "eeeee"]]
+
+
+def test_embedding_batcher_fails_every_caller_of_a_failed_batch(pool_calls, monkeypatch):
+    def broken(chunks, _):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(embedder, "encode_chunks", broken)
+
+    async def scenario():
+        batcher = EmbeddingBatcher(batch_size=100, timeout=0.01)
+        return await asyncio.gather(
+            batcher.encode(["a"]), batcher.encode(["b"]), return_exceptions=True
+        )
+
+    assert [str(e) for e in asyncio.run(scenario())] == ["model crashed"] * 2
+
+
+def test_ner_batcher_runs_concurrent_documents_together(pool_calls, monkeypatch):
+    def find_batch(texts, pipe_batch_size, n_process):
+        return [{(text.upper(), "PERSON"): []} for text in texts]
+
+    monkeypatch.setattr(ner, "find_entity_mentions_batch", find_batch)
+
+    async def scenario():
+        batcher = NerBatcher(batch_size=3, timeout=10)
+        return await asyncio.gather(*(batcher.find(text) for text in ("ann", "bob", "cy")))
+
+    result = asyncio.run(asyncio.wait_for(scenario(), timeout=1))
+    assert result == [{("ANN", "PERSON"): []}, {("BOB", "PERSON"): []}, {("CY", "PERSON"): []}]
+    assert pool_calls == [["ann", "bob", "cy"]]
@@ -0,0 +1,110 @@
+"""Tests for job claiming, leases and enqueueing SQL."""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from src.worker import claims
+from src.worker.claims import ClaimedJob, RetryPolicy
+from tests.conftest import FakeSession, compile_pg
+
+
+def test_claim_jobs_unions_one_locking_cte_per_lane():
+    row = SimpleNamespace(id=uuid.uuid4(), document_id=uuid.uuid4(), job_type="ner", attempts=2)
+    db = FakeSession([row])
+    jobs = asyncio.run(claims.claim_jobs(db, {"ner": 2, "embed": 3, "ocr": 0}, 60))
+
+    assert jobs == [ClaimedJob(row.id, row.document_id, "ner", attempt=2)]
+    (stmt,) = db.statements
+    sql = compile_pg(stmt)
+    assert sql.startswith("WITH claim_0 AS")
+    assert sql.count("FOR UPDATE SKIP LOCKED") == 2
+    assert "WHERE processing_jobs.id IN (SELECT claim_0.id FROM claim_0 UNION ALL" in sql
+    assert " OR " not in sql
+    assert "attempts=(processing_jobs.attempts +" in sql
+    assert "RETURNING processing_jobs.id" in sql
+    params = stmt.compile().params
+    assert sorted(v for k, v in params.items() if k.startswith("job_type")) == ["embed", "ner"]
+
+
+def test_claim_jobs_total_limit_has_no_type_filter():
+    db = FakeSession()
+    asyncio.run(claims.claim_jobs(db, 4))
+
+    sql = compile_pg(db.statements[0])
+    assert "UNION" not in sql
+    assert "job_type =" not in sql
+    assert "IN (SELECT claim_0.id FROM claim_0)" in sql
+
+
+def test_claim_jobs_without_quota_skips_the_query():
+    db = FakeSession()
+    assert asyncio.run(claims.claim_jobs(db, {"ner": 0})) == []
+    assert db.statements == []
+
+
+def test_heartbeat_jobs_is_guarded_by_lease_token():
+    db = FakeSession(rowcount=1)
+    jobs = [ClaimedJob(uuid.uuid4(), uuid.uuid4(), "ner", attempt=3)]
+    assert asyncio.run(claims.heartbeat_jobs(db, jobs, 60)) == 1
+
+    sql = compile_pg(db.statements[0])
+    assert "(processing_jobs.id, processing_jobs.attempts) IN" in sql
+    assert "processing_jobs.status =" in sql
+    assert asyncio.run(claims.heartbeat_jobs(db, [], 60)) == 0
+    assert len(db.statements) == 1
+
+
+def test_reclaim_expired_jobs_backs_off(monkeypatch):
+    notified = []
+
+    async def notify(db):
+        notified.append(db)
+
+    monkeypatch.setattr(claims, "notify_jobs_queued", notify)
+    db = FakeSession([uuid.uuid4()])
+    assert asyncio.run(claims.reclaim_expired_jobs(db, RetryPolicy(max_attempts=3))) == 1
+    assert notified == [db]
+
+    sql = compile_pg(db.statements[0])
+    assert "processing_jobs.lease_expires_at < now()" in sql
+    assert "CASE WHEN (processing_jobs.attempts >=" in sql
+    assert "make_interval" in sql
+
+
+def test_enqueue_job_rows_skips_already_queued(monkeypatch):
+    async def notify(db):
+        pass
+
+    monkeypatch.setattr(claims, "notify_jobs_queued", notify)
+    db = FakeSession()
+    rows = [{"id": uuid.uuid4(), "document_id": uuid.uuid4(), "job_type": "ner", "priority": 5}]
+    asyncio.run(claims.enqueue_job_rows(db, rows))
+
+    sql = compile_pg(db.statements[0])
+    assert (
+        "ON CONFLICT (document_id, job_type) WHERE status = 'queued' AND attempts = 0 DO NOTHING"
+        in sql
+    )
+
+
+def test_enqueue_job_rows_chunks_large_batches(monkeypatch):
+    async def notify(db):
+        pass
+
+    monkeypatch.setattr(claims, "notify_jobs_queued", notify)
+    monkeypatch.setattr(claims, "ENQUEUE_BATCH_SIZE", 2)
+    db = FakeSession()
+    rows = [
+        {"id": uuid.uuid4(), "document_id": uuid.uuid4(), "job_type": "ner", "priority": 5}
+        for _ in range(5)
+    ]
+    asyncio.run(claims.enqueue_job_rows(db, rows))
+
+    batches = [stmt.compile().params for stmt in db.statements]
+    assert [sum(k.startswith("id_m") for k in params) for params in batches] == [2, 2, 1]
+
+
+def test_retry_policy_delay():
+    policy = RetryPolicy(max_attempts=5, base_delay=30, max_delay=100)
+    assert [policy.delay(n) for n in range(0, 5)] == [30, 30, 60, 100, 100]
@@ -0,0 +1,14 @@
+"""Tests for content hashing."""
+
+import hashlib
+
+from src.ingest.dedup import hash_file, hash_stream
+
+
+def test_hash_stream_matches_sha256_across_chunks(tmp_path):
+    data = bytes(range(256)) * 1000
+    path = tmp_path / "blob"
+    path.write_bytes(data)
+    with open(path, "rb") as f:
+        assert hash_stream(f, chunk_size=1000) == hashlib.sha256(data).hexdigest()
+    assert hash_file(str(path)) == hashlib.sha256(data).hexdigest()
@@ -0,0 +1,199 @@
+"""Tests for the download manager against a local HTTP server."""
+
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.ingest.downloader import DownloadManager, parse_content_range
+
+BODY = bytes(range(256)) * 64
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves `server.files` with ETag / Range / If-Range support.
+
+    `server.quirks` holds one-shot misbehaviours: "wrong_start" answers a
+    range request from the wrong offset.
+    """
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        if self.path not in server.files:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body, etag = server.files[self.path]
+        start = 0
+        ranged = self.headers.get("Range")
+        if ranged and self.headers.get("If-Range", etag) == etag:
+            start = int(ranged.removeprefix("bytes=").rstrip("-"))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if server.quirks.pop("wrong_start", False):
+                start = 0
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.files = {"/doc.pdf": (BODY, '"v1"')}
+    httpd.quirks = {}
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+async def run_downloads(tmp_path, items, **kwargs):
+    async with DownloadManager(str(tmp_path / "manifest.json"), **kwargs) as dm:
+        return await dm.download_all(items)
+
+
+def download(tmp_path, items, **kwargs):
+    return asyncio.run(run_downloads(tmp_path, items, **kwargs))
+
+
+def write_part(output, data: bytes, validator: str | None):
+    with open(f"{output}.part", "wb") as f:
+        f.write(data)
+    if validator:
+        with open(f"{output}.part.validator", "w") as f:
+            f.write(validator)
+
+
+def test_parse_content_range():
+    assert parse_content_range("bytes 100-199/200") == (100, 200)
+    assert parse_content_range("bytes */200") == (None, 200)
+    assert parse_content_range("bytes 0-9/*") == (0, None)
+    assert parse_content_range(None) == (None, None)
+    assert parse_content_range("pages 1-2/3") == (None, None)
+
+
+def test_downloads_and_records_manifest(server, tmp_path):
+    output = str(tmp_path / "out" / "doc.pdf")
+    counts = download(tmp_path, [(f"{server.url}/doc.pdf", output)])
+
+    assert counts == {"done": 1, "skipped": 0, "failed": 0}
+    assert open(output, "rb").read() == BODY
+    assert not os.path.exists(f"{output}.part")
+    assert not os.path.exists(f"{output}.part.validator")
+    manifest = json.load(open(tmp_path / "manifest.json"))
+    assert manifest[f"{server.url}/doc.pdf"]["bytes"] == len(BODY)
+
+    # A rerun skips it without a request
+    server.requests.clear()
+    assert download(tmp_path, [(f"{server.url}/doc.pdf", output)])["skipped"] == 1
+    assert server.requests == []
+
+
+def test_resumes_with_if_range(server, tmp_path):
+    output = str(tmp_path / "doc.pdf")
+    write_part(output, BODY[:1000], '"v1"')
+
+    download(tmp_path, [(f"{server.url}/doc.pdf", output)])
+    assert open(output, "rb").read() == BODY
+    (_, headers), = server.requests
+    assert headers["Range"] == "bytes=1000-"
+    assert headers["If-Range"] == '"v1"'
+
+
+def test_changed_file_is_fetched_whole(server, tmp_path):
+    output = str(tmp_path / "doc.pdf")
+    write_part(output, b"stale bytes of the old version", '"v0"')
+
+    download(tmp_path, [(f"{server.url}/doc.pdf", output)])
+    assert open(output, "rb").read() == BODY
+
+
+def test_part_without_validator_restarts(server, tmp_path):
+    output = str(tmp_path / "doc.pdf")
+    write_part(output, b"x" * 1000, None)
+
+    download(tmp_path, [(f"{server.url}/doc.pdf", output)])
+    assert open(output, "rb").read() == BODY
+    (_, headers), = server.requests
+    assert "Range" not in headers
+
+
+def test_mismatched_content_range_discards_part(server, tmp_path):
+    output = str(tmp_path / "doc.pdf")
+    write_part(output, BODY[:1000], '"v1"')
+    server.quirks["wrong_start"] = True
+
+    counts = download(tmp_path, [(f"{server.url}/doc.pdf", output)], base_delay=0.01)
+    assert counts["done"] == 1
+    assert open(output, "rb").read() == BODY
+    assert len(server.requests) == 2
+    assert "Range" not in server.requests[1][1]
+
+
+def test_416_is_complete_only_at_the_full_length(server, tmp_path):
+    output = str(tmp_path / "doc.pdf")
+    write_part(output, BODY, '"v1"')
+    download(tmp_path, [(f"{server.url}/doc.pdf", output)])
+    assert open(output, "rb").read() == BODY
+    assert len(server.requests) == 1
+
+    # A part longer than the resource is not "complete"
+    os.remove(output)
+    os.remove(tmp_path / "manifest.json")
+    server.requests.clear()
+    write_part(output, BODY + b"trailing junk", '"v1"')
+    download(tmp_path, [(f"{server.url}/doc.pdf", output)], base_delay=0.01)
+    assert open(output, "rb").read() == BODY
+    assert len(server.requests) == 2
+
+
+def test_missing_file_fails_without_retry(server, tmp_path):
+    output = str(tmp_path / "gone.pdf")
+    counts = download(tmp_path, [(f"{server.url}/gone.pdf", output)])
+    assert counts["failed"] == 1
+    assert len(server.requests) == 1
+    manifest = json.load(open(tmp_path / "manifest.json"))
+    assert manifest[f"{server.url}/gone.pdf"]["status"] == "failed"
+
+
+def test_unexpected_errors_are_recorded_and_workers_survive(server, tmp_path, monkeypatch):
+    real_download = DownloadManager.download
+
+    async def flaky(self, url, output_path):
+        if url.endswith("0"):
+            raise RuntimeError("boom")
+        return await real_download(self, url, output_path)
+
+    monkeypatch.setattr(DownloadManager, "download", flaky)
+    items = [(f"{server.url}/doc.pdf?{i}", str(tmp_path / f"{i}.pdf")) for i in range(1, 21)]
+    server.files.update({f"/doc.pdf?{i}": (BODY, '"v1"') for i in range(1, 21)})
+
+    # One worker and a queue of two: a dead worker would block the producer
+    downloads = run_downloads(tmp_path, items, concurrency=1)
+    counts = asyncio.run(asyncio.wait_for(downloads, timeout=30))
+    assert counts == {"done": 18, "skipped": 0, "failed": 2}
+    manifest = json.load(open(tmp_path / "manifest.json"))
+    assert manifest[f"{server.url}/doc.pdf?10"]["error"] == "boom"
+
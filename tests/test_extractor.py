@@ -0,0 +1,74 @@
+"""Tests for page offsets, page-range splitting and the fused PDF stage."""
+
+import fitz
+import pytest
+
+from src.nlp import extractor
+from src.nlp.extractor import (
+    PAGE_BREAK,
+    extract_clean_range,
+    join_pages,
+    page_for_offset,
+    page_ranges,
+    page_text,
+)
+from src.nlp.pdf_analyze import analyze_pdf, analyze_pdf_range, merge_ranges
+
+
+def test_join_pages_records_offsets_for_empty_pages():
+    text, offsets = join_pages(["one", "", "three", ""])
+    assert text == f"one{PAGE_BREAK}three"
+    assert offsets == [0, 3, 3 + len(PAGE_BREAK), len(text)]
+    assert [page_text(text, offsets, n) for n in (1, 2, 3, 4)] == ["one", "", "three", ""]
+
+
+def test_page_for_offset():
+    text, offsets = join_pages(["alpha", "beta", "gamma"])
+    assert page_for_offset(offsets, text.index("alpha")) == 1
+    assert page_for_offset(offsets, text.index("beta")) == 2
+    assert page_for_offset(offsets, text.index("gamma") + 2) == 3
+    assert page_for_offset(None, 10) is None
+
+
+def test_page_ranges(monkeypatch):
+    settings = extractor.get_settings()
+    monkeypatch.setattr(settings, "pdf_split_pages", 10)
+    monkeypatch.setattr(settings, "pdf_range_pages", 4)
+    assert page_ranges(10) == [(0, 10)]
+    assert page_ranges(11) == [(0, 4), (4, 8), (8, 11)]
+    assert page_ranges(5, range_pages=2) == [(0, 2), (2, 4), (4, 5)]
+    assert page_ranges(0) == [(0, 0)]
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    doc = fitz.open()
+    for n in range(1, 6):
+        page = doc.new_page()
+        if n != 3:
+            page.insert_text((72, 72), f"Page {n} text")
+        if n == 2:
+            page.draw_rect(fitz.Rect(72, 100, 272, 120), color=(0, 0, 0), fill=(0, 0, 0))
+    path = str(tmp_path / "doc.pdf")
+    doc.save(path)
+    return path
+
+
+def test_split_ranges_match_a_single_pass(pdf_path):
+    whole = analyze_pdf(pdf_path)
+    parts = [analyze_pdf_range(pdf_path, start, stop) for start, stop in page_ranges(5, 2)]
+    split = merge_ranges(5, parts)
+    assert split == whole
+
+    assert whole["page_count"] == 5
+    assert page_text(whole["text"], whole["page_offsets"], 4) == "Page 4 text"
+    assert page_text(whole["text"], whole["page_offsets"], 3) == ""
+    redactions = whole["redactions"]
+    assert redactions["pages_with_redactions"] == 1
+    assert redactions["page_details"][1]["redaction_count"] == 1
+    assert redactions["redacted_area"] == pytest.approx(200 * 20)
+
+
+def test_extract_clean_range(pdf_path):
+    assert extract_clean_range(pdf_path, 3, 5) == ["Page 4 text", "Page 5 text"]
+
@@ -0,0 +1,100 @@
+"""Tests for the Jmail index crawler."""
+
+import asyncio
+import json
+import os
+
+import httpx
+
+from src.ingest import jmail
+from src.ingest.jmail import IndexCache, IndexPageParser, JmailDocument
+from tests.conftest import FakeResult, FakeSession, compile_pg
+
+
+def make_document(n: int, dataset: str = "1") -> JmailDocument:
+    return JmailDocument(
+        efta_id=f"EFTA{n:08d}",
+        filename=f"EFTA{n:08d}.pdf",
+        source="doj",
+        dataset=dataset,
+        url=f"https://jmail.world/files/EFTA{n:08d}.pdf",
+        page_count=3,
+    )
+
+
+def test_index_page_parser():
+    parser = IndexPageParser("https://jmail.world/drive?dataset=9", "9")
+    parser.feed('<a href="/files/EFTA00000001.pdf" data-pages="12">one</a>')
+    parser.feed('<a href="/files/EFTA00000001.pdf">again</a><a href="/about">about</a>')
+    parser.feed('<a href="other.PDF" data-source="court">two</a>')
+    parser.close()
+
+    first, second = parser.documents
+    assert first.efta_id == "EFTA00000001"
+    assert first.url == "https://jmail.world/files/EFTA00000001.pdf"
+    assert first.page_count == 12
+    assert first.dataset == "9"
+    assert second.efta_id == "other"
+    assert second.source == "court"
+
+
+def test_index_cache_appends_and_last_line_wins(tmp_path):
+    path = str(tmp_path / "cache.jsonl")
+    resp = httpx.Response(200, headers={"etag": '"v1"'})
+
+    cache = IndexCache(path)
+    cache.store("page-1", resp, [make_document(1)])
+    cache.store("page-2", resp, [make_document(2)])
+    cache.save()
+    cache.store("page-1", httpx.Response(200, headers={"etag": '"v2"'}), [make_document(3)])
+    cache.save()
+    cache.save()  # nothing new — no write
+
+    with open(path) as f:
+        assert len(f.readlines()) == 3
+
+    reloaded = IndexCache(path)
+    assert reloaded.headers("page-1") == {"If-None-Match": '"v2"'}
+    assert reloaded.documents("page-1") == [make_document(3)]
+    assert reloaded.documents("page-2") == [make_document(2)]
+    assert reloaded.headers("page-3") == {}
+
+
+def test_index_cache_compacts_superseded_lines(tmp_path):
+    path = str(tmp_path / "cache.jsonl")
+    cache = IndexCache(path)
+    for n in range(5):
+        cache.store("page", httpx.Response(200, headers={"etag": str(n)}), [])
+        cache.save()
+
+    IndexCache(path)
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert lines == [{"url": "page", "etag": "4", "last_modified": None, "documents": []}]
+
+
+class InsertSession(FakeSession):
+    """Answers each multi-row INSERT as if every row was new."""
+
+    def result(self, stmt):
+        return FakeResult([None] * len(stmt._multi_values[0]))
+
+
+def test_import_index_inserts_download_paths():
+    async def documents():
+        for n in range(5):
+            yield make_document(n, dataset="9")
+
+    db = InsertSession()
+    created = asyncio.run(jmail.import_index(db, documents(), "downloads", batch_size=2))
+
+    assert created == 5
+    assert len(db.statements) == 3
+    assert db.commits == 3
+    sql = compile_pg(db.statements[0])
+    assert "ON CONFLICT (source_path) DO NOTHING" in sql
+    params = db.statements[0].compile().params
+    assert params["source_path_m0"] == os.path.join("downloads", "9", "EFTA00000000.pdf")
+    assert params["blob_url_m0"] == "https://jmail.world/files/EFTA00000000.pdf"
+    assert params["metadata_m0"] == {"efta_id": "EFTA00000000", "dataset": "9"}
+    assert params["processing_status_m0"] == "indexed"
@@ -0,0 +1,210 @@
+"""Tests for importing local files."""
+
+import asyncio
+import hashlib
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.sql import Insert, Select, Update
+
+from src.ingest import local
+from src.ingest.local import import_directory, import_files
+from tests.conftest import FakeResult, FakeSession
+
+
+class ImportSession(FakeSession):
+    """Answers `promote_orphaned_duplicates` with `duplicates`; splits the writes by kind."""
+
+    def __init__(self, duplicates=()):
+        super().__init__()
+        self.duplicates = list(duplicates)
+
+    def result(self, stmt):
+        return FakeResult(self.duplicates if isinstance(stmt, Select) else [])
+
+    def written(self, kind) -> list[dict]:
+        return [
+            row
+            for stmt, params in zip(self.statements, self.params, strict=True)
+            if isinstance(stmt, kind) and params
+            for row in params
+        ]
+
+
+class Import:
+    """Runs `import_files` with the document lookups answered from memory."""
+
+    def __init__(self, monkeypatch, known=(), canonical=None):
+        self.known = {row.source_path: row for row in known}
+        self.canonical = canonical or {}
+        self.reset = []
+        self.enqueued = []
+        self.published = []
+
+        async def find_known_files(db, paths):
+            return {path: self.known[path] for path in paths if path in self.known}
+
+        async def find_canonical_ids(db, hashes):
+            return {h: self.canonical[h] for h in hashes if h in self.canonical}
+
+        async def reset_outputs(db, document_ids):
+            self.reset += document_ids
+
+        async def enqueue_job_rows(db, rows):
+            self.enqueued += rows
+            return rows
+
+        async def sync_new_duplicates(db):
+            return 0
+
+        class Queue:
+            async def publish(queue, rows):
+                self.published += rows
+
+        for name, fn in [
+            ("find_known_files", find_known_files),
+            ("find_canonical_ids", find_canonical_ids),
+            ("reset_outputs", reset_outputs),
+            ("enqueue_job_rows", enqueue_job_rows),
+            ("sync_new_duplicates", sync_new_duplicates),
+        ]:
+            monkeypatch.setattr(local, name, fn)
+        monkeypatch.setattr(local, "get_queue", Queue)
+
+    def run(self, files, db=None) -> ImportSession:
+        self.db = db or ImportSession()
+        self.imported = asyncio.run(import_files(self.db, iter(files), "test", "origin"))
+        return self.db
+
+
+def write(tmp_path, name: str, data: bytes) -> tuple[str, int, float, None]:
+    path = str(tmp_path / name)
+    with open(path, "wb") as f:
+        f.write(data)
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime, None
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def known(path, size, mtime, content_hash, doc_type="pdf"):
+    return SimpleNamespace(
+        source_path=path,
+        id=uuid.uuid4(),
+        file_size=size,
+        file_mtime=mtime,
+        content_sha256=content_hash,
+        doc_type=doc_type,
+    )
+
+
+def test_new_files_are_inserted_and_queued(tmp_path, monkeypatch):
+    entry = write(tmp_path, "a.pdf", b"pdf one")
+    run = Import(monkeypatch)
+    db = run.run([entry])
+
+    (row,) = db.written(Insert)
+    assert row["source_path"] == entry[0]
+    assert row["content_sha256"] == sha256(b"pdf one")
+    assert row["processing_status"] == "pending"
+    assert [job["job_type"] for job in run.enqueued] == ["pdf_analyze"]
+    assert run.published == run.enqueued
+    assert run.imported == 1
+    assert db.commits == 2  # the batch, then the duplicate sync
+
+
+def test_unchanged_files_are_skipped_unread(tmp_path, monkeypatch):
+    path, size, mtime, _ = write(tmp_path, "a.pdf", b"pdf one")
+    os.remove(path)  # hashing it would fail
+    run = Import(monkeypatch, [known(path, size, mtime, sha256(b"pdf one"))])
+    db = run.run([(path, size, mtime, None)])
+
+    assert db.written(Insert) == db.written(Update) == []
+    assert run.enqueued == []
+    assert run.imported == 0
+
+
+def test_touched_but_identical_files_only_refresh_the_fingerprint(tmp_path, monkeypatch):
+    path, size, mtime, _ = write(tmp_path, "a.pdf", b"pdf one")
+    row = known(path, size, mtime - 60, sha256(b"pdf one"))
+    run = Import(monkeypatch, [row])
+    db = run.run([(path, size, mtime, None)])
+
+    assert db.written(Update) == [{"id": row.id, "file_size": size, "file_mtime": mtime}]
+    assert run.reset == []
+    assert run.enqueued == []
+
+
+def test_changed_files_are_reset_and_requeued(tmp_path, monkeypatch):
+    path, size, mtime, _ = write(tmp_path, "a.pdf", b"pdf two")
+    row = known(path, size - 1, mtime - 60, sha256(b"pdf one"))
+    run = Import(monkeypatch, [row])
+    db = run.run([(path, size, mtime, None)])
+
+    (update,) = db.written(Update)
+    assert update["id"] == row.id
+    assert update["content_sha256"] == sha256(b"pdf two")
+    assert (update["extracted_text"], update["processing_status"]) == (None, "pending")
+    assert run.reset == [row.id]
+    assert [(job["document_id"], job["job_type"]) for job in run.enqueued] == [
+        (row.id, "pdf_analyze")
+    ]
+    assert run.imported == 0
+
+
+def test_changed_canonical_promotes_its_oldest_duplicate(tmp_path, monkeypatch):
+    path, size, mtime, _ = write(tmp_path, "a.pdf", b"pdf two")
+    row = known(path, size - 1, mtime - 60, sha256(b"pdf one"))
+    oldest, other = uuid.uuid4(), uuid.uuid4()
+    run = Import(monkeypatch, [row])
+    db = run.run(
+        [(path, size, mtime, None)],
+        ImportSession([(oldest, row.id, "pdf"), (other, row.id, "pdf")]),
+    )
+
+    updates = db.written(Update)
+    assert {"id": oldest, "canonical_id": None, "processing_status": "pending"} in updates
+    assert {"id": other, "canonical_id": oldest} in updates
+    assert sorted((job["document_id"], job["job_type"]) for job in run.enqueued) == sorted(
+        [(row.id, "pdf_analyze"), (oldest, "pdf_analyze")]
+    )
+
+
+def test_duplicate_content_is_linked_not_queued(tmp_path, monkeypatch):
+    existing = uuid.uuid4()
+    first = write(tmp_path, "a.pdf", b"same")
+    second = write(tmp_path, "b.pdf", b"same")
+    other = write(tmp_path, "c.pdf", b"seen before")
+    run = Import(monkeypatch, canonical={sha256(b"seen before"): existing})
+    db = run.run([first, second, other])
+
+    rows = {row["source_path"]: row for row in db.written(Insert)}
+    canonical = rows[first[0]]
+    assert (canonical["canonical_id"], canonical["processing_status"]) == (None, "pending")
+    # Within a batch, the first copy of new content is the canonical document
+    assert rows[second[0]]["canonical_id"] == canonical["id"]
+    assert rows[other[0]]["canonical_id"] == existing
+    assert {rows[p]["processing_status"] for p in (second[0], other[0])} == {"duplicate"}
+    assert [job["document_id"] for job in run.enqueued] == [canonical["id"]]
+    assert run.imported == 3
+
+
+def test_import_directory_stores_absolute_paths(tmp_path, monkeypatch):
+    write(tmp_path, "a.pdf", b"pdf one")
+    monkeypatch.chdir(tmp_path.parent)
+    Import(monkeypatch)
+    db = ImportSession()
+    asyncio.run(import_directory(os.path.join(".", tmp_path.name), db))
+
+    (row,) = db.written(Insert)
+    assert row["source_path"] == str(tmp_path / "a.pdf")
+
+
+def test_import_directory_rejects_missing_directories(tmp_path, monkeypatch):
+    Import(monkeypatch)
+    with pytest.raises(ValueError, match="Not a directory"):
+        asyncio.run(import_directory(str(tmp_path / "missing"), ImportSession()))
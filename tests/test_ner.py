@@ -0,0 +1,91 @@
+"""Tests for the NER write path."""
+
+import asyncio
+import uuid
+
+from sqlalchemy.sql import Delete, Insert, Select, Update
+
+from src.nlp import ner
+from tests.conftest import FakeResult, FakeSession, compile_pg
+
+
+class NerSession(FakeSession):
+    """Answers the document SELECT and entity upserts."""
+
+    def __init__(self, doc=None):
+        super().__init__()
+        self.doc = doc
+
+    def result(self, stmt):
+        if isinstance(stmt, Select):
+            return FakeResult(scalar=self.doc)
+        if isinstance(stmt, Insert):
+            rows = stmt.compile().params
+            keys = sorted(
+                (rows[k], rows[k.replace("canonical", "entity_type")])
+                for k in rows
+                if k.startswith("canonical_m")
+            )
+            return FakeResult(rows=[(uuid.uuid4(), c, t) for c, t in keys])
+        return FakeResult()
+
+
+MENTIONS = {
+    ("Jeffrey Epstein", "PERSON"): [
+        {"span_text": "Jeffrey Epstein", "char_offset": 0, "context": "Jeffrey Epstein met"},
+        {"span_text": "Jeffrey Epstein", "char_offset": 40, "context": "said Jeffrey Epstein"},
+    ],
+    ("New York", "GPE"): [{"span_text": "New York", "char_offset": 25, "context": "in New York"}],
+}
+
+
+def test_upsert_entities_builds_statement():
+    db = NerSession()
+    entity_ids = asyncio.run(ner.upsert_entities(db, MENTIONS))
+
+    assert set(entity_ids) == set(MENTIONS)
+    (stmt,) = db.statements
+    sql = compile_pg(stmt)
+    assert "INSERT INTO entities" in sql
+    assert "metadata" in sql
+    assert "ON CONFLICT (canonical, entity_type) DO UPDATE" in sql
+    assert "entities.mention_count + excluded.mention_count" in sql
+    params = stmt.compile().params
+    assert sorted(v for k, v in params.items() if k.startswith("mention_count")) == [1, 2]
+
+
+def test_extract_entities_replaces_previous_mentions(monkeypatch):
+    class Batcher:
+        async def find(self, text):
+            # The read transaction is over before spaCy runs
+            assert db.commits % 2 == 1
+            return MENTIONS
+
+    copied = []
+
+    async def copy_mentions(db, records):
+        copied.append(records)
+
+    monkeypatch.setattr(ner, "get_batcher", lambda: Batcher())
+    monkeypatch.setattr(ner, "copy_mentions", copy_mentions)
+
+    doc_id = uuid.uuid4()
+    doc = type("Doc", (), {"extracted_text": "text", "page_offsets": [0, 30]})()
+    db = NerSession(doc)
+    asyncio.run(ner.extract_entities(doc_id, db))
+    asyncio.run(ner.extract_entities(doc_id, db))
+
+    # Each run subtracts and deletes the document's old mentions before inserting
+    kinds = [
+        next(k for k in (Select, Update, Delete, Insert) if isinstance(stmt, k))
+        for stmt in db.statements
+    ]
+    run = [Select, Update, Delete, Insert]
+    assert kinds == run + run
+    assert "mention_count - anon_1.removed" in compile_pg(db.statements[1])
+    assert "DELETE FROM entity_mentions" in compile_pg(db.statements[2])
+
+    assert db.commits == 4  # a read and a write transaction per run
+    assert [len(records) for records in copied] == [3, 3]
+    pages = sorted(record[3] for record in copied[0])
+    assert pages == [1, 1, 2]
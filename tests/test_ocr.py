@@ -0,0 +1,98 @@
+"""Tests for selective OCR."""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import fitz
+import pytest
+
+from src.nlp import extractor, ocr
+from src.nlp.extractor import join_pages, page_text
+from tests.conftest import FakeSession
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """OCR returns "ocr <page number>"; the page ranges run inline. Records OCR'd pages."""
+    pages = []
+
+    def ocr_page(page, dpi, language):
+        pages.append(page.number + 1)
+        return f"ocr {page.number + 1}"
+
+    async def run_in_pool(fn, *args):
+        return fn(*args)
+
+    monkeypatch.setattr(ocr, "ocr_page", ocr_page)
+    monkeypatch.setattr(extractor, "run_in_pool", run_in_pool)
+    return pages
+
+
+def run_ocr_document(monkeypatch, path: str, doc_type: str):
+    doc = SimpleNamespace(source_path=path, content_sha256=None, doc_type=doc_type)
+
+    async def load_document(db, document_id):
+        return doc
+
+    async def sync_duplicates(db, doc):
+        pass
+
+    monkeypatch.setattr(ocr, "load_document", load_document)
+    monkeypatch.setattr(ocr, "sync_duplicates", sync_duplicates)
+    next_stages = asyncio.run(ocr.ocr_document(uuid.uuid4(), FakeSession()))
+    return doc, next_stages
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    """Five pages: text, scanned, blank, scanned, text."""
+    scan = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 20, 20), False)
+    scan.set_rect(scan.irect, (200, 200, 200))
+    doc = fitz.open()
+    for n in range(1, 6):
+        page = doc.new_page()
+        if n in (1, 5):
+            page.insert_text((72, 72), f"Page {n} text")
+        elif n in (2, 4):
+            page.insert_image(fitz.Rect(72, 72, 272, 272), pixmap=scan)
+    path = str(tmp_path / "doc.pdf")
+    doc.save(path)
+    return path
+
+
+def test_ocr_range_only_ocrs_scanned_pages(pdf_path, fake_ocr):
+    assert ocr.ocr_range(pdf_path, 0, 5) == (
+        ["Page 1 text", "ocr 2", "", "ocr 4", "Page 5 text"],
+        2,
+    )
+    assert fake_ocr == [2, 4]
+    assert ocr.ocr_range(pdf_path, 2, 3) == ([""], 0)
+
+
+def test_ocr_document_joins_ranges_in_page_order(pdf_path, monkeypatch, fake_ocr):
+    monkeypatch.setattr(ocr.get_settings(), "ocr_range_pages", 2)
+
+    async def run_in_pool(fn, path, start, stop):
+        await asyncio.sleep(0.01 * (5 - start))  # later ranges finish first
+        return fn(path, start, stop)
+
+    monkeypatch.setattr(extractor, "run_in_pool", run_in_pool)
+    doc, next_stages = run_ocr_document(monkeypatch, pdf_path, "pdf")
+
+    expected = ["Page 1 text", "ocr 2", "", "ocr 4", "Page 5 text"]
+    assert (doc.extracted_text, doc.page_offsets) == join_pages(expected)
+    assert [page_text(doc.extracted_text, doc.page_offsets, n) for n in range(1, 6)] == expected
+    assert (doc.page_count, doc.ocr_applied) == (5, True)
+    assert sorted(fake_ocr) == [2, 4]
+    assert next_stages is None  # the stage graph's ner and embed
+
+
+def test_images_are_queued_for_redaction_detection(tmp_path, monkeypatch, fake_ocr):
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 40, 30), False)
+    path = str(tmp_path / "scan.png")
+    pix.save(path)
+
+    doc, next_stages = run_ocr_document(monkeypatch, path, "image")
+    assert doc.extracted_text == "ocr 1"
+    assert next_stages == ["ner", "embed", "detect_redaction"]
@@ -0,0 +1,189 @@
+"""Job claiming, leases, enqueueing and acks against a real Postgres."""
+
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import func, insert, select, text, update
+
+from src.db.models import Document, ProcessingJob
+from src.worker import acks as acks_module
+from src.worker.acks import AckBatcher
+from src.worker.claims import (
+    ClaimedJob,
+    RetryPolicy,
+    claim_jobs,
+    enqueue_job_rows,
+    heartbeat_jobs,
+    reclaim_expired_jobs,
+)
+
+pytestmark = pytest.mark.postgres
+
+
+async def add_document(db) -> uuid.UUID:
+    doc_id = uuid.uuid4()
+    await db.execute(
+        insert(Document).values(
+            id=doc_id, source="test", source_path=f"/data/{doc_id}.pdf", filename="a.pdf"
+        )
+    )
+    return doc_id
+
+
+def job_row(document_id, job_type: str, priority: int = 5) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "document_id": document_id,
+        "job_type": job_type,
+        "priority": priority,
+    }
+
+
+async def job(db, job_id) -> ProcessingJob:
+    return (
+        await db.execute(select(ProcessingJob).where(ProcessingJob.id == job_id))
+    ).scalar_one()
+
+
+def test_claim_takes_each_lane_by_priority_and_skips_backoff(pg_session):
+    async def scenario():
+        async with pg_session() as db:
+            lanes = [("ner", 9), ("ner", 1), ("ner", 5), ("embed", 5), ("embed", 5)]
+            rows = [
+                job_row(await add_document(db), job_type, priority)
+                for job_type, priority in lanes
+            ]
+            await enqueue_job_rows(db, rows)
+            await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == rows[4]["id"])
+                .values(available_at=text("now() + interval '1 hour'"))
+            )
+            await db.commit()
+
+            first = await claim_jobs(db, {"ner": 2, "embed": 5, "ocr": 1}, lease_seconds=60)
+            await db.commit()
+            second = await claim_jobs(db, {"ner": 2, "embed": 5}, lease_seconds=60)
+            await db.commit()
+            claimed = await job(db, rows[1]["id"])
+            return rows, first, second, claimed
+
+    rows, first, second, claimed = asyncio.run(scenario())
+    assert sorted(j.id for j in first) == sorted(r["id"] for r in (rows[1], rows[2], rows[3]))
+    assert {j.attempt for j in first} == {1}
+    assert [j.id for j in second] == [rows[0]["id"]]  # rows[4] is still backing off
+    assert claimed.status == "running"
+    assert claimed.attempts == 1
+    assert claimed.lease_expires_at is not None
+
+
+def test_enqueue_skips_only_unattempted_queued_duplicates(pg_session):
+    async def scenario():
+        async with pg_session() as db:
+            doc = await add_document(db)
+            first = await enqueue_job_rows(db, [job_row(doc, "ner")])
+            again = await enqueue_job_rows(db, [job_row(doc, "ner"), job_row(doc, "embed")])
+            await db.commit()
+            await claim_jobs(db, {"ner": 1})
+            await db.commit()
+            # The partial unique index no longer covers the running job
+            rerun = await enqueue_job_rows(db, [job_row(doc, "ner")])
+            await db.commit()
+            return first, again, rerun
+
+    first, again, rerun = asyncio.run(scenario())
+    assert len(first) == 1
+    assert [row["job_type"] for row in again] == ["embed"]
+    assert len(rerun) == 1
+
+
+def test_heartbeat_needs_the_current_lease_token(pg_session):
+    async def scenario():
+        async with pg_session() as db:
+            await enqueue_job_rows(db, [job_row(await add_document(db), "ner")])
+            (claimed,) = await claim_jobs(db, 1, lease_seconds=60)
+            stale = ClaimedJob(claimed.id, claimed.document_id, "ner", claimed.attempt - 1)
+            counts = (
+                await heartbeat_jobs(db, [claimed], 60),
+                await heartbeat_jobs(db, [stale], 60),
+            )
+            await db.commit()
+            return counts
+
+    assert asyncio.run(scenario()) == (1, 0)
+
+
+def test_reclaim_requeues_with_backoff_and_fails_exhausted_jobs(pg_session):
+    async def scenario():
+        async with pg_session() as db:
+            doc = await add_document(db)
+            retried, exhausted = job_row(doc, "ner"), job_row(doc, "embed")
+            await enqueue_job_rows(db, [retried, exhausted])
+            await claim_jobs(db, 2)
+            await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == exhausted["id"])
+                .values(attempts=3)
+            )
+            await db.execute(
+                update(ProcessingJob).values(lease_expires_at=text("now() - interval '1 second'"))
+            )
+            await db.commit()
+
+            count = await reclaim_expired_jobs(db, RetryPolicy(max_attempts=3, base_delay=30))
+            await db.commit()
+            delay = (
+                await db.execute(
+                    select(func.extract("epoch", ProcessingJob.available_at - func.now())).where(
+                        ProcessingJob.id == retried["id"]
+                    )
+                )
+            ).scalar_one()
+            return count, await job(db, retried["id"]), await job(db, exhausted["id"]), delay
+
+    count, retried, exhausted, delay = asyncio.run(scenario())
+    assert count == 2
+    assert (retried.status, retried.lease_expires_at) == ("queued", None)
+    assert 20 < delay <= 30  # make_interval(secs => 30 * 2^0)
+    assert exhausted.status == "failed"
+    assert exhausted.completed_at is not None
+
+
+def test_stale_acks_do_not_queue_downstream_jobs(pg_session, monkeypatch):
+    monkeypatch.setattr(acks_module, "session_scope", pg_session)
+
+    async def scenario():
+        async with pg_session() as db:
+            await enqueue_job_rows(
+                db, [job_row(await add_document(db), "pdf_analyze") for _ in range(2)]
+            )
+            current, stale = await claim_jobs(db, 2)
+            # Reclaimed and claimed again elsewhere: the first lease token is stale
+            await db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == stale.id)
+                .values(attempts=ProcessingJob.attempts + 1)
+            )
+            await db.commit()
+
+        acks = AckBatcher()
+        acks.complete(current)
+        acks.complete(stale)
+        await acks.flush()
+
+        async with pg_session() as db:
+            rows = (
+                await db.execute(
+                    select(ProcessingJob.document_id, ProcessingJob.job_type, ProcessingJob.status)
+                )
+            ).all()
+        return current, stale, rows
+
+    current, stale, rows = asyncio.run(scenario())
+    assert sorted((doc, job_type, status) for doc, job_type, status in rows) == sorted([
+        (current.document_id, "pdf_analyze", "completed"),
+        (current.document_id, "ner", "queued"),
+        (current.document_id, "embed", "queued"),
+        (stale.document_id, "pdf_analyze", "running"),
+    ])
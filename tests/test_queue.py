@@ -0,0 +1,157 @@
+"""Tests for the job queue backends."""
+
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from src.worker import queue as queue_module
+from src.worker.claims import ClaimedJob
+from src.worker.queue import AzureQueue, MemoryQueue
+from tests.conftest import FakeSession, compile_pg, scope_of
+
+
+def job_row(job_type: str = "ner", priority: int = 5) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "document_id": uuid.uuid4(),
+        "job_type": job_type,
+        "priority": priority,
+    }
+
+
+def test_memory_queue_receives_by_priority_within_quota():
+    async def scenario():
+        queue = MemoryQueue()
+        low, high, other = job_row(priority=9), job_row(priority=1), job_row("embed")
+        await queue.publish([low, high, other])
+
+        jobs = await queue.receive({"ner": 1, "embed": 5}, 60)
+        assert [job.id for job in jobs] == [high["id"], other["id"]]
+        assert all(job.attempt == 1 for job in jobs)
+
+        (job,) = await queue.receive({"ner": 5}, 60)
+        assert job.id == low["id"]
+        assert await queue.receive({"ner": 5, "embed": 5}, 60) == []
+
+    asyncio.run(scenario())
+
+
+def test_memory_queue_redelivers_expired_jobs_with_next_attempt(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(queue_module.time, "monotonic", lambda: clock[0])
+
+    async def scenario():
+        queue = MemoryQueue()
+        row = job_row()
+        await queue.publish([row])
+        (first,) = await queue.receive({"ner": 1}, 10)
+
+        clock[0] += 5
+        assert await queue.extend([first], 10) == 1  # lease now ends at 115
+        clock[0] += 8
+        assert await queue.receive({"ner": 1}, 10) == []
+
+        clock[0] += 10
+        (second,) = await queue.receive({"ner": 1}, 10)
+        assert (second.id, second.attempt) == (row["id"], 2)
+
+        # The first worker's lease token is stale now
+        assert await queue.extend([first], 10) == 0
+        await queue.delete([first])
+        assert await queue.extend([second], 10) == 1
+        await queue.delete([second])
+        assert await queue.extend([second], 10) == 0
+
+    asyncio.run(scenario())
+
+
+def test_memory_queue_release_delays_retry(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(queue_module.time, "monotonic", lambda: clock[0])
+
+    async def scenario():
+        queue = MemoryQueue()
+        await queue.publish([job_row()])
+        (job,) = await queue.receive({"ner": 1}, 60)
+        await queue.release(job, 30)
+
+        clock[0] = 29
+        assert await queue.receive({"ner": 1}, 60) == []
+        clock[0] = 31
+        (retry,) = await queue.receive({"ner": 1}, 60)
+        assert (retry.id, retry.attempt) == (job.id, 2)
+
+    asyncio.run(scenario())
+
+
+def test_azure_queue_publish_creates_client_lazily(monkeypatch):
+    """Publishing must work without `start()` (the importer never calls it)."""
+    pytest.importorskip("azure.core")
+    sent = []
+
+    class FakeQueueClient:
+        async def create_queue(self):
+            pass
+
+        async def send_message(self, body):
+            sent.append(body)
+
+    class FakeService:
+        def get_queue_client(self, name):
+            assert name == "jobs-pdf-analyze"
+            return FakeQueueClient()
+
+    db = FakeSession()
+    queue = AzureQueue("UseDevelopmentStorage=true", "jobs")
+    monkeypatch.setattr(queue, "_service_client", lambda: FakeService())
+    monkeypatch.setattr(queue_module, "session_scope", scope_of(db))
+
+    asyncio.run(queue.publish([job_row("pdf_analyze")]))
+    assert len(sent) == 1
+    (stmt,) = db.statements
+    assert "published_at" in compile_pg(stmt)
+
+
+@pytest.mark.azurite
+def test_azure_queue_round_trip(monkeypatch):
+    connection_string = os.environ.get("AZURITE_CONNECTION_STRING")
+    if not connection_string:
+        pytest.skip("AZURITE_CONNECTION_STRING not set")
+    pytest.importorskip("azure.storage.queue")
+
+    async def no_db(self, rows):
+        await self._send(rows)
+
+    monkeypatch.setattr(AzureQueue, "publish", no_db)
+
+    async def scenario():
+        queue = AzureQueue(connection_string, f"test-{uuid.uuid4().hex[:8]}")
+        try:
+            row = job_row()
+            await queue.publish([row])
+            jobs = []
+            for _ in range(10):
+                jobs = await queue.receive({"ner": 5}, 30)
+                if jobs:
+                    break
+                await asyncio.sleep(0.2)
+            assert [job.id for job in jobs] == [row["id"]]
+            assert jobs[0].attempt == 1
+            assert await queue.extend(jobs, 30) == 1
+            await queue.delete(jobs)
+            assert await queue.extend(jobs, 30) == 0
+            assert await queue.receive({"ner": 5}, 30) == []
+        finally:
+            client = await queue._client("ner")
+            await client.delete_queue()
+            await queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_claimed_job_from_message_body():
+    row = {"id": str(uuid.uuid4()), "document_id": str(uuid.uuid4()), "job_type": "ocr"}
+    job = queue_module._job_from_row(row, attempt=3)
+    assert job == ClaimedJob(uuid.UUID(row["id"]), uuid.UUID(row["document_id"]), "ocr", 3)
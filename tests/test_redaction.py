@@ -0,0 +1,159 @@
+"""Tests for the raster redaction engine, engine routing and rectangle merging."""
+
+import random
+
+import fitz
+import numpy as np
+import pytest
+
+from src.nlp.rects import merge_rects, union_area
+from src.nlp.redaction import analyze_page_redactions, find_dark_rects
+
+WHITE, BLACK = 255, 0
+
+
+def page(height: int = 60, width: int = 80) -> np.ndarray:
+    return np.full((height, width), WHITE, dtype=np.uint8)
+
+
+def test_solid_bar():
+    gray = page()
+    gray[10:20, 5:45] = BLACK
+    assert find_dark_rects(gray, min_width=10, min_height=4) == [(5, 10, 45, 20)]
+
+
+def test_jittered_bar_is_one_rect():
+    rng = random.Random(7)
+    gray = page()
+    for y in range(10, 22):
+        gray[y, 5 + rng.randint(-1, 1) : 45 + rng.randint(-1, 1)] = BLACK
+
+    (rect,) = find_dark_rects(gray, min_width=10, min_height=4)
+    x0, y0, x1, y1 = rect
+    assert (y0, y1) == (10, 22)
+    assert 4 <= x0 <= 6 and 44 <= x1 <= 46
+
+
+def test_bar_shifted_by_half_its_width_each_row_stays_connected():
+    gray = page()
+    for i, y in enumerate(range(10, 16)):
+        gray[y, 10 + 2 * i : 30 + 2 * i] = BLACK
+    assert find_dark_rects(gray, min_width=10, min_height=4, min_fill=0.5) == [(10, 10, 40, 16)]
+
+
+def test_separate_bars_in_reading_order():
+    gray = page()
+    gray[30:40, 50:75] = BLACK
+    gray[5:12, 40:70] = BLACK
+    gray[30:40, 2:30] = BLACK
+    assert find_dark_rects(gray, min_width=10, min_height=4) == [
+        (40, 5, 70, 12),
+        (2, 30, 30, 40),
+        (50, 30, 75, 40),
+    ]
+
+
+def test_text_strokes_and_thin_lines_are_ignored():
+    gray = page()
+    gray[5:15, 10:13] = BLACK  # a glyph stem — narrower than min_width
+    gray[20:22, 5:70] = BLACK  # an underline — shorter than min_height
+    gray[30:40, 5:40:2] = BLACK  # dense text: only short runs
+    assert find_dark_rects(gray, min_width=10, min_height=4) == []
+
+
+def test_sparse_component_fails_fill_ratio():
+    gray = page()
+    # A diagonal staircase of bars: connected, but mostly white inside its box
+    for i, y in enumerate(range(0, 40)):
+        gray[y, i : i + 12] = BLACK
+    assert find_dark_rects(gray, min_width=10, min_height=4) == []
+    assert find_dark_rects(gray, min_width=10, min_height=4, min_fill=0.0) == [(0, 0, 51, 40)]
+
+
+def test_bar_touching_the_image_edge():
+    gray = page(20, 30)
+    gray[:, 20:] = BLACK
+    assert find_dark_rects(gray, min_width=5, min_height=5) == [(20, 0, 30, 20)]
+
+
+def test_empty_page():
+    assert find_dark_rects(page(), min_width=1, min_height=1) == []
+
+
+def brute_force_area(rects, scale: int = 1) -> int:
+    covered = set()
+    for x0, y0, x1, y1 in rects:
+        for x in range(x0 * scale, x1 * scale):
+            for y in range(y0 * scale, y1 * scale):
+                covered.add((x, y))
+    return len(covered)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_union_area_matches_brute_force(seed):
+    rng = random.Random(seed)
+    rects = []
+    for _ in range(rng.randint(0, 15)):
+        x0, y0 = rng.randint(0, 30), rng.randint(0, 30)
+        rects.append((x0, y0, x0 + rng.randint(0, 12), y0 + rng.randint(0, 12)))
+    assert union_area(rects) == brute_force_area(rects)
+
+
+def brute_force_groups(rects) -> set:
+    """Bounding boxes of the connected groups of touching rects, by pairwise flood fill."""
+    def touches(a, b):
+        return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+    unseen = set(range(len(rects)))
+    boxes = set()
+    while unseen:
+        group, stack = set(), [unseen.pop()]
+        while stack:
+            i = stack.pop()
+            group.add(i)
+            near = {j for j in unseen if touches(rects[i], rects[j])}
+            unseen -= near
+            stack.extend(near)
+        members = [rects[i] for i in group]
+        boxes.add((
+            min(r[0] for r in members),
+            min(r[1] for r in members),
+            max(r[2] for r in members),
+            max(r[3] for r in members),
+        ))
+    return boxes
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_merge_rects_matches_brute_force(seed):
+    rng = random.Random(seed)
+    rects = []
+    for _ in range(rng.randint(1, 12)):
+        x0, y0 = rng.randint(0, 40), rng.randint(0, 40)
+        rects.append((x0, y0, x0 + rng.randint(1, 8), y0 + rng.randint(1, 8)))
+
+    merged = merge_rects(rects)
+    assert {box for box, _ in merged} == brute_force_groups(rects)
+    assert len(merged) == len(brute_force_groups(rects))
+    assert sum(area for _, area in merged) == pytest.approx(union_area(rects))
+
+
+def test_merge_rects_gap():
+    rects = [(0, 0, 10, 5), (10.5, 0, 20, 5), (40, 0, 50, 5)]
+    assert [box for box, _ in merge_rects(rects, gap=1.0)] == [(0, 0, 20, 5), (40, 0, 50, 5)]
+    assert len(merge_rects(rects)) == 3
+
+
+def test_image_documents_use_the_raster_engine(tmp_path):
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 400, 300), False)
+    pix.set_rect(pix.irect, (255, 255, 255))
+    pix.set_rect(fitz.IRect(40, 100, 320, 130), (0, 0, 0))
+    path = str(tmp_path / "scan.png")
+    pix.save(path)
+
+    with fitz.open(path) as doc:
+        assert not doc[0].get_images()  # nothing for the vector engine to see
+        detail, redacted_area, page_area = analyze_page_redactions(doc[0], 0)
+    assert detail["method"] == "raster"
+    assert detail["redaction_count"] == 1
+    assert redacted_area / page_area == pytest.approx(280 * 30 / (400 * 300), rel=0.1)
@@ -0,0 +1,132 @@
+"""Tests for the redaction aggregate tables."""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Delete, Insert, Select
+
+from src.db.models import RedactionStats
+from src.nlp import redaction_stats
+from src.nlp.redaction_stats import (
+    detect_dataset,
+    record_redaction_stats,
+    redaction_stats_row,
+    remove_redaction_stats,
+    score_bucket,
+)
+from tests.conftest import FakeResult, FakeSession, compile_pg
+
+
+class StatsSession(FakeSession):
+    """Answers SELECTs of RedactionStats with `stats`."""
+
+    def __init__(self, stats=()):
+        super().__init__()
+        self.stats = list(stats)
+
+    def result(self, stmt):
+        return FakeResult(self.stats if isinstance(stmt, Select) else [])
+
+    def histogram_params(self) -> dict:
+        (stmt,) = [s for s in self.statements if isinstance(s, Insert)]
+        return stmt.compile(dialect=postgresql.dialect()).params
+
+
+def document(**kwargs):
+    fields = {
+        "id": uuid.uuid4(),
+        "source": "doj",
+        "source_path": "/data/doj/DataSet 9/EFTA00001234.pdf",
+        "metadata_": {},
+        "canonical_id": None,
+        "redaction_score": 0.25,
+        "redaction_details": {
+            "total_pages": 3,
+            "pages_with_redactions": 2,
+            "redacted_area": 120.0,
+            "page_details": [{"redaction_count": 2}, {"redaction_count": 1}, {}],
+        },
+    }
+    return SimpleNamespace(**{**fields, **kwargs})
+
+
+def stored(doc, **kwargs) -> RedactionStats:
+    return RedactionStats(document_id=doc.id, **{**redaction_stats_row(doc), **kwargs})
+
+
+def test_detect_dataset():
+    assert detect_dataset(document()) == "9"
+    assert detect_dataset(document(source_path="/x/dataset-12.zip!/a.pdf")) == "12"
+    assert detect_dataset(document(source_path="/x/data_set_3/a.pdf")) == "3"
+    assert detect_dataset(document(source_path="/x/court/a.pdf")) == ""
+    assert detect_dataset(document(metadata_={"dataset": "4"})) == "4"
+
+
+def test_stats_row():
+    row = redaction_stats_row(document())
+    assert row["dataset"] == "9"
+    assert row["score_bucket"] == score_bucket(0.25) == 3
+    assert (row["page_count"], row["pages_with_redactions"], row["bar_count"]) == (3, 2, 3)
+
+
+def test_record_new_document_adds_one():
+    db = StatsSession()
+    doc = document()
+    asyncio.run(record_redaction_stats(db, doc))
+
+    (added,) = db.added
+    assert added.document_id == doc.id
+    params = db.histogram_params()
+    assert params["doc_count_m0"] == 1
+    assert params["bar_count_m0"] == 3
+    assert "ON CONFLICT (source, dataset, score_bucket) DO UPDATE" in compile_pg(db.statements[-1])
+
+
+def test_record_rewrite_moves_between_buckets():
+    doc = document()
+    old = stored(doc, redaction_score=0.05, score_bucket=1, bar_count=1)
+    db = StatsSession([old])
+    asyncio.run(record_redaction_stats(db, doc))
+
+    assert db.added == []
+    assert old.score_bucket == 3
+    params = db.histogram_params()
+    buckets = {params[f"score_bucket_m{i}"]: params[f"doc_count_m{i}"] for i in range(2)}
+    assert buckets == {1: -1, 3: 1}
+
+
+def test_record_unchanged_writes_no_histogram():
+    doc = document()
+    db = StatsSession([stored(doc)])
+    asyncio.run(record_redaction_stats(db, doc))
+    assert not any(isinstance(s, Insert) for s in db.statements)
+
+
+def test_duplicate_is_subtracted():
+    canonical = uuid.uuid4()
+    doc = document(canonical_id=canonical)
+    db = StatsSession([stored(document(id=doc.id))])
+    asyncio.run(record_redaction_stats(db, doc))
+
+    assert db.added == []
+    assert any(isinstance(s, Delete) for s in db.statements)
+    params = db.histogram_params()
+    assert params["doc_count_m0"] == -1
+    assert params["redacted_area_m0"] == -120.0
+
+
+def test_remove_without_stats_is_a_no_op():
+    db = StatsSession()
+    asyncio.run(remove_redaction_stats(db, [uuid.uuid4()]))
+    assert len(db.statements) == 1
+    asyncio.run(remove_redaction_stats(db, []))
+    assert len(db.statements) == 1
+
+
+def test_rebuild_derives_dataset_from_path():
+    db = StatsSession()
+    asyncio.run(redaction_stats.rebuild_redaction_stats(db))
+    insert_stats = next(s for s in db.statements if "INSERT INTO redaction_stats" in str(s))
+    assert "substring(d.source_path from :dataset_pattern)" in str(insert_stats)
@@ -0,0 +1,27 @@
+"""Tests for the fair-share lane scheduler."""
+
+from collections import Counter
+
+from src.worker.scheduler import LaneScheduler
+
+
+def test_plan_spreads_slots_across_lanes():
+    scheduler = LaneScheduler(["extract_text", "ner", "embed"])
+    assert scheduler.plan(6, Counter()) == {"extract_text": 2, "ner": 2, "embed": 2}
+
+
+def test_plan_respects_limits_and_running_jobs():
+    scheduler = LaneScheduler(["extract_text", "ner"], limits={"ner": 2})
+    assert scheduler.plan(5, Counter({"ner": 1})) == {"ner": 1, "extract_text": 4}
+    assert scheduler.plan(3, Counter({"ner": 2})) == {"extract_text": 3}
+
+
+def test_plan_uses_weights():
+    scheduler = LaneScheduler(["a", "b"], weights={"a": 3})
+    assert scheduler.plan(4, Counter()) == {"a": 3, "b": 1}
+
+
+def test_plan_skips_excluded_and_full_lanes():
+    scheduler = LaneScheduler(["a", "b"], limits={"a": 1})
+    assert scheduler.plan(4, Counter(), exclude={"b"}) == {"a": 1}
+    assert scheduler.plan(4, Counter({"a": 1}), exclude={"b"}) == {}
@@ -0,0 +1,36 @@
+"""Tests for the declarative stage graph."""
+
+import uuid
+
+import pytest
+
+from src.ingest.local import first_job
+from src.worker import stages
+from src.worker.main import JOB_HANDLERS
+from src.worker.stages import STAGE_GRAPH, downstream_stages, stage_priority
+
+
+def test_every_stage_has_a_handler():
+    for stage, nexts in STAGE_GRAPH.items():
+        assert stage in JOB_HANDLERS
+        assert set(nexts) <= set(JOB_HANDLERS)
+
+
+def test_downstream_and_priority():
+    assert downstream_stages("pdf_analyze") == ["ner", "embed"]
+    assert downstream_stages("embed") == []
+    assert downstream_stages("unknown") == []
+    assert stage_priority("pdf_analyze") < stage_priority("embed")
+    assert stage_priority("unknown") == stages.DEFAULT_PRIORITY
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError, match="ner -> embed -> ner"):
+        stages._check_acyclic({"ner": ["embed"], "embed": ["ner"]})
+
+
+def test_first_jobs_use_stage_priority():
+    for doc_type, job_type in [("pdf", "pdf_analyze"), ("image", "ocr"), ("text", "extract_text")]:
+        row = first_job(uuid.uuid4(), doc_type)
+        assert row["job_type"] == job_type
+        assert row["priority"] == stage_priority(job_type)
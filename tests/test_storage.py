@@ -0,0 +1,241 @@
+"""Tests for blob storage, the worker-side blob cache and blob uploads."""
+
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.app import create_app
+from src.db.session import get_db
+from src.ingest import local, storage
+from src.ingest.storage import (
+    AzureBlobStore,
+    BlobCache,
+    BlobStore,
+    LocalBlobStore,
+    blob_key,
+    fetch_source,
+)
+from src.web.routes import documents
+from tests.conftest import FakeSession
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    async def scenario():
+        cache = BlobCache(str(tmp_path), max_bytes=10)
+        await cache.add("a", b"aaaa")
+        await cache.add("b", b"bbbb")
+        assert cache.get("a")  # a is now the most recent
+        await cache.add("c", b"cccc")
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+
+def test_cache_keeps_pinned_blobs_until_released(tmp_path):
+    async def scenario():
+        cache = BlobCache(str(tmp_path), max_bytes=6)
+        await cache.add("a", b"aaaa")
+        cache.pin("a")
+        await cache.add("b", b"bbbb")
+        await cache.add("c", b"cccc")
+        # a is pinned: b (the oldest unpinned) goes, over budget stays tolerated
+        assert os.path.exists(cache.path("a"))
+        assert cache.get("b") is None
+        cache.unpin("a")
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.get("a") is None
+    assert cache.get("c")
+
+
+def test_cache_reloads_from_disk(tmp_path):
+    asyncio.run(BlobCache(str(tmp_path), max_bytes=100).add("ab/cd/abcd", b"data"))
+    assert BlobCache(str(tmp_path), max_bytes=100).get("ab/cd/abcd")
+
+
+class RemoteStore(BlobStore):
+    """A store with no local paths, so reads go through the cache."""
+
+    def __init__(self, blobs):
+        self.blobs = blobs
+        self.reads = 0
+
+    async def put(self, key, data):
+        self.blobs[key] = data
+
+    async def read(self, key, offset=0, length=None):
+        return self.blobs[key][offset : None if length is None else offset + length]
+
+    async def chunks(self, key):
+        self.reads += 1
+        await asyncio.sleep(0.01)
+        data = self.blobs[key]
+        for start in range(0, len(data), 3):
+            yield data[start : start + 3]
+
+    async def exists(self, key):
+        return key in self.blobs
+
+    def url(self, key):
+        return f"remote://{key}"
+
+
+def test_fetch_source_pins_the_cached_blob(tmp_path, monkeypatch):
+    sha = "ab" * 32
+    store = RemoteStore({blob_key(sha): b"%PDF-1.7"})
+    cache = BlobCache(str(tmp_path), max_bytes=1)
+    monkeypatch.setattr(storage, "get_blob_store", lambda: store)
+    monkeypatch.setattr(storage, "get_blob_cache", lambda: cache)
+    doc = SimpleNamespace(source_path="/elsewhere/doc.pdf", content_sha256=sha)
+
+    async def read():
+        async with fetch_source(doc) as path:
+            await asyncio.sleep(0.01)
+            with open(path, "rb") as f:
+                return f.read()
+
+    async def scenario():
+        return await asyncio.gather(read(), read(), read())
+
+    # Over budget from the first byte, yet the file survives every reader
+    assert asyncio.run(scenario()) == [b"%PDF-1.7"] * 3
+    assert store.reads == 1
+    asyncio.run(cache.add("other", b"x"))
+    assert cache.get(blob_key(sha)) is None  # evictable once released
+
+
+def test_fetch_source_prefers_the_original_file(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"x")
+    doc = SimpleNamespace(source_path=str(path), content_sha256="ab" * 32)
+
+    async def scenario():
+        async with fetch_source(doc) as source:
+            return source
+
+    assert asyncio.run(scenario()) == str(path)
+
+
+def test_upload_files_reads_each_archive_in_order(monkeypatch):
+    events = []
+
+    async def store_file(path, content_hash):
+        events.append(("start", path))
+        await asyncio.sleep(0.01)
+        events.append(("end", path))
+
+    monkeypatch.setattr(local, "store_file", store_file)
+    files = [
+        ("/data/a.tar.gz!/1.pdf", "h1"),
+        ("/data/plain.pdf", "h2"),
+        ("/data/a.tar.gz!/2.pdf", "h3"),
+        ("/data/b.zip!/1.pdf", "h4"),
+        ("/data/a.tar.gz!/3.pdf", "h5"),
+    ]
+    asyncio.run(local.upload_files(files))
+
+    archive_a = [path for kind, path in events if kind == "start" and "a.tar.gz" in path]
+    assert archive_a == ["/data/a.tar.gz!/1.pdf", "/data/a.tar.gz!/2.pdf", "/data/a.tar.gz!/3.pdf"]
+    # Members of one archive never overlap; different archives and files do
+    open_a = 0
+    for kind, path in events:
+        if "a.tar.gz" in path:
+            open_a += 1 if kind == "start" else -1
+            assert open_a <= 1
+    assert events[:3] == [
+        ("start", "/data/a.tar.gz!/1.pdf"),
+        ("start", "/data/plain.pdf"),
+        ("start", "/data/b.zip!/1.pdf"),
+    ]
+
+
+def test_local_store_streams_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "CHUNK_SIZE", 3)
+    store = LocalBlobStore(str(tmp_path))
+
+    async def scenario():
+        await store.put("ab/cd/abcd", b"%PDF-1.7")
+        return [chunk async for chunk in store.chunks("ab/cd/abcd")]
+
+    assert asyncio.run(scenario()) == [b"%PD", b"F-1", b".7"]
+    assert store.url("ab/cd/abcd") == "local://ab/cd/abcd"  # no server path in blob_url
+
+
+def test_failed_download_leaves_no_cache_file(tmp_path):
+    cache = BlobCache(str(tmp_path), max_bytes=100)
+
+    async def broken():
+        yield b"%PDF"
+        raise ConnectionError("reset by peer")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(cache.add("ab/cd/abcd", broken()))
+    assert cache.get("ab/cd/abcd") is None
+    assert os.listdir(tmp_path / "ab" / "cd") == []
+
+
+def test_original_route_streams_the_blob(tmp_path, monkeypatch):
+    store = LocalBlobStore(str(tmp_path))
+    sha = "ab" * 32
+    asyncio.run(store.put(blob_key(sha), b"%PDF-1.7"))
+    monkeypatch.setattr(documents, "get_blob_store", lambda: store)
+    rows = {
+        "stored": SimpleNamespace(
+            blob_url=store.url(blob_key(sha)), content_sha256=sha, filename="a.pdf"
+        ),
+        "remote": SimpleNamespace(
+            blob_url="https://example.org/a.pdf", content_sha256=None, filename="a.pdf"
+        ),
+    }
+
+    async def scenario():
+        app = create_app()
+        transport = ASGITransport(app=app)
+        responses = []
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            for name in ("stored", "remote", None):
+                db = FakeSession([rows[name]] if name else [])
+                app.dependency_overrides[get_db] = lambda db=db: db
+                responses.append(await client.get(f"/docs/{uuid.uuid4()}/original"))
+        return responses
+
+    stored, remote, missing = asyncio.run(scenario())
+    assert (stored.status_code, stored.content) == (200, b"%PDF-1.7")
+    assert stored.headers["content-type"] == "application/pdf"
+    assert (remote.status_code, remote.headers["location"]) == (307, "https://example.org/a.pdf")
+    assert missing.status_code == 404
+
+
+@pytest.mark.azurite
+def test_azure_blob_store_round_trip(tmp_path):
+    connection_string = os.environ.get("AZURITE_CONNECTION_STRING")
+    if not connection_string:
+        pytest.skip("AZURITE_CONNECTION_STRING not set")
+    pytest.importorskip("azure.storage.blob")
+
+    async def scenario(cache_dir):
+        store = AzureBlobStore(connection_string, f"test-{uuid.uuid4().hex[:8]}")
+        key = blob_key("cd" * 32)
+        try:
+            assert not await store.exists(key)
+            await store.put(key, b"%PDF-1.7 body")
+            await store.put(key, b"ignored")  # content-addressed: first write wins
+            assert await store.exists(key)
+            assert await store.read(key) == b"%PDF-1.7 body"
+            assert await store.read(key, offset=9, length=4) == b"body"
+            path = await BlobCache(cache_dir, max_bytes=100).add(key, store.chunks(key))
+            with open(path, "rb") as f:
+                assert f.read() == b"%PDF-1.7 body"
+        finally:
+            container = await store._container()
+            await container.delete_container()
+            await store.close()
+
+    asyncio.run(scenario(str(tmp_path)))
@@ -0,0 +1,138 @@
+"""Tests for the job executor."""
+
+import asyncio
+import uuid
+
+from src.worker import main as worker_main
+from src.worker.batcher import RequestBatcher
+from src.worker.claims import ClaimedJob, RetryPolicy
+from src.worker.main import JobExecutor
+from src.worker.queue import MemoryQueue
+from src.worker.scheduler import LaneScheduler
+from tests.conftest import scope_of
+
+
+def claimed(job_type: str = "pdf_analyze", attempt: int = 1) -> ClaimedJob:
+    return ClaimedJob(uuid.uuid4(), uuid.uuid4(), job_type, attempt)
+
+
+class RecordingAcks:
+    def __init__(self):
+        self.completed = []
+        self.failed = []
+        self.retry = RetryPolicy()
+
+    def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def complete(self, job, next_stages=None):
+        self.completed.append(job)
+
+    def fail(self, job, error):
+        self.failed.append((job, error))
+
+
+def test_executor_keeps_at_most_max_concurrent_jobs_in_flight(monkeypatch):
+    running = 0
+    peak = 0
+
+    async def handler(document_id, db):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if str(document_id).startswith("0"):
+            raise RuntimeError("bad document")
+
+    monkeypatch.setattr(worker_main, "JOB_HANDLERS", {"ner": handler, "embed": handler})
+    monkeypatch.setattr(worker_main, "session_scope", scope_of(None))
+
+    async def scenario():
+        queue = MemoryQueue()
+        rows = [
+            {"id": uuid.uuid4(), "document_id": uuid.uuid4(), "job_type": t}
+            for t in ["ner", "embed"] * 10
+        ]
+        await queue.publish(rows)
+        acks = RecordingAcks()
+        executor = JobExecutor(
+            3, queue, acks, LaneScheduler(["ner", "embed"]), poll_interval=0.01
+        )
+        run = asyncio.create_task(executor.run())
+        while len(acks.completed) + len(acks.failed) < len(rows):
+            await asyncio.sleep(0.01)
+        executor.stop()
+        await asyncio.wait_for(run, timeout=5)
+        return rows, acks
+
+    rows, acks = asyncio.run(scenario())
+    assert peak == 3
+    done = {job.id for job in acks.completed} | {job.id for job, _ in acks.failed}
+    assert done == {row["id"] for row in rows}
+    bad = {row["id"] for row in rows if str(row["document_id"]).startswith("0")}
+    assert {job.id for job, _ in acks.failed} == bad
+
+
+def test_unknown_job_type_fails_without_running():
+    acks = RecordingAcks()
+    job = claimed("teleport")
+    asyncio.run(worker_main.run_job(job, acks))
+    assert acks.failed == [(job, "Unknown job type: teleport")]
+
+
+def test_one_slot_claims_a_whole_batch(monkeypatch):
+    class Recorder(RequestBatcher):
+        def __init__(self):
+            super().__init__(batch_size=4, timeout=10)
+            self.batches = []
+
+        async def run(self, requests):
+            self.batches.append(len(requests))
+            return requests
+
+    batcher = Recorder()
+    slots = []
+
+    async def ner(document_id, db):
+        slots.append(executor.in_flight)
+        await batcher.submit(document_id)
+
+    async def embed(document_id, db):
+        slots.append(executor.in_flight)
+        await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(worker_main, "JOB_HANDLERS", {"ner": ner, "embed": embed})
+    monkeypatch.setattr(worker_main, "session_scope", scope_of(None))
+
+    async def scenario():
+        nonlocal executor
+        queue = MemoryQueue()
+        rows = [
+            {"id": uuid.uuid4(), "document_id": uuid.uuid4(), "job_type": t}
+            for t in ["ner"] * 8 + ["embed"] * 2
+        ]
+        await queue.publish(rows)
+        acks = RecordingAcks()
+        executor = JobExecutor(
+            2,
+            queue,
+            acks,
+            LaneScheduler(["ner", "embed"], limits={"ner": 1}),
+            poll_interval=0.01,
+            batch_sizes={"ner": 4},
+        )
+        run = asyncio.create_task(executor.run())
+        while len(acks.completed) < len(rows):
+            await asyncio.sleep(0.01)
+        executor.stop()
+        await asyncio.wait_for(run, timeout=5)
+
+    executor = None
+    # The batcher's 10s timeout never fires: each ner slot brings a full batch
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+    assert batcher.batches == [4, 4]
+    assert max(slots) <= 2